@@ -0,0 +1,165 @@
+"""
+Admin dashboard statistics.
+
+Counts and revenue live in one small `stats_rollups` document that is kept
+current with `$inc` as orders, users and competitions are created, so the
+dashboard reads a single document instead of scanning collections. The
+document is (re)built from the collections with server-side aggregations
+the first time it is read, or on demand via rebuild_rollup.
+
+A rebuild is a maintenance operation: it counts documents created before a
+marker it sets on the rollup, and while the marker is set every `$inc` is
+also mirrored into `pending`, which is added to the counts when the rebuild
+is written. Orders still being checked out when the marker is set may be
+counted twice; rebuild when the shop is quiet.
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_ID = "overall"
+DAY_FORMAT = "%Y-%m-%d"
+
+# created_at is a BSON date; documents not yet converted by migrate_timestamps.py
+# still hold an ISO string
+_CREATED_DAY = {
+    "$cond": [
+        {"$eq": [{"$type": "$created_at"}, "date"]},
+        {"$dateToString": {"format": DAY_FORMAT, "date": "$created_at"}},
+        {"$substrCP": ["$created_at", 0, 10]},
+    ]
+}
+_IS_COMPLETED = {"$eq": ["$payment_status", "completed"]}
+
+
+def _add(counts: Dict[str, Any], pending: Dict[str, Any]) -> None:
+    for key, value in pending.items():
+        if isinstance(value, dict):
+            _add(counts.setdefault(key, {}), value)
+        else:
+            counts[key] = counts.get(key, 0) + value
+
+
+async def rebuild_rollup(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """Recompute the rollup document from the collections"""
+    token = uuid.uuid4().hex
+    started_at = datetime.utcnow()
+    await db.stats_rollups.update_one(
+        {"id": ROLLUP_ID},
+        {"$set": {"rebuilding": token, "pending": {}, "pending_ops": 0}},
+        upsert=True
+    )
+
+    # Unmigrated ISO strings never match $gte a date, so they are counted too
+    before = {"created_at": {"$not": {"$gte": started_at}}}
+    by_day: Dict[str, Dict[str, Any]] = {}
+    pipeline = [
+        {"$match": before},
+        {"$group": {
+            "_id": _CREATED_DAY,
+            "orders": {"$sum": 1},
+            "completed_orders": {"$sum": {"$cond": [_IS_COMPLETED, 1, 0]}},
+            "revenue": {"$sum": {"$cond": [_IS_COMPLETED, "$total", 0]}},
+        }}
+    ]
+    async for day in db.orders.aggregate(pipeline):
+        by_day[day["_id"] or "unknown"] = {
+            "orders": day["orders"],
+            "completed_orders": day["completed_orders"],
+            "revenue": day["revenue"],
+        }
+    counts = {
+        "orders": sum(day["orders"] for day in by_day.values()),
+        "completed_orders": sum(day["completed_orders"] for day in by_day.values()),
+        "revenue": sum(day["revenue"] for day in by_day.values()),
+        "users": await db.users.count_documents(before),
+        "competitions": await db.competitions.count_documents(before),
+        "by_day": by_day,
+    }
+
+    # Swap in counts + pending only if no $inc landed since pending was read
+    while True:
+        current = await db.stats_rollups.find_one(
+            {"id": ROLLUP_ID, "rebuilding": token}, {"_id": 0, "pending": 1, "pending_ops": 1}
+        )
+        if current is None:
+            logger.warning("Stats rollup rebuild superseded by another rebuild")
+            return {"id": ROLLUP_ID, **counts}
+        rollup = {"id": ROLLUP_ID, **counts, "built_at": datetime.utcnow()}
+        rollup["by_day"] = {day: dict(figures) for day, figures in by_day.items()}
+        _add(rollup, current.get("pending", {}))
+        result = await db.stats_rollups.replace_one(
+            {"id": ROLLUP_ID, "rebuilding": token, "pending_ops": current.get("pending_ops", 0)}, rollup
+        )
+        if result.matched_count:
+            break
+
+    logger.info(f"Rebuilt stats rollup: {rollup['orders']} orders over {len(rollup['by_day'])} days")
+    return rollup
+
+
+async def get_rollup(db: AsyncIOMotorDatabase, day: str) -> Dict[str, Any]:
+    """Totals plus the figures for a single day, in one small read"""
+    projection = {
+        "_id": 0, "orders": 1, "completed_orders": 1, "revenue": 1,
+        "users": 1, "competitions": 1, "built_at": 1, f"by_day.{day}": 1,
+    }
+    rollup = await db.stats_rollups.find_one({"id": ROLLUP_ID}, projection)
+    if not rollup or "built_at" not in rollup:
+        rollup = await rebuild_rollup(db)
+    rollup["day"] = rollup.pop("by_day", {}).get(day, {})
+    return rollup
+
+
+async def _inc(db: AsyncIOMotorDatabase, inc: Dict[str, Any]) -> None:
+    # No upsert: a missing rollup is rebuilt in full on the next read
+    # While a rebuild runs, the change is mirrored into pending so it survives the swap
+    mirrored = {**inc, **{f"pending.{key}": value for key, value in inc.items()}, "pending_ops": 1}
+    for _ in range(3):  # a rebuild may start or finish between the two attempts
+        result = await db.stats_rollups.update_one(
+            {"id": ROLLUP_ID, "rebuilding": {"$exists": False}}, {"$inc": inc}
+        )
+        if result.matched_count:
+            return
+        result = await db.stats_rollups.update_one(
+            {"id": ROLLUP_ID, "rebuilding": {"$exists": True}}, {"$inc": mirrored}
+        )
+        if result.matched_count:
+            return
+
+
+async def record_order(db: AsyncIOMotorDatabase, total: float, completed: bool, created_at: datetime) -> None:
+    day = created_at.strftime(DAY_FORMAT)
+    inc = {"orders": 1, f"by_day.{day}.orders": 1}
+    if completed:
+        inc.update({
+            "completed_orders": 1,
+            "revenue": total,
+            f"by_day.{day}.completed_orders": 1,
+            f"by_day.{day}.revenue": total,
+        })
+    await _inc(db, inc)
+
+
+async def record_user(db: AsyncIOMotorDatabase) -> None:
+    await _inc(db, {"users": 1})
+
+
+async def record_competition(db: AsyncIOMotorDatabase, delta: int = 1) -> None:
+    await _inc(db, {"competitions": delta})
+
+
+async def record_payment(db: AsyncIOMotorDatabase, total: float, created_at: datetime) -> None:
+    """Count the revenue of an order recorded as pending once its payment is captured"""
+    day = created_at.strftime(DAY_FORMAT)
+    await _inc(db, {
+        "completed_orders": 1,
+        "revenue": total,
+        f"by_day.{day}.completed_orders": 1,
+        f"by_day.{day}.revenue": total,
+    })
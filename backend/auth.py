@@ -1,19 +1,49 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Set, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials as HTTPAuthCredentials
+import asyncio
+import hashlib
+import time
 import os
 
+import metrics
+
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# bcrypt is CPU bound (~100-250 ms per call), so it runs on its own small pool
+# instead of the event loop or the shared threadpool used for file I/O
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 64))
+
+# Verified token payloads, keyed by SHA-256 of the token
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 300))  # seconds
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+
+hash_queue_depth = metrics.gauge("password_hash_pending", "bcrypt calls queued or running")
+hash_calls = metrics.counter("password_hash_calls_total", "bcrypt calls by operation and outcome")
+hash_wait_seconds = metrics.counter("password_hash_wait_seconds_total", "Time bcrypt calls spent queued")
+hash_run_seconds = metrics.counter("password_hash_run_seconds_total", "Time spent inside bcrypt")
+
+_token_cache: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+_user_tokens: Dict[str, Set[bytes]] = {}
+
+token_cache_lookups = metrics.counter("token_cache_lookups_total", "Verified-token cache lookups by result")
+token_cache_entries = metrics.gauge("token_cache_entries", "Verified tokens currently cached")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -23,6 +53,52 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _timed(fn, queued_at: float, operation: str, *args):
+    started = time.perf_counter()
+    hash_wait_seconds.inc(started - queued_at, operation=operation)
+    try:
+        return fn(*args)
+    finally:
+        hash_run_seconds.inc(time.perf_counter() - started, operation=operation)
+
+
+async def _run_hash(operation: str, fn, *args):
+    """
+    Run a bcrypt call on the dedicated pool. When more than
+    PASSWORD_HASH_MAX_QUEUE calls are already waiting the request is
+    rejected with a 503, so a login burst only degrades auth endpoints.
+    """
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_QUEUE:
+        hash_calls.inc(operation=operation, outcome="rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    hash_queue_depth.set(_hash_pending)
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _hash_executor, _timed, fn, time.perf_counter(), operation, *args
+        )
+        hash_calls.inc(operation=operation, outcome="completed")
+        return result
+    finally:
+        _hash_pending -= 1
+        hash_queue_depth.set(_hash_pending)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hash("hash", get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -45,9 +121,60 @@ def decode_token(token: str) -> dict:
         )
 
 
+def _forget_token(digest: bytes) -> None:
+    entry = _token_cache.pop(digest, None)
+    if entry is not None:
+        user_id = entry[0].get("sub")
+        digests = _user_tokens.get(user_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del _user_tokens[user_id]
+
+
+def decode_token_cached(token: str) -> dict:
+    """
+    decode_token with a bounded LRU of verified payloads in front of it.
+    Entries live for TOKEN_CACHE_TTL seconds and never past the token's own
+    `exp`, so an expired token is always re-verified (and rejected).
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+
+    entry = _token_cache.get(digest)
+    if entry is not None:
+        if entry[1] > now:
+            _token_cache.move_to_end(digest)
+            token_cache_lookups.inc(result="hit")
+            return entry[0]
+        _forget_token(digest)
+
+    token_cache_lookups.inc(result="miss")
+    payload = decode_token(token)
+
+    expires_at = now + TOKEN_CACHE_TTL
+    if payload.get("exp"):
+        expires_at = min(expires_at, float(payload["exp"]))
+
+    _token_cache[digest] = (payload, expires_at)
+    _user_tokens.setdefault(payload.get("sub"), set()).add(digest)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _forget_token(next(iter(_token_cache)))
+    token_cache_entries.set(len(_token_cache))
+
+    return payload
+
+
+def invalidate_user_tokens(user_id: str) -> None:
+    """Drop every cached token payload for a user (logout, role change)"""
+    for digest in _user_tokens.pop(user_id, set()):
+        _token_cache.pop(digest, None)
+    token_cache_entries.set(len(_token_cache))
+
+
 async def get_current_user(credentials: HTTPAuthCredentials = Depends(security)) -> dict:
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     user_id = payload.get("sub")
     if user_id is None:
         raise HTTPException(
@@ -0,0 +1,83 @@
+"""
+Benchmark catalogue latency while the server is under a login burst.
+
+Runs `--login-workers` clients hammering POST /api/auth/login alongside
+`--browse-workers` clients reading GET /api/competitions for `--duration`
+seconds, then reports per-endpoint latency percentiles. Run it once with
+--login-workers 0 to get the catalogue baseline; with bcrypt off the event
+loop the catalogue numbers should barely move under login load.
+
+Needs a running server with seeded data (python seed_data.py):
+
+    python benchmarks/bench_auth_mixed.py --base-url http://localhost:8001
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client, name, send, deadline, latencies, statuses):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await send(client)
+            statuses[name][response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[name][type(e).__name__] += 1
+            continue
+        latencies[name].append(time.perf_counter() - started)
+
+
+async def run(args):
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    credentials = {"email": args.email, "password": args.password}
+
+    async def login(client):
+        return await client.post("/api/auth/login", json=credentials)
+
+    async def browse(client):
+        return await client.get("/api/competitions")
+
+    limits = httpx.Limits(max_connections=args.login_workers + args.browse_workers)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(worker(client, "login", login, deadline, latencies, statuses) for _ in range(args.login_workers)),
+            *(worker(client, "catalogue", browse, deadline, latencies, statuses) for _ in range(args.browse_workers)),
+        )
+
+    for name in ("login", "catalogue"):
+        values = latencies[name]
+        if not values:
+            continue
+        print(f"{name}: {len(values)} requests, {len(values) / args.duration:.1f} req/s, "
+              f"statuses {dict(statuses[name])}")
+        print(f"  mean {statistics.mean(values) * 1000:.1f} ms" + "".join(
+            f", p{pct} {percentile(values, pct) * 1000:.1f} ms" for pct in (50, 95, 99)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", default="test@decus.com")
+    parser.add_argument("--password", default="test123")
+    parser.add_argument("--login-workers", type=int, default=20)
+    parser.add_argument("--browse-workers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
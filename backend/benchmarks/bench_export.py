@@ -0,0 +1,85 @@
+"""
+Benchmark the streaming export encoder on large row counts.
+
+Feeds synthetic order or entry documents through exports.stream_rows from
+an in-memory async cursor (no database needed) and reports throughput,
+output size and peak Python memory. Peak memory should stay flat as --rows
+grows; only the time should scale.
+
+    python benchmarks/bench_export.py --rows 1000000 --format csv
+    python benchmarks/bench_export.py --rows 1000000 --format ndjson --kind entries
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from exports import stream_rows, ORDER_EXPORT_FIELDS, ENTRY_EXPORT_FIELDS  # noqa: E402
+
+
+class SyntheticCursor:
+    """Async iterator standing in for a Motor cursor"""
+
+    def __init__(self, rows, kind):
+        self.rows = rows
+        self.kind = kind
+        self.start = datetime(2025, 1, 1)
+
+    def __aiter__(self):
+        return self._generate()
+
+    async def _generate(self):
+        for i in range(self.rows):
+            created_at = self.start + timedelta(seconds=i)  # stored as a BSON date
+            if self.kind == "orders":
+                yield {
+                    "id": f"order-{i:08d}", "order_number": 1000 + i, "user_id": f"user-{i % 5000}",
+                    "user_email": f"user{i % 5000}@example.com", "user_name": "Example User",
+                    "total": 12.5, "discount": 0.0, "payment_method": "site_credit",
+                    "payment_status": "completed", "ticket_count": 5, "created_at": created_at,
+                }
+            else:
+                yield {
+                    "id": f"entry-{i:08d}", "competition_id": "comp-001", "user_id": f"user-{i % 5000}",
+                    "user_email": f"user{i % 5000}@example.com", "user_name": "Example User",
+                    "ticket_numbers": [i * 5 + n for n in range(5)], "quantity": 5, "total_paid": 12.5,
+                    "order_id": f"order-{i:08d}", "created_at": created_at,
+                }
+            if i % 1000 == 0:
+                await asyncio.sleep(0)  # cursor batch boundary
+
+
+async def run(args):
+    fields = ORDER_EXPORT_FIELDS if args.kind == "orders" else ENTRY_EXPORT_FIELDS
+    tracemalloc.start()
+    started = time.perf_counter()
+    total_bytes = 0
+    chunks = 0
+    async for chunk in stream_rows(SyntheticCursor(args.rows, args.kind), fields, args.format):
+        total_bytes += len(chunk)
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Rows:        {args.rows:,} {args.kind} as {args.format}")
+    print(f"Time:        {elapsed:.2f} s ({args.rows / elapsed:,.0f} rows/s)")
+    print(f"Output:      {total_bytes / 1024 / 1024:.1f} MB in {chunks:,} chunks")
+    print(f"Peak memory: {peak / 1024:.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--kind", choices=["orders", "entries"], default="orders")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Microbenchmark of per-request auth overhead in get_current_user.
+
+Compares a full HS256 verify (auth.decode_token) with a warm lookup in the
+verified-token cache, and times the get_current_user dependency end to end
+with a cold and a warm cache.
+
+    python benchmarks/bench_token_cache.py --iterations 50000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastapi.security.http import HTTPAuthorizationCredentials
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import auth  # noqa: E402
+
+
+def report(label, seconds, iterations):
+    print(f"{label:<34} {seconds / iterations * 1e6:8.2f} us/op  ({iterations / seconds:,.0f} ops/s)")
+
+
+def bench(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000, help="Distinct tokens in the warm-cache run")
+    args = parser.parse_args()
+
+    tokens = [
+        auth.create_access_token({"sub": f"user-{i}", "email": f"user{i}@example.com", "is_admin": False})
+        for i in range(args.users)
+    ]
+    token = tokens[0]
+
+    report("decode_token (full verify)", bench(lambda: auth.decode_token(token), args.iterations), args.iterations)
+
+    auth.decode_token_cached(token)
+    report("decode_token_cached (warm)", bench(lambda: auth.decode_token_cached(token), args.iterations),
+           args.iterations)
+
+    credentials = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=t) for t in tokens]
+
+    async def run_dependency(iterations):
+        started = time.perf_counter()
+        for i in range(iterations):
+            await auth.get_current_user(credentials[i % len(credentials)])
+        return time.perf_counter() - started
+
+    for user_id in list(auth._user_tokens):
+        auth.invalidate_user_tokens(user_id)
+    report(f"get_current_user (cold, {args.users} users)", asyncio.run(run_dependency(args.users)), args.users)
+    report(f"get_current_user (warm, {args.users} users)", asyncio.run(run_dependency(args.iterations)),
+           args.iterations)
+
+    print(f"cache hits/misses: {auth.token_cache_lookups.get(result='hit'):.0f}/"
+          f"{auth.token_cache_lookups.get(result='miss'):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark concurrent video seeks against /api/uploads/{filename}.
+
+Each simulated viewer issues Range requests at random offsets, the way a
+video player does when scrubbing. By default the app is driven in-process
+through httpx's ASGI transport with a generated file; pass --base-url and
+--filename to benchmark a running server instead.
+
+    python benchmarks/bench_video_seeks.py --viewers 50 --seeks 20
+    python benchmarks/bench_video_seeks.py --base-url http://localhost:8001 --filename <sha256>.mp4
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def viewer(client, url, size, seeks, chunk, latencies, errors):
+    for _ in range(seeks):
+        start = random.randrange(0, max(1, size - chunk))
+        headers = {"Range": f"bytes={start}-{start + chunk - 1}"}
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 206 or len(response.content) != min(chunk, size - start):
+            errors.append(response.status_code)
+
+
+async def run(args):
+    generated = None
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+        filename = args.filename
+    else:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+        os.environ.setdefault("DB_NAME", "benchmark")
+        import server
+
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://bench"
+        filename = args.filename
+        if not filename:
+            generated = server.UPLOAD_DIR / f".bench-{os.getpid()}.mp4"
+            generated.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+            filename = generated.name
+
+    url = f"/api/uploads/{filename}"
+    limits = httpx.Limits(max_connections=args.viewers)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=30) as client:
+            probe = await client.get(url, headers={"Range": "bytes=0-0"})
+            if probe.status_code != 206:
+                raise SystemExit(f"Range probe returned {probe.status_code}, expected 206")
+            size = int(probe.headers["content-range"].split("/")[-1])
+
+            latencies, errors = [], []
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                viewer(client, url, size, args.seeks, args.chunk_kb * 1024, latencies, errors)
+                for _ in range(args.viewers)
+            ))
+            elapsed = time.perf_counter() - started
+    finally:
+        if generated is not None:
+            generated.unlink(missing_ok=True)
+
+    total = len(latencies)
+    print(f"File size:        {size / 1024 / 1024:.1f} MB")
+    print(f"Seeks:            {total} ({args.viewers} viewers x {args.seeks})")
+    print(f"Errors:           {len(errors)}")
+    print(f"Throughput:       {total / elapsed:.1f} seeks/s, "
+          f"{total * args.chunk_kb / 1024 / elapsed:.1f} MB/s")
+    print(f"Latency mean:     {statistics.mean(latencies) * 1000:.2f} ms")
+    for pct in (50, 95, 99):
+        print(f"Latency p{pct}:      {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Running server to benchmark (default: in-process app)")
+    parser.add_argument("--filename", help="Upload to seek in (default: generate a temporary file)")
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of the generated file")
+    parser.add_argument("--viewers", type=int, default=50, help="Concurrent viewers")
+    parser.add_argument("--seeks", type=int, default=20, help="Seeks per viewer")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="Bytes requested per seek")
+    args = parser.parse_args()
+    if args.base_url and not args.filename:
+        parser.error("--filename is required with --base-url")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Open-loop load test of the storefront, checkout and admin flows.
+
+Each scenario is started as a Poisson process at its own rate (iterations per
+second, `--rate browse=20 --rate checkout_credit=2`), independent of how
+fast the server answers, so overload shows up as growing latency and errors
+rather than as a quietly lower request rate. Every HTTP step is timed on its
+own and the run is summarised as p50/p95/p99 and error rate per step. Whole
+iterations are timed from their scheduled arrival, so time spent waiting to
+start counts too; an arrival that finds no idle user or is over
+--max-in-flight is dropped and reported rather than queued.
+
+Scenarios:
+  browse           GET /competitions, then one competition
+  add_to_cart      POST /cart/add, GET /cart
+  checkout_credit  add to cart, validate, complete with site credit
+  checkout_card    add to cart, complete with card, create the payment job
+                   (through the gateway stub), follow the success redirect
+  admin            dashboard stats, orders page, competition entries
+
+Setup registers `--users` load-test accounts through the API and tops up
+their site credit directly in MongoDB (MONGO_URL / DB_NAME from backend/.env),
+so point it at a disposable database seeded with python seed_data.py.
+
+The card scenario needs the server to send payment jobs to the local
+gateway stub this script starts on `--gateway-port`:
+
+    CASHFLOWS_MERCHANT_ID=load CASHFLOWS_API_KEY=load CASHFLOWS_API_SECRET=load \\
+    CASHFLOWS_GATEWAY_URL=http://127.0.0.1:8099 uvicorn server:app --port 8001
+
+    python benchmarks/loadtest.py --duration 60 --output results/$(git rev-parse --short HEAD).json
+    python benchmarks/loadtest.py --compare results/abc1234.json --output results/def5678.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_RATES = {
+    "browse": 20.0,
+    "add_to_cart": 5.0,
+    "checkout_credit": 2.0,
+    "checkout_card": 1.0,
+    "admin": 0.5,
+}
+USER_SCENARIOS = {"add_to_cart", "checkout_credit", "checkout_card"}
+USER_PASSWORD = "loadtest-password"
+USER_CREDIT = 1_000_000.0
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StepError(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self.requests = defaultdict(int)  # (scenario, step) -> attempts
+        self.latencies = defaultdict(list)  # (scenario, step) -> seconds
+        self.errors = defaultdict(lambda: defaultdict(int))  # (scenario, step) -> reason -> count
+        self.iterations = defaultdict(lambda: defaultdict(int))  # scenario -> started/completed/failed/dropped/no_user
+        self.iteration_latencies = defaultdict(list)  # scenario -> seconds from scheduled arrival to completion
+
+    async def step(self, scenario, name, send, expect=(200,)):
+        """Time one request; raises StepError so the rest of the iteration is skipped"""
+        self.requests[(scenario, name)] += 1
+        started = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.HTTPError as e:
+            self.errors[(scenario, name)][type(e).__name__] += 1
+            raise StepError(name)
+        self.latencies[(scenario, name)].append(time.perf_counter() - started)
+        if response.status_code not in expect:
+            self.errors[(scenario, name)][str(response.status_code)] += 1
+            raise StepError(name)
+        return response
+
+    def summary(self, duration):
+        steps = {}
+        for key in sorted(self.requests):
+            values = self.latencies.get(key, [])
+            errors = sum(self.errors[key].values())
+            total = self.requests[key]
+            steps[f"{key[0]}.{key[1]}"] = {
+                "requests": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "error_reasons": dict(self.errors[key]),
+                "mean_ms": round(statistics.mean(values) * 1000, 2) if values else None,
+                **{
+                    f"p{pct}_ms": round(percentile(values, pct) * 1000, 2) if values else None
+                    for pct in (50, 95, 99)
+                },
+                "max_ms": round(max(values) * 1000, 2) if values else None,
+            }
+        scenarios = {}
+        for name, counts in self.iterations.items():
+            values = self.iteration_latencies.get(name, [])
+            scenarios[name] = {
+                **counts,
+                "achieved_rate": round(counts["completed"] / duration, 2),
+                **{
+                    f"p{pct}_ms": round(percentile(values, pct) * 1000, 2) if values else None
+                    for pct in (50, 95, 99)
+                },
+            }
+        return {"scenarios": scenarios, "steps": steps}
+
+
+class GatewayStub(BaseHTTPRequestHandler):
+    """Answers POST /payment-jobs like the Cashflows API, after `latency` seconds"""
+
+    latency = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        reference = body.get("orderReference", uuid.uuid4().hex)
+        payload = json.dumps({
+            "paymentJobReference": f"STUB-JOB-{reference}",
+            "paymentReference": f"STUB-PAY-{reference}",
+            "actionUrl": f"{body.get('returnUrlSuccess', '')}".replace("{paymentRef}", f"STUB-PAY-{reference}"),
+            "status": "pending",
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_gateway_stub(port, latency):
+    GatewayStub.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), GatewayStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def login(client, email, password):
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def create_users(client, count, run_id):
+    """Register load-test users and give them enough site credit for the run"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    users = []
+    for index in range(count):
+        email = f"loadtest+{run_id}-{index}@example.com"
+        response = await client.post(
+            "/api/auth/register", json={"email": email, "name": f"Load Test {index}", "password": USER_PASSWORD}
+        )
+        response.raise_for_status()
+        body = response.json()
+        users.append({
+            "id": body["user"]["id"],
+            "email": email,
+            "headers": {"Authorization": f"Bearer {body['access_token']}"},
+        })
+
+    load_dotenv(BACKEND_DIR / ".env")
+    mongo = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    try:
+        await mongo[os.environ["DB_NAME"]].users.update_many(
+            {"id": {"$in": [user["id"] for user in users]}},
+            {"$set": {"site_credit_balance": USER_CREDIT}, "$inc": {"profile_version": 1}}
+        )
+    finally:
+        mongo.close()
+    return users
+
+
+class Scenarios:
+    def __init__(self, client, recorder, users, admin_headers, competitions):
+        self.client = client
+        self.recorder = recorder
+        self.users = users  # asyncio.Queue of idle users; one iteration per user at a time
+        self.admin_headers = admin_headers
+        self.competitions = competitions
+
+    def _cart_item(self):
+        comp = random.choice(self.competitions)
+        return {
+            "competition_id": comp["id"],
+            "title": comp["title"],
+            "price": comp.get("sale_price") or comp["price"],
+            "quantity": 1,
+        }
+
+    async def browse(self, user):
+        step, client = self.recorder.step, self.client
+        await step("browse", "list", lambda: client.get("/api/competitions"))
+        comp = random.choice(self.competitions)
+        await step("browse", "detail", lambda: client.get(f"/api/competitions/{comp['id']}"))
+
+    async def add_to_cart(self, user):
+        step, client, headers = self.recorder.step, self.client, user["headers"]
+        try:
+            await step("add_to_cart", "add", lambda: client.post("/api/cart/add", json=self._cart_item(), headers=headers))
+            await step("add_to_cart", "view", lambda: client.get("/api/cart", headers=headers))
+        finally:
+            await self._clear_cart(headers)
+
+    async def checkout_credit(self, user):
+        step, client, headers = self.recorder.step, self.client, user["headers"]
+        try:
+            await step("checkout_credit", "add", lambda: client.post("/api/cart/add", json=self._cart_item(), headers=headers))
+            await step("checkout_credit", "validate", lambda: client.post("/api/checkout/validate", headers=headers))
+            await step("checkout_credit", "complete", lambda: client.post(
+                "/api/checkout/complete", json={"payment_method": "site_credit"}, headers=headers
+            ))
+        except StepError:
+            # A completed checkout empties the cart; a failed one leaves items behind
+            await self._clear_cart(headers)
+            raise
+
+    async def checkout_card(self, user):
+        step, client, headers = self.recorder.step, self.client, user["headers"]
+        try:
+            await step("checkout_card", "add", lambda: client.post("/api/cart/add", json=self._cart_item(), headers=headers))
+            order = (await step("checkout_card", "complete", lambda: client.post(
+                "/api/checkout/complete", json={"payment_method": "card"}, headers=headers
+            ))).json()
+        finally:
+            await self._clear_cart(headers)
+        payment = (await step("checkout_card", "payment_create", lambda: client.post("/api/payment/create", json={
+            "amount": max(order["total"], 0.01),
+            "order_reference": order["order_id"],
+            "customer_email": user["email"],
+            "customer_name": "Load Test",
+        }, headers=headers))).json()
+        reference = payment.get("payment_reference") or ""
+        await step("checkout_card", "success_redirect", lambda: client.get(
+            "/api/payment/success", params={"ref": reference}
+        ))
+
+    async def _clear_cart(self, headers):
+        """Untimed; a user's next iteration starts from an empty cart"""
+        try:
+            await self.client.delete("/api/cart/clear", headers=headers)
+        except httpx.HTTPError:
+            pass
+
+    async def admin(self, user):
+        step, client, headers = self.recorder.step, self.client, self.admin_headers
+        comp = random.choice(self.competitions)
+        await step("admin", "stats", lambda: client.get("/api/admin/stats", headers=headers))
+        await step("admin", "orders", lambda: client.get("/api/admin/orders", params={"limit": 50}, headers=headers))
+        await step("admin", "entries", lambda: client.get(
+            f"/api/admin/competitions/{comp['id']}/entries", params={"limit": 50}, headers=headers
+        ))
+
+    async def iteration(self, name, in_flight, scheduled_at):
+        """Run one iteration, timed from `scheduled_at` (its arrival) rather than from when it got going"""
+        counts = self.recorder.iterations[name]
+        if in_flight.locked():
+            counts["dropped"] += 1  # over --max-in-flight: the generator is saturated, not the server
+            return
+        if name in USER_SCENARIOS and self.users.empty():
+            counts["no_user"] += 1  # every user is mid-iteration: waiting would hide the delay; raise --users
+            return
+        user = self.users.get_nowait() if name in USER_SCENARIOS else None
+        async with in_flight:
+            counts["started"] += 1
+            try:
+                await getattr(self, name)(user)
+                counts["completed"] += 1
+                self.recorder.iteration_latencies[name].append(time.perf_counter() - scheduled_at)
+            except StepError:
+                counts["failed"] += 1
+            finally:
+                if user is not None:
+                    self.users.put_nowait(user)
+
+
+async def arrivals(scenarios, name, rate, deadline, in_flight, tasks):
+    """Start iterations of one scenario with exponentially distributed gaps"""
+    next_at = time.perf_counter()
+    while True:
+        next_at += random.expovariate(rate)
+        if next_at >= deadline:
+            return
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.add(asyncio.create_task(scenarios.iteration(name, in_flight, next_at)))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(results, baseline=None):
+    base_steps = (baseline or {}).get("steps", {})
+    print(f"{'step':34} {'reqs':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}" + ("   p95 vs base" if baseline else ""))
+    for name, step in results["steps"].items():
+        line = (f"{name:34} {step['requests']:>7} {step['error_rate'] * 100:>5.1f}% "
+                + " ".join(f"{step[key]:>8.1f}" if step[key] is not None else f"{'-':>8}"
+                           for key in ("p50_ms", "p95_ms", "p99_ms")))
+        base = base_steps.get(name, {}).get("p95_ms")
+        if baseline and base and step["p95_ms"] is not None:
+            line += f"   {(step['p95_ms'] - base) / base * 100:+6.1f}%"
+        print(line)
+    for name, counts in results["scenarios"].items():
+        print(f"{name}: {dict(counts)}")  # pNN_ms: whole iteration, from its scheduled arrival
+
+
+async def run(args, rates):
+    gateway = start_gateway_stub(args.gateway_port, args.gateway_latency_ms / 1000) if "checkout_card" in rates else None
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+            competitions = [
+                comp for comp in (await client.get("/api/competitions")).json()
+                if not comp.get("is_finished") and comp.get("max_tickets", 0) - comp.get("tickets_sold", 0) > 0
+            ]
+            if not competitions:
+                raise SystemExit("No open competitions to load test; run python seed_data.py first")
+            admin_headers = await login(client, args.admin_email, args.admin_password) if "admin" in rates else None
+            users = asyncio.Queue()
+            for user in await create_users(client, args.users, uuid.uuid4().hex[:8]):
+                users.put_nowait(user)
+
+            scenarios = Scenarios(client, recorder, users, admin_headers, competitions)
+            in_flight = asyncio.Semaphore(args.max_in_flight)
+            tasks = set()
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*(
+                arrivals(scenarios, name, rate, deadline, in_flight, tasks) for name, rate in rates.items()
+            ))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+    finally:
+        if gateway is not None:
+            gateway.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.utcnow().isoformat(),
+        "base_url": args.base_url,
+        "duration": args.duration,
+        "elapsed": round(elapsed, 2),
+        "rates": rates,
+        "users": args.users,
+        **recorder.summary(args.duration),
+    }
+
+
+def parse_rates(values):
+    rates = dict(DEFAULT_RATES)
+    for value in values or []:
+        name, _, rate = value.partition("=")
+        if name not in DEFAULT_RATES:
+            raise SystemExit(f"Unknown scenario '{name}'; choose from {', '.join(DEFAULT_RATES)}")
+        rates[name] = float(rate)
+    return {name: rate for name, rate in rates.items() if rate > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to generate load")
+    parser.add_argument("--rate", action="append", metavar="SCENARIO=PER_SECOND",
+                        help="Arrival rate per scenario; 0 disables it (repeatable)")
+    parser.add_argument("--users", type=int, default=50, help="Load-test accounts to create")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Cap on concurrent iterations")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--admin-email", default="admin@decus.com")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--gateway-port", type=int, default=8099)
+    parser.add_argument("--gateway-latency-ms", type=float, default=50.0, help="Simulated payment gateway latency")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare p95 latencies against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args, parse_rates(args.rate)))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_summary(results, baseline)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-worker cache of active coupons by code.
+
+apply_coupon reads coupons from here, so a promo code shared by many
+shoppers costs one read per worker per COUPON_CACHE_TTL seconds instead of
+one per cart update. Unknown and inactive codes are cached too (as None).
+The cached times_used is only used to reject coupons that are clearly used
+up; the limit itself is enforced by CouponRepository.redeem at checkout,
+whose result refreshes the cache. Anything that changes a coupon must call
+invalidate_coupon; other workers pick the change up within the TTL.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import metrics
+
+if TYPE_CHECKING:
+    from repositories import CouponRepository
+
+COUPON_CACHE_TTL = float(os.environ.get("COUPON_CACHE_TTL", 30))  # seconds
+COUPON_CACHE_SIZE = int(os.environ.get("COUPON_CACHE_SIZE", 1000))
+
+_coupons: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+
+coupon_cache_lookups = metrics.counter("coupon_cache_lookups_total", "Coupon cache lookups by result")
+
+
+def store_coupon(code: str, coupon: Optional[Dict[str, Any]]) -> None:
+    """Cache a coupon that was just read or written, or None for a code that isn't active"""
+    _coupons[code] = (coupon, time.monotonic())
+    _coupons.move_to_end(code)
+    while len(_coupons) > COUPON_CACHE_SIZE:
+        _coupons.popitem(last=False)
+
+
+def invalidate_coupon(code: str) -> None:
+    _coupons.pop(code, None)
+
+
+async def get_coupon(coupons: "CouponRepository", code: str) -> Optional[Dict[str, Any]]:
+    """The active coupon with this code, or None"""
+    entry = _coupons.get(code)
+    if entry is not None and time.monotonic() - entry[1] < COUPON_CACHE_TTL:
+        _coupons.move_to_end(code)
+        coupon_cache_lookups.inc(result="hit")
+        return entry[0]
+
+    coupon_cache_lookups.inc(result="miss")
+    coupon = await coupons.find_active(code)
+    store_coupon(code, coupon)
+    return coupon
+
+
+def is_used_up(coupon: Dict[str, Any]) -> bool:
+    return coupon.get("max_uses", 0) > 0 and coupon.get("times_used", 0) >= coupon["max_uses"]
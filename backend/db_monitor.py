@@ -0,0 +1,148 @@
+"""
+MongoDB command monitoring, attributed to the HTTP request that issued it.
+
+CommandMonitor is registered as a pymongo event listener on the Motor
+client. Motor runs each operation in a thread with a copy of the caller's
+contextvars, so the listener can add every command to the RequestDbStats
+of the current request. DbMonitorMiddleware sets that up per request and
+afterwards:
+  - records round trips per route and command durations as metrics,
+  - logs a warning when a request goes over DB_ROUND_TRIP_BUDGET, listing
+    commands repeated against one collection (likely N+1 loops),
+  - with DB_DEBUG_HEADERS=1, adds X-DB-Commands and Server-Timing headers.
+The headers are sent with the response start, so for streaming responses
+they only cover the commands issued before the first byte.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+import metrics
+from request_metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+DB_ROUND_TRIP_BUDGET = int(os.environ.get("DB_ROUND_TRIP_BUDGET", 25))
+DB_DEBUG_HEADERS = os.environ.get("DB_DEBUG_HEADERS", "").lower() in ("1", "true", "yes")
+REPEATED_COMMAND_THRESHOLD = 5  # same command on the same collection within one request
+
+command_duration = metrics.histogram("mongo_command_duration_seconds", "MongoDB command round-trip time")
+command_failures = metrics.counter("mongo_command_failures_total", "MongoDB commands that failed")
+commands_per_request = metrics.histogram(
+    "mongo_commands_per_request", "MongoDB round trips issued while handling one HTTP request",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 1000)
+)
+budget_exceeded = metrics.counter(
+    "mongo_round_trip_budget_exceeded_total", "HTTP requests that issued more than DB_ROUND_TRIP_BUDGET commands"
+)
+
+
+class RequestDbStats:
+    """Commands issued on behalf of one request; updated from Motor's worker threads"""
+
+    def __init__(self):
+        self.commands = 0
+        self.duration = 0.0
+        self.by_target: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, command: str, collection: Optional[str], seconds: float) -> None:
+        with self._lock:
+            self.commands += 1
+            self.duration += seconds
+            self.by_target[(command, collection)] += 1
+
+    def repeated(self) -> List[Tuple[str, Optional[str], int]]:
+        with self._lock:
+            return [
+                (command, collection, count)
+                for (command, collection), count in self.by_target.most_common()
+                if count >= REPEATED_COMMAND_THRESHOLD
+            ]
+
+
+_current: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar("db_stats", default=None)
+
+
+def current_stats() -> Optional[RequestDbStats]:
+    return _current.get()
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """pymongo listener; events arrive on the thread that ran the command"""
+
+    def __init__(self):
+        # request_id -> collection name, which only the started event carries
+        self._collections: Dict[int, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection") if event.command_name == "getMore" else None
+        with self._lock:
+            self._collections[event.request_id] = collection
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            collection = self._collections.pop(event.request_id, None)
+        seconds = event.duration_micros / 1_000_000
+        command_duration.observe(seconds, command=event.command_name)
+        if failed:
+            command_failures.inc(command=event.command_name)
+        stats = _current.get()
+        if stats is not None:
+            stats.add(event.command_name, collection, seconds)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+
+class DbMonitorMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            if DB_DEBUG_HEADERS and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-commands", str(stats.commands).encode()))
+                headers.append((b"server-timing", f"db;dur={stats.duration * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route = route_template(scope)
+            commands_per_request.observe(stats.commands, route=route)
+            if stats.commands > DB_ROUND_TRIP_BUDGET:
+                budget_exceeded.inc(route=route)
+                repeated = ", ".join(
+                    f"{command} {collection} x{count}" if collection else f"{command} x{count}"
+                    for command, collection, count in stats.repeated()
+                )
+                logger.warning(
+                    f"{scope['method']} {route} made {stats.commands} MongoDB round trips "
+                    f"({stats.duration * 1000:.1f} ms, budget {DB_ROUND_TRIP_BUDGET}, "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms total)"
+                    + (f"; repeated: {repeated}" if repeated else "")
+                )
@@ -0,0 +1,222 @@
+"""
+Verifiable server-side draws over sold tickets.
+
+Picking a uniformly random *sold* ticket is a rank/select problem: choose a
+rank r in [0, sold) and find the r-th smallest sold ticket number. To avoid
+scanning every ticket, sold numbers are counted per block of BLOCK_SIZE
+consecutive numbers in one `ticket_rank_index` document per competition.
+The first draw builds it from `tickets`; after that allocation keeps it
+current with `$inc`. Select then
+  1. binary-searches the cumulative block counts for the block holding r, and
+  2. skips at most BLOCK_SIZE keys of the tickets (competition_id,
+     ticket_number) index inside that block.
+
+Draws are recorded in `draws` with the server seed, its SHA-256 commitment
+and an optional client seed (e.g. a public lottery result). Ranks are derived
+from them with HMAC-SHA256, so anyone holding the seeds and the sorted list
+of sold tickets can recompute the winners (see derive_ranks). For a
+commit-reveal draw, publish the commitment from create_commitment before the
+client seed is known and pass its id to run_draw.
+"""
+import bisect
+import hashlib
+import hmac
+import logging
+import secrets
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from winners import resolve_tickets
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 1024
+
+
+def _block(ticket_number: int) -> int:
+    return (ticket_number - 1) // BLOCK_SIZE
+
+
+async def record_sold(db: AsyncIOMotorDatabase, competition_id: str, ticket_numbers: List[int]) -> None:
+    """Count newly allocated tickets into the competition's rank index"""
+    if not ticket_numbers:
+        return
+    inc = {f"counts.{block}": count for block, count in Counter(map(_block, ticket_numbers)).items()}
+    inc["total"] = len(ticket_numbers)
+    # No upsert: an index created here would hold only these tickets. A missing
+    # index is rebuilt in full from `tickets` by the next draw.
+    await db.ticket_rank_index.update_one({"competition_id": competition_id}, {"$inc": inc})
+
+
+async def rebuild_rank_index(db: AsyncIOMotorDatabase, competition_id: str) -> Dict[str, Any]:
+    """
+    Recount sold tickets per block from the tickets collection. Tickets
+    allocated while this runs may be counted twice (by the recount and by
+    record_sold), so rebuild once sales have closed.
+    """
+    counts = {}
+    async for row in db.tickets.aggregate([
+        {"$match": {"competition_id": competition_id}},
+        {"$group": {
+            "_id": {"$floor": {"$divide": [{"$subtract": ["$ticket_number", 1]}, BLOCK_SIZE]}},
+            "count": {"$sum": 1}
+        }}
+    ]):
+        counts[str(int(row["_id"]))] = row["count"]
+
+    index = {
+        "competition_id": competition_id,
+        "block_size": BLOCK_SIZE,
+        "counts": counts,
+        "total": sum(counts.values()),
+    }
+    await db.ticket_rank_index.replace_one({"competition_id": competition_id}, index, upsert=True)
+    logger.info(f"Rebuilt rank index for {competition_id}: {index['total']} tickets in {len(counts)} blocks")
+    return index
+
+
+def derive_ranks(seed: bytes, client_seed: str, competition_id: str, sold: int, count: int) -> List[int]:
+    """
+    Distinct ranks in [0, sold) from HMAC-SHA256(seed, message).
+    Values above the largest multiple of `sold` are rejected so every rank
+    is equally likely (no modulo bias).
+    """
+    limit = (2 ** 256 // sold) * sold
+    ranks: List[int] = []
+    counter = 0
+    while len(ranks) < min(count, sold):
+        message = f"{competition_id}:{client_seed}:{sold}:{counter}".encode()
+        value = int.from_bytes(hmac.new(seed, message, hashlib.sha256).digest(), "big")
+        counter += 1
+        if value >= limit:
+            continue
+        rank = value % sold
+        if rank not in ranks:
+            ranks.append(rank)
+    return ranks
+
+
+def _cumulative(counts: Dict[str, int]) -> Tuple[List[int], List[int]]:
+    blocks = sorted((int(block), count) for block, count in counts.items() if count > 0)
+    cumulative, total = [], 0
+    for _, count in blocks:
+        total += count
+        cumulative.append(total)
+    return [block for block, _ in blocks], cumulative
+
+
+async def select_ticket(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    blocks: List[int],
+    cumulative: List[int],
+    rank: int
+) -> int:
+    """Ticket number of the rank-th smallest sold ticket (0-based)"""
+    position = bisect.bisect_right(cumulative, rank)
+    block = blocks[position]
+    offset = rank - (cumulative[position - 1] if position else 0)
+
+    rows = await db.tickets.find(
+        {
+            "competition_id": competition_id,
+            "ticket_number": {"$gte": block * BLOCK_SIZE + 1, "$lte": (block + 1) * BLOCK_SIZE}
+        },
+        {"_id": 0, "ticket_number": 1}
+    ).sort("ticket_number", 1).skip(offset).limit(1).to_list(1)
+    if not rows:
+        raise RuntimeError(f"Rank index out of date for competition {competition_id}")
+    return rows[0]["ticket_number"]
+
+
+async def create_commitment(db: AsyncIOMotorDatabase, competition_id: str, drawn_by: str) -> Dict[str, Any]:
+    """Generate and store a secret seed; only its SHA-256 is returned"""
+    seed = secrets.token_bytes(32)
+    draw = {
+        "id": str(uuid.uuid4()),
+        "competition_id": competition_id,
+        "status": "committed",
+        "seed": seed.hex(),
+        "commitment": hashlib.sha256(seed).hexdigest(),
+        "drawn_by": drawn_by,
+        "created_at": datetime.utcnow(),
+    }
+    await db.draws.insert_one(draw)
+    return {"id": draw["id"], "competition_id": competition_id, "commitment": draw["commitment"]}
+
+
+async def run_draw(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    winners: int,
+    client_seed: str,
+    drawn_by: str,
+    commitment_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Draw `winners` distinct sold tickets (first is the winner, the rest
+    runners-up), using a previously committed seed when commitment_id is set.
+    """
+    if commitment_id:
+        draw = await db.draws.find_one(
+            {"id": commitment_id, "competition_id": competition_id, "status": "committed"},
+            {"_id": 0}
+        )
+        if draw is None:
+            raise ValueError("Commitment not found or already used")
+        seed = bytes.fromhex(draw["seed"])
+    else:
+        seed = secrets.token_bytes(32)
+        draw = {
+            "id": str(uuid.uuid4()),
+            "competition_id": competition_id,
+            "seed": seed.hex(),
+            "commitment": hashlib.sha256(seed).hexdigest(),
+            "drawn_by": drawn_by,
+            "created_at": datetime.utcnow(),
+        }
+
+    index = await db.ticket_rank_index.find_one({"competition_id": competition_id}, {"_id": 0})
+    if index is None:
+        index = await rebuild_rank_index(db, competition_id)
+
+    sold = index.get("total", 0)
+    if sold == 0:
+        raise ValueError("No tickets have been sold for this competition")
+
+    ranks = derive_ranks(seed, client_seed, competition_id, sold, winners)
+    blocks, cumulative = _cumulative(index.get("counts", {}))
+    ticket_numbers = [
+        await select_ticket(db, competition_id, blocks, cumulative, rank) for rank in ranks
+    ]
+    holders = await resolve_tickets(db, competition_id, ticket_numbers)
+
+    draw.update({
+        "status": "drawn",
+        "client_seed": client_seed,
+        "sold_count": sold,
+        "block_size": BLOCK_SIZE,
+        "results": [
+            {
+                "position": position + 1,
+                "rank": rank,
+                "ticket_number": number,
+                "winner": holders.get(number)
+            }
+            for position, (rank, number) in enumerate(zip(ranks, ticket_numbers))
+        ],
+        "drawn_at": datetime.utcnow(),
+    })
+    if commitment_id:
+        # Only the first draw against a commitment is kept
+        result = await db.draws.replace_one({"id": commitment_id, "status": "committed"}, draw)
+        if result.matched_count == 0:
+            raise ValueError("Commitment not found or already used")
+    else:
+        await db.draws.insert_one(draw)
+    draw.pop("_id", None)
+    return draw
@@ -0,0 +1,216 @@
+"""
+Resized WebP/AVIF derivatives for uploaded competition images.
+Resizing runs in a process pool after the upload response has been sent;
+the resulting variant manifest is stored on the upload's document in
+`db.uploads` and used by serve_upload to pick the best fit for a width.
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+VARIANT_WIDTHS = [
+    int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "320,640,960,1280,1920").split(",") if w.strip()
+]
+VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+MANIFEST_MISS_TTL = 60  # seconds before re-checking uploads without variants
+
+# Preference order when the client accepts several formats
+FORMAT_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_manifests: Dict[str, List[Dict[str, Any]]] = {}
+_manifest_misses: Dict[str, float] = {}
+
+
+def is_image(filename: str) -> bool:
+    return Path(filename).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def variant_formats() -> List[str]:
+    """Formats this Pillow build can encode, best compression first"""
+    from PIL import features
+
+    formats = []
+    if features.check("avif"):
+        formats.append("avif")
+    if features.check("webp"):
+        formats.append("webp")
+    return formats
+
+
+def generate_variants(source: str, widths: List[int], formats: List[str], quality: int) -> List[Dict[str, Any]]:
+    """
+    Write resized copies of `source` next to it and return their manifest.
+    Runs inside a worker process, so it only takes and returns plain data.
+    """
+    from PIL import Image, ImageOps
+
+    source_path = Path(source)
+    variants = []
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        # Never upscale: widths above the original collapse into one full-size variant
+        target_widths = sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))})
+
+        for width in target_widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+            for fmt in formats:
+                filename = f"{source_path.stem}.w{width}.{fmt}"
+                target = source_path.with_name(filename)
+                tmp = source_path.with_name(f".{filename}.part")
+                resized.save(tmp, format=fmt.upper(), quality=quality)
+                os.replace(tmp, target)
+                variants.append({
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "filename": filename,
+                    "bytes": target.stat().st_size,
+                })
+
+    return variants
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def build_variants(db: AsyncIOMotorDatabase, upload_dir: Path, filename: str) -> List[Dict[str, Any]]:
+    """Generate variants for an uploaded image and store the manifest"""
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    try:
+        variants = await loop.run_in_executor(
+            get_executor(),
+            generate_variants,
+            str(upload_dir / filename),
+            VARIANT_WIDTHS,
+            variant_formats(),
+            VARIANT_QUALITY,
+        )
+    except Exception:
+        logger.exception(f"Failed to build image variants for {filename}")
+        await db.uploads.update_one(
+            {"filename": filename},
+            {"$set": {"variants_status": "failed"}}
+        )
+        return []
+
+    await db.uploads.update_one(
+        {"filename": filename},
+        {"$set": {
+            "variants": variants,
+            "variants_status": "ready",
+            "variants_built_at": datetime.utcnow(),
+        }},
+        upsert=True
+    )
+    _manifests[filename] = variants
+    _manifest_misses.pop(filename, None)
+
+    logger.info(
+        f"Built {len(variants)} variants for {filename} in {time.perf_counter() - started:.2f}s"
+    )
+    return variants
+
+
+async def get_manifest(db: AsyncIOMotorDatabase, filename: str) -> List[Dict[str, Any]]:
+    """Variant manifest for an upload, cached per worker"""
+    if filename in _manifests:
+        return _manifests[filename]
+
+    missed_at = _manifest_misses.get(filename)
+    if missed_at is not None and time.monotonic() - missed_at < MANIFEST_MISS_TTL:
+        return []
+
+    upload = await db.uploads.find_one(
+        {"filename": filename, "variants_status": "ready"},
+        {"_id": 0, "variants": 1}
+    )
+    if not upload or not upload.get("variants"):
+        _manifest_misses[filename] = time.monotonic()
+        return []
+
+    _manifests[filename] = upload["variants"]
+    return upload["variants"]
+
+
+def select_variant(variants: List[Dict[str, Any]], width: int, accept: str) -> Optional[Dict[str, Any]]:
+    """
+    Pick the smallest variant at least `width` wide in the best format the
+    client accepts, falling back to the widest one available.
+    Returns None when the client accepts none of the variant formats.
+    """
+    accept = accept or ""
+    formats = [fmt for fmt, mime in FORMAT_MIME_TYPES.items() if mime in accept]
+    for fmt in formats:
+        candidates = sorted((v for v in variants if v["format"] == fmt), key=lambda v: v["width"])
+        if not candidates:
+            continue
+        for variant in candidates:
+            if variant["width"] >= width:
+                return variant
+        return candidates[-1]
+    return None
+
+
+async def backfill():
+    """Build variants for images uploaded before the pipeline existed"""
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    upload_dir = root_dir / "uploads"
+
+    for path in sorted(upload_dir.iterdir()):
+        if not is_image(path.name) or ".w" in path.stem:
+            continue
+        existing = await db.uploads.find_one({"filename": path.name, "variants_status": "ready"})
+        if existing:
+            continue
+        await db.uploads.update_one(
+            {"filename": path.name},
+            {"$setOnInsert": {"filename": path.name, "size": path.stat().st_size,
+                              "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        variants = await build_variants(db, upload_dir, path.name)
+        print(f"✅ {path.name}: {len(variants)} variants")
+
+    shutdown()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,201 @@
+"""
+MongoDB indexes backing the hot queries, created idempotently at startup.
+
+INDEXES is the registry of every index the app relies on; HOT_QUERIES lists
+the lookups those indexes exist for, and tests/test_index_plans.py fails if
+any of them is planned as a collection scan. Apply the registry to a
+database (and check the plans) from the command line with:
+
+    python indexes.py [--check]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+import sales_velocity
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+    ],
+    "competitions": [
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+        IndexModel([("tags", ASCENDING)], name="tags"),
+    ],
+    "carts": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+    ],
+    "coupons": [
+        IndexModel([("code", ASCENDING)], name="code", unique=True),
+    ],
+    "uploads": [
+        IndexModel([("filename", ASCENDING)], name="filename", unique=True),
+    ],
+    "competition_entries": [
+        IndexModel(
+            [("competition_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="competition_id_created_at_id"
+        ),
+        IndexModel([("competition_id", ASCENDING), ("order_id", ASCENDING)], name="competition_id_order_id"),
+    ],
+    "tickets": [
+        # Also what makes concurrent allocation of the same number fail safely
+        IndexModel(
+            [("competition_id", ASCENDING), ("ticket_number", ASCENDING)],
+            name="competition_id_ticket_number", unique=True
+        ),
+        IndexModel([("order_id", ASCENDING)], name="order_id"),
+    ],
+    "ticket_rank_index": [
+        IndexModel([("competition_id", ASCENDING)], name="competition_id", unique=True),
+    ],
+    "draws": [
+        IndexModel([("competition_id", ASCENDING), ("created_at", DESCENDING)], name="competition_id_created_at"),
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+    ],
+    "instant_win_numbers": [
+        IndexModel([("competition_id", ASCENDING)], name="competition_id", unique=True),
+    ],
+    "sales_buckets": [
+        IndexModel(
+            [("competition_id", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING)],
+            name="competition_id_granularity_start", unique=True
+        ),
+        IndexModel(
+            [("start", ASCENDING)], name="minute_bucket_ttl",
+            expireAfterSeconds=sales_velocity.MINUTE_RETENTION_DAYS * 86400,
+            partialFilterExpression={"granularity": "minute"}
+        ),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="id", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+        IndexModel([("order_number", DESCENDING)], name="order_number"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel(
+            [("payment_status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="payment_status_created_at_id"
+        ),
+        IndexModel(
+            [("payment_method", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="payment_method_created_at_id"
+        ),
+    ],
+}
+
+
+class HotQuery(NamedTuple):
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Any]] = None
+
+
+# Representative shapes of the frequent lookups, with placeholder values
+HOT_QUERIES = {
+    "user by email": HotQuery("users", {"email": "user@example.com"}),
+    "user by id": HotQuery("users", {"id": "user-id"}),
+    "competition by id": HotQuery("competitions", {"id": "competition-id"}),
+    "competitions by tag": HotQuery("competitions", {"tags": "jackpot"}),
+    "cart by user": HotQuery("carts", {"user_id": "user-id"}),
+    "coupon by code": HotQuery("coupons", {"code": "SAVE10", "is_active": True}),
+    "upload by filename": HotQuery("uploads", {"filename": "a.jpg"}),
+    "ticket by number": HotQuery("tickets", {"competition_id": "competition-id", "ticket_number": 7}),
+    "tickets by order": HotQuery("tickets", {"order_id": "order-id"}),
+    "user orders": HotQuery("orders", {"user_id": "user-id"}, [("created_at", DESCENDING)]),
+    "order by id": HotQuery("orders", {"id": "order-id", "user_id": "user-id"}),
+    "last order number": HotQuery("orders", {}, [("order_number", DESCENDING)]),
+    "admin orders page": HotQuery("orders", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    "admin orders by status": HotQuery(
+        "orders", {"payment_status": "completed"}, [("created_at", DESCENDING), ("id", DESCENDING)]
+    ),
+    "competition entries": HotQuery(
+        "competition_entries", {"competition_id": "competition-id"}, [("created_at", DESCENDING), ("id", DESCENDING)]
+    ),
+    "entries by order": HotQuery(
+        "competition_entries", {"competition_id": "competition-id", "order_id": {"$in": ["order-id"]}}
+    ),
+    "rank index": HotQuery("ticket_rank_index", {"competition_id": "competition-id"}),
+    "instant-win numbers": HotQuery("instant_win_numbers", {"competition_id": "competition-id"}),
+    "sales series": HotQuery(
+        "sales_buckets", {"competition_id": "competition-id", "granularity": "hour", "start": {"$gte": datetime(2024, 1, 1)}},
+        [("start", ASCENDING)]
+    ),
+}
+
+
+def plan_stages(explain: Dict[str, Any]) -> Set[str]:
+    """Every stage name in the winning plan of an explain() result"""
+    stages: Set[str] = set()
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.add(node["stage"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    return stages
+
+
+async def explain_hot_queries(db: AsyncIOMotorDatabase) -> Dict[str, Set[str]]:
+    """Winning-plan stages for each hot query"""
+    plans = {}
+    for name, query in HOT_QUERIES.items():
+        cursor = db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        plans[name] = plan_stages(await cursor.explain())
+    return plans
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Create any missing indexes; existing ones with the same spec are a no-op"""
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {collection}: {e}")
+
+
+async def _main(check: bool) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        await ensure_indexes(db)
+        for collection in INDEXES:
+            print(f"{collection}: {', '.join(sorted(await db[collection].index_information()))}")
+        if check:
+            scans = 0
+            for name, stages in (await explain_hot_queries(db)).items():
+                scans += "COLLSCAN" in stages
+                print(f"{'COLLSCAN' if 'COLLSCAN' in stages else 'ok':8} {name}: {', '.join(sorted(stages))}")
+            if scans:
+                raise SystemExit(f"{scans} hot queries fall back to a collection scan")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Create the registered MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="Also explain the hot queries and fail on COLLSCAN")
+    asyncio.run(_main(parser.parse_args().check))
@@ -0,0 +1,177 @@
+"""
+Generated instant-win numbers.
+
+Admins generate N unique winning numbers per prize tier in one vectorised
+draw without replacement (numpy Generator.choice). The numbers are stored
+outside the competition document, in one `instant_win_numbers` document per
+competition, as sorted little-endian uint32 arrays (4 bytes per number), so
+catalogue reads never carry them.
+
+At allocation time the tiers are merged into a single sorted array and
+each ticket is checked with a binary search. When a competition has no
+generated numbers, the comma-separated `InstantWin.numbers` strings on the
+competition are used instead.
+"""
+import bisect
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+if TYPE_CHECKING:
+    from repositories import CompetitionRepository
+
+INSTANT_WIN_CACHE_TTL = float(os.environ.get("INSTANT_WIN_CACHE_TTL", 60))  # seconds
+# "Nothing generated" is cached for less time: numbers generated through another
+# worker are picked up by this one within this many seconds
+INSTANT_WIN_MISS_CACHE_TTL = float(os.environ.get("INSTANT_WIN_MISS_CACHE_TTL", 10))
+MAX_INSTANT_WIN_NUMBERS = 2_000_000  # 8 MB of uint32, well inside the 16 MB document limit
+
+_DTYPE = np.dtype("<u4")
+
+TIER_FIELDS = ("name", "amount", "wallet_type")
+
+
+class InstantWinLookup:
+    """Sorted winning numbers with the tier each one belongs to"""
+
+    def __init__(self, tiers: List[Dict[str, Any]], numbers: List[np.ndarray]):
+        self.tiers = tiers
+        if numbers:
+            merged = np.concatenate(numbers)
+            tier_index = np.concatenate([np.full(len(n), i, dtype=np.int32) for i, n in enumerate(numbers)])
+            order = np.argsort(merged, kind="stable")
+            self.numbers = merged[order]
+            self.tier_index = tier_index[order]
+        else:
+            self.numbers = np.empty(0, dtype=_DTYPE)
+            self.tier_index = np.empty(0, dtype=np.int32)
+        # Per-ticket checks bisect plain lists: numpy's per-call overhead dominates single lookups
+        self._numbers = self.numbers.tolist()
+        self._tier_index = self.tier_index.tolist()
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def match(self, ticket_number: int) -> Optional[Dict[str, Any]]:
+        """The tier a ticket number wins, or None"""
+        position = bisect.bisect_left(self._numbers, ticket_number)
+        if position < len(self._numbers) and self._numbers[position] == ticket_number:
+            return self.tiers[self._tier_index[position]]
+        return None
+
+
+def generate_numbers(max_tickets: int, quantities: List[int], seed: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Unique ticket numbers in [1, max_tickets], `quantities[i]` of them for
+    tier i, with no number shared between tiers. Each array is sorted.
+    """
+    total = sum(quantities)
+    if any(qty <= 0 for qty in quantities):
+        raise ValueError("Each prize tier needs a quantity of at least 1")
+    if total > max_tickets:
+        raise ValueError(f"Cannot pick {total} winning numbers from {max_tickets} tickets")
+    if total > MAX_INSTANT_WIN_NUMBERS:
+        raise ValueError(f"At most {MAX_INSTANT_WIN_NUMBERS} instant-win numbers are supported")
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(max_tickets, size=total, replace=False).astype(_DTYPE) + 1
+    bounds = np.cumsum(quantities)[:-1]
+    return [np.sort(part) for part in np.split(picked, bounds)]
+
+
+async def save_numbers(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    max_tickets: int,
+    tiers: List[Dict[str, Any]],
+    numbers: List[np.ndarray]
+) -> Dict[str, Any]:
+    """Replace the competition's generated numbers; returns the summary"""
+    doc = {
+        "competition_id": competition_id,
+        "max_tickets": max_tickets,
+        "tiers": [
+            {
+                **{field: tier.get(field) for field in TIER_FIELDS},
+                "count": len(tier_numbers),
+                "numbers": tier_numbers.astype(_DTYPE).tobytes(),
+            }
+            for tier, tier_numbers in zip(tiers, numbers)
+        ],
+        "generated_at": datetime.utcnow(),
+    }
+    await db.instant_win_numbers.replace_one({"competition_id": competition_id}, doc, upsert=True)
+    invalidate(competition_id)
+    return summary(doc)
+
+
+def summary(doc: Dict[str, Any], include_numbers: bool = False) -> Dict[str, Any]:
+    """JSON-friendly view of a stored document"""
+    tiers = []
+    for tier in doc["tiers"]:
+        view = {field: tier.get(field) for field in TIER_FIELDS}
+        view["count"] = tier["count"]
+        if include_numbers:
+            view["numbers"] = np.frombuffer(tier["numbers"], dtype=_DTYPE).tolist()
+        tiers.append(view)
+    return {
+        "competition_id": doc["competition_id"],
+        "max_tickets": doc["max_tickets"],
+        "total": sum(tier["count"] for tier in doc["tiers"]),
+        "tiers": tiers,
+        "generated_at": doc["generated_at"],
+    }
+
+
+# Per-worker cache of generated lookups; None records "nothing generated"
+_lookups: Dict[str, Tuple[Optional[InstantWinLookup], float]] = {}
+
+
+def invalidate(competition_id: str) -> None:
+    _lookups.pop(competition_id, None)
+
+
+async def _generated_lookup(competitions: "CompetitionRepository", competition_id: str) -> Optional[InstantWinLookup]:
+    entry = _lookups.get(competition_id)
+    if entry is not None:
+        ttl = INSTANT_WIN_CACHE_TTL if entry[0] is not None else INSTANT_WIN_MISS_CACHE_TTL
+        if time.monotonic() - entry[1] < ttl:
+            return entry[0]
+
+    doc = await competitions.get_instant_win_numbers(competition_id)
+    lookup = None
+    if doc is not None:
+        lookup = InstantWinLookup(
+            [{field: tier.get(field) for field in TIER_FIELDS} for tier in doc["tiers"]],
+            [np.frombuffer(tier["numbers"], dtype=_DTYPE) for tier in doc["tiers"]]
+        )
+    _lookups[competition_id] = (lookup, time.monotonic())
+    return lookup
+
+
+def _legacy_lookup(instant_wins: List[Dict[str, Any]]) -> InstantWinLookup:
+    """Lookup from the comma-separated numbers typed into InstantWin.numbers"""
+    tiers, numbers = [], []
+    for win in instant_wins or []:
+        try:
+            parsed = [int(n.strip()) for n in win.get("numbers", "").split(",") if n.strip()]
+        except ValueError:
+            continue
+        if parsed:
+            tiers.append({field: win.get(field) for field in TIER_FIELDS})
+            numbers.append(np.array(parsed, dtype=np.int64))
+    return InstantWinLookup(tiers, numbers)
+
+
+async def get_lookup(
+    competitions: "CompetitionRepository",
+    competition_id: str,
+    instant_wins: List[Dict[str, Any]]
+) -> InstantWinLookup:
+    """Generated numbers when present, otherwise the competition's own instant_wins"""
+    lookup = await _generated_lookup(competitions, competition_id)
+    return lookup if lookup is not None else _legacy_lookup(instant_wins)
@@ -0,0 +1,186 @@
+"""
+Lightweight in-process metrics registry (counters, gauges and histograms).
+Values are per worker process; render_prometheus() produces the text
+exposition format served on /metrics.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Any
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(key), "value": value} for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, value: float = 1.0, **labels) -> None:
+        self.inc(-value, **labels)
+
+
+# Seconds; covers fast cached reads through slow checkouts
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, optionally split by labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the block, even if it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                cumulative["+Inf" if bound == math.inf else _format_value(bound)] = running
+            samples.append({"labels": dict(key), "buckets": cumulative, "sum": total, "count": running})
+        return samples
+
+
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, description: str, **options):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description, **options)
+            _registry[name] = metric
+        elif type(metric) is not cls:
+            raise ValueError(f"Metric '{name}' already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name: str, description: str) -> Gauge:
+    return _get_or_create(Gauge, name, description)
+
+
+def histogram(name: str, description: str, buckets: Optional[Sequence[float]] = None) -> Histogram:
+    return _get_or_create(Histogram, name, description, buckets=buckets or DEFAULT_BUCKETS)
+
+
+def snapshot() -> Dict[str, Any]:
+    """JSON-friendly view of every registered metric"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {
+        metric.name: {
+            "type": metric.kind,
+            "description": metric.description,
+            "samples": metric.samples(),
+        }
+        for metric in metrics
+    }
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (0.0.4)"""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample in metric.samples():
+            labels = sample["labels"]
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(sample['value'])}")
+                continue
+            for bound, count in sample["buckets"].items():
+                lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {sample['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+"""
+Convert ISO-string timestamps stored by earlier releases to BSON dates.
+
+    python migrate_timestamps.py [--batch-size 1000] [--dry-run] [--restart]
+
+Each collection is walked in _id order, one batch per round trip, and every
+string in a TIMESTAMP_FIELDS field is parsed and written back as a date.
+Updates are guarded on the old value, so a document the app changed in the
+meantime is left alone. Progress is checkpointed in the `migrations`
+collection after each batch; an interrupted run resumes where it stopped.
+Run it once the release writing dates is deployed everywhere, then once
+more with --restart to pick up strings written behind the checkpoint by
+workers that were still on the old release (re-running is harmless).
+
+Until it has run, queries comparing created_at with a date don't match
+rows still holding a string, so keyset pages after the first (created_at
+$lt the cursor's date) skip them.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "timestamps_to_dates"
+
+TIMESTAMP_FIELDS = {
+    "users": ["created_at"],
+    "competitions": ["created_at", "updated_at", "draw_date"],
+    "carts": ["updated_at"],
+    "orders": ["created_at"],
+    "competition_entries": ["created_at"],
+    "tickets": ["created_at"],
+    "coupons": ["created_at"],
+    "uploads": ["created_at", "variants_built_at"],
+    "theme_settings": ["updated_at"],
+    "draws": ["created_at", "drawn_at"],
+    "instant_win_numbers": ["generated_at"],
+    "stats_rollups": ["built_at"],
+}
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Naive UTC datetime from an ISO string, or None if it isn't one"""
+    if value.endswith("Z"):  # fromisoformat only accepts it from Python 3.11
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+async def migrate_collection(
+    db: AsyncIOMotorDatabase,
+    collection: str,
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """Convert one collection from its checkpoint onwards; returns the counts for this run"""
+    fields = TIMESTAMP_FIELDS[collection]
+    state = await db.migrations.find_one({"id": MIGRATION_ID}, {"_id": 0, f"collections.{collection}": 1}) or {}
+    last_id: Any = state.get("collections", {}).get(collection, {}).get("last_id")
+    counts = {"scanned": 0, "converted": 0, "unparseable": 0}
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await db[collection].find(query, {field: 1 for field in fields}).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                parsed = parse_timestamp(value)
+                if parsed is None:
+                    counts["unparseable"] += 1
+                    logger.warning(f"{collection} {doc['_id']}: cannot parse {field}={value!r}")
+                    continue
+                updates.append(UpdateOne({"_id": doc["_id"], field: value}, {"$set": {field: parsed}}))
+        counts["scanned"] += len(batch)
+        counts["converted"] += len(updates)
+        last_id = batch[-1]["_id"]
+
+        if dry_run:
+            continue
+        if updates:
+            await db[collection].bulk_write(updates, ordered=False)
+        await db.migrations.update_one(
+            {"id": MIGRATION_ID},
+            {
+                "$set": {f"collections.{collection}.last_id": last_id, "updated_at": datetime.utcnow()},
+                "$inc": {f"collections.{collection}.converted": len(updates)},
+            },
+            upsert=True
+        )
+
+    return counts
+
+
+async def migrate(
+    db: AsyncIOMotorDatabase,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    restart: bool = False
+) -> Dict[str, Dict[str, int]]:
+    if restart and not dry_run:
+        await db.migrations.delete_one({"id": MIGRATION_ID})
+    results = {}
+    for collection in TIMESTAMP_FIELDS:
+        results[collection] = await migrate_collection(db, collection, batch_size, dry_run)
+        logger.info(f"{collection}: {results[collection]}")
+    return results
+
+
+async def _main(args) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        results = await migrate(db, args.batch_size, args.dry_run, args.restart)
+        for collection, counts in results.items():
+            verb = "would convert" if args.dry_run else "converted"
+            print(f"{collection}: scanned {counts['scanned']}, {verb} {counts['converted']}, "
+                  f"unparseable {counts['unparseable']}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to BSON dates")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents read per round trip")
+    parser.add_argument("--dry-run", action="store_true", help="Count what would change without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
+    asyncio.run(_main(parser.parse_args()))
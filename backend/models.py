@@ -31,7 +31,7 @@ class CompetitionEntry(BaseModel):
     quantity: int
     total_paid: float
     order_id: str
-    created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Competition(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -70,7 +70,7 @@ class Competition(BaseModel):
     winner_name: Optional[str] = None
     winner_email: Optional[str] = None
     winning_ticket_number: Optional[int] = None
-    draw_date: Optional[str] = None
+    draw_date: Optional[datetime] = None
     display_order: int = 0  # For ordering finished competitions
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -233,6 +233,7 @@ class Order(BaseModel):
     user_name: str = ""
     total: float
     discount: float = 0.0
+    coupon_code: str = ""  # Card orders redeem it when the payment is captured
     payment_method: str = "site_credit"  # "site_credit", "cash", "card"
     payment_status: str = "pending"  # "pending", "completed", "failed"
     ticket_count: int
@@ -250,6 +251,7 @@ class User(BaseModel):
     site_credit_balance: float = 0.0
     cash_balance: float = 0.0
     is_admin: bool = False
+    profile_version: int = 0  # Bumped on every profile/balance change (see user_cache.py)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -285,3 +287,18 @@ class PaymentJobRequest(BaseModel):
 
 class CheckoutRequest(BaseModel):
     payment_method: str  # "site_credit", "cash", "card"
+
+
+class TicketLookupRequest(BaseModel):
+    ticket_numbers: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+class DrawRequest(BaseModel):
+    winners: int = Field(default=1, ge=1, le=100)  # 1 winner + (winners - 1) runners-up
+    client_seed: str = ""  # Public randomness mixed into the draw, e.g. a lottery result
+    commitment_id: Optional[str] = None  # From /draw/commit for a commit-reveal draw
+
+
+class InstantWinGenerateRequest(BaseModel):
+    tiers: List[InstantWin] = Field(..., min_length=1)  # `numbers` is ignored; `qty` are generated per tier
+    seed: Optional[int] = None  # Fixed seed for a reproducible draw
@@ -0,0 +1,53 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+Cursors are opaque to clients: URL-safe base64 of the last row's sort key.
+created_at is a BSON date; cursors issued while it was an ISO string decode
+to dates too, so they keep working after migrate_timestamps.py has run.
+Rows still holding a string never match `$lt` a date, so pages after the
+first skip them until the migration has run.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    created_at = row["created_at"]
+    if isinstance(created_at, str):  # not migrated yet
+        created_at = datetime.fromisoformat(created_at)
+    key = ["d", created_at.isoformat(), row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        _kind, created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_query(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Add the "rows after this cursor" condition to a filter"""
+    if not cursor:
+        return query
+    created_at, row_id = decode_cursor(cursor)
+    after = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": row_id}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+
+def page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a limit + 1 fetch to `limit` rows and the cursor for the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
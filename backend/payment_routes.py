@@ -5,6 +5,8 @@ import json
 import logging
 from cashflows_service import CashflowsService
 from auth import get_current_user
+from coupon_cache import store_coupon, invalidate_coupon
+from repositories import Repositories, get_repositories
 
 logger = logging.getLogger(__name__)
 
@@ -66,8 +68,28 @@ async def create_payment(
             detail=str(e)
         )
 
+async def complete_card_order(repos: Repositories, order_id: str) -> Optional[dict]:
+    """Mark a pending card order paid, redeem its coupon and count its revenue.
+    Returns None when the order isn't pending, so a retried webhook is a no-op."""
+    order = await repos.orders.mark_paid(order_id)
+    if order is None:
+        return None
+    
+    coupon_code = order.get("coupon_code", "")
+    if coupon_code:
+        redeemed = await repos.coupons.redeem(coupon_code)
+        if redeemed:
+            store_coupon(coupon_code, redeemed)
+        else:
+            # The customer has paid the discounted total: keep the order, flag the overrun
+            invalidate_coupon(coupon_code)
+            logger.warning(f"Order {order_id} paid with coupon {coupon_code} that has no uses left")
+    
+    await repos.analytics.record_payment(order["total"], created_at=order["created_at"])
+    return order
+
 @router.post("/webhooks/cashflows")
-async def handle_cashflows_webhook(request: Request):
+async def handle_cashflows_webhook(request: Request, repos: Repositories = Depends(get_repositories)):
     """Handle webhook notifications from Cashflows"""
     try:
         body = await request.body()
@@ -92,8 +114,10 @@ async def handle_cashflows_webhook(request: Request):
         
         logger.info(f"Webhook received: Payment {payment_ref} - Status: {payment_status}")
         
-        # TODO: Update your database with payment status
-        # Handle different statuses: authorized, captured, declined, failed
+        if payment_status == "captured" and order_ref:
+            await complete_card_order(repos, order_ref)
+        
+        # TODO: Handle the other statuses: authorized, declined, failed
         
         return {"status": "received"}
         
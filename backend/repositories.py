@@ -0,0 +1,720 @@
+"""
+Data access for the storefront: users, competitions, carts, orders, tickets
+and coupons, plus the analytics counters checkout updates.
+
+Handlers get a Repositories bundle through the get_repositories dependency.
+The Motor implementation is what the server runs on; the in-memory one
+keeps everything in dicts so business logic can be exercised and
+benchmarked without a database. Both keep the semantics the handlers rely
+on:
+  - unique keys (user email and id, competition id, cart per user, order id,
+    coupon code, ticket number per competition) raise DuplicateKeyError,
+  - balance debits and coupon redemptions are guarded: they only apply when
+    the balance covers the amount or the coupon has uses left, as a single
+    atomic step,
+  - counters ($inc) never lose concurrent updates.
+In-memory methods never await between reading and writing, so each call is
+atomic on the event loop. Documents are copied in and out, like a database
+round trip.
+"""
+import copy
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import admin_stats
+import draw_engine
+import sales_velocity
+from coupon_cache import is_used_up
+from user_cache import BUMP_VERSION
+
+Doc = Dict[str, Any]
+Projection = Optional[Dict[str, Any]]
+
+NO_ID = {"_id": 0}
+
+
+def _cleared_cart() -> Doc:
+    return {"items": [], "discount": 0.0, "coupon_code": "", "updated_at": datetime.utcnow()}
+
+
+# ============================================================================
+# INTERFACES
+# ============================================================================
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def find_by_email(self, email: str) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def find_by_id(self, user_id: str, projection: Projection = None) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def insert(self, user: Doc) -> None: ...
+
+    @abstractmethod
+    async def debit(self, user_id: str, balance_key: str, amount: float, projection: Projection = None) -> Optional[Doc]:
+        """Subtract `amount` if the balance covers it; the updated user, or None"""
+
+    @abstractmethod
+    async def credit(self, user_id: str, balance_key: str, amount: float) -> None: ...
+
+
+class CompetitionRepository(ABC):
+    @abstractmethod
+    async def list(self, tag: Optional[str] = None, projection: Projection = None) -> List[Doc]: ...
+
+    @abstractmethod
+    async def get(self, competition_id: str, projection: Projection = None) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def insert(self, competition: Doc) -> None: ...
+
+    @abstractmethod
+    async def update(self, competition_id: str, fields: Doc) -> bool:
+        """Set fields; False if there is no such competition"""
+
+    @abstractmethod
+    async def delete(self, competition_id: str) -> bool: ...
+
+    @abstractmethod
+    async def inc_tickets_sold(self, competition_id: str, quantity: int) -> None: ...
+
+    @abstractmethod
+    async def get_instant_win_numbers(self, competition_id: str) -> Optional[Doc]:
+        """Generated instant-win numbers (see instant_wins), or None"""
+
+
+class CartRepository(ABC):
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def add_item(self, user_id: str, item: Doc) -> Doc:
+        """Add to the item's quantity, or append it (creating the cart); returns the cart"""
+
+    @abstractmethod
+    async def set_quantity(self, user_id: str, competition_id: str, quantity: int) -> Optional[Doc]:
+        """Set an item's quantity, removing it when <= 0; the cart, or None if there is none"""
+
+    @abstractmethod
+    async def set_coupon(self, user_id: str, code: str, discount: float) -> None: ...
+
+    @abstractmethod
+    async def clear(self, user_id: str) -> None: ...
+
+
+class OrderRepository(ABC):
+    @abstractmethod
+    async def last_order_number(self) -> Optional[int]: ...
+
+    @abstractmethod
+    async def insert(self, order: Doc) -> None: ...
+
+    @abstractmethod
+    async def list_for_user(self, user_id: str, limit: int) -> List[Doc]:
+        """Newest first"""
+
+    @abstractmethod
+    async def get_for_user(self, order_id: str, user_id: str) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def insert_entry(self, entry: Doc) -> None:
+        """Competition entry created for each competition in an order"""
+
+    @abstractmethod
+    async def mark_paid(self, order_id: str) -> Optional[Doc]:
+        """Set a pending order to completed; the updated order, or None if it wasn't pending"""
+
+
+class TicketRepository(ABC):
+    @abstractmethod
+    async def exists(self, competition_id: str, ticket_number: int) -> bool: ...
+
+    @abstractmethod
+    async def insert(self, ticket: Doc) -> None:
+        """Raises DuplicateKeyError if the number is already taken in the competition"""
+
+    @abstractmethod
+    async def delete_for_order(self, order_id: str) -> None: ...
+
+    @abstractmethod
+    async def instant_wins_for_order(self, order_id: str, competition_id: str) -> List[Doc]: ...
+
+    @abstractmethod
+    async def record_sold(self, competition_id: str, ticket_numbers: List[int]) -> None:
+        """Keep the draw rank index in step with allocation"""
+
+
+class CouponRepository(ABC):
+    @abstractmethod
+    async def find_active(self, code: str) -> Optional[Doc]: ...
+
+    @abstractmethod
+    async def redeem(self, code: str) -> Optional[Doc]:
+        """Count one use if the coupon is active and under max_uses; the updated coupon, or None"""
+
+    @abstractmethod
+    async def release(self, code: str) -> None:
+        """Give back a use taken by redeem when the checkout doesn't go through"""
+
+
+class AnalyticsRepository(ABC):
+    @abstractmethod
+    async def record_user(self) -> None: ...
+
+    @abstractmethod
+    async def record_competition(self, delta: int = 1) -> None: ...
+
+    @abstractmethod
+    async def record_order(self, total: float, completed: bool, created_at: datetime) -> None: ...
+
+    @abstractmethod
+    async def record_payment(self, total: float, created_at: datetime) -> None:
+        """Revenue of a pending order whose payment was captured"""
+
+    @abstractmethod
+    async def record_sale(self, competition_id: str, tickets: int, revenue: float, at: datetime) -> None: ...
+
+
+class Repositories:
+    def __init__(
+        self,
+        users: UserRepository,
+        competitions: CompetitionRepository,
+        carts: CartRepository,
+        orders: OrderRepository,
+        tickets: TicketRepository,
+        coupons: CouponRepository,
+        analytics: AnalyticsRepository
+    ):
+        self.users = users
+        self.competitions = competitions
+        self.carts = carts
+        self.orders = orders
+        self.tickets = tickets
+        self.coupons = coupons
+        self.analytics = analytics
+
+
+def get_repositories(request: Request) -> Repositories:
+    """FastAPI dependency; the bundle is set on app.state at import time"""
+    return request.app.state.repositories
+
+
+# ============================================================================
+# MOTOR
+# ============================================================================
+
+class MotorUserRepository(UserRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def find_by_email(self, email):
+        return await self.db.users.find_one({"email": email}, NO_ID)
+
+    async def find_by_id(self, user_id, projection=None):
+        return await self.db.users.find_one({"id": user_id}, projection or NO_ID)
+
+    async def insert(self, user):
+        await self.db.users.insert_one(dict(user))
+
+    async def debit(self, user_id, balance_key, amount, projection=None):
+        return await self.db.users.find_one_and_update(
+            {"id": user_id, balance_key: {"$gte": amount}},
+            {"$inc": {balance_key: -amount, **BUMP_VERSION}},
+            projection=projection or NO_ID,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def credit(self, user_id, balance_key, amount):
+        await self.db.users.update_one({"id": user_id}, {"$inc": {balance_key: amount, **BUMP_VERSION}})
+
+
+class MotorCompetitionRepository(CompetitionRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def list(self, tag=None, projection=None):
+        query = {"tags": tag} if tag else {}
+        return await self.db.competitions.find(query, projection or NO_ID).to_list(1000)
+
+    async def get(self, competition_id, projection=None):
+        return await self.db.competitions.find_one({"id": competition_id}, projection or NO_ID)
+
+    async def insert(self, competition):
+        await self.db.competitions.insert_one(dict(competition))
+
+    async def update(self, competition_id, fields):
+        result = await self.db.competitions.update_one({"id": competition_id}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def delete(self, competition_id):
+        result = await self.db.competitions.delete_one({"id": competition_id})
+        if result.deleted_count == 0:
+            return False
+        await self.db.instant_win_numbers.delete_one({"competition_id": competition_id})
+        return True
+
+    async def inc_tickets_sold(self, competition_id, quantity):
+        await self.db.competitions.update_one({"id": competition_id}, {"$inc": {"tickets_sold": quantity}})
+
+    async def get_instant_win_numbers(self, competition_id):
+        return await self.db.instant_win_numbers.find_one({"competition_id": competition_id}, NO_ID)
+
+
+class MotorCartRepository(CartRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def get(self, user_id):
+        return await self.db.carts.find_one({"user_id": user_id}, NO_ID)
+
+    async def add_item(self, user_id, item):
+        while True:
+            # Already in the cart: bump the quantity in place
+            cart = await self.db.carts.find_one_and_update(
+                {"user_id": user_id, "items.competition_id": item["competition_id"]},
+                {"$inc": {"items.$.quantity": item["quantity"]}, "$set": {"updated_at": datetime.utcnow()}},
+                projection=NO_ID,
+                return_document=ReturnDocument.AFTER
+            )
+            if cart is not None:
+                return cart
+            # Otherwise append it, creating the cart if needed. If the item or the
+            # cart appeared in the meantime the upsert hits the unique user_id index
+            # and the next pass takes the $inc branch (or appends to the new cart).
+            try:
+                return await self.db.carts.find_one_and_update(
+                    {"user_id": user_id, "items.competition_id": {"$ne": item["competition_id"]}},
+                    {
+                        "$push": {"items": item},
+                        "$set": {"updated_at": datetime.utcnow()},
+                        "$setOnInsert": {"id": str(uuid.uuid4()), "discount": 0.0, "coupon_code": ""},
+                    },
+                    projection=NO_ID,
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                continue
+
+    async def set_quantity(self, user_id, competition_id, quantity):
+        if quantity <= 0:
+            query = {"user_id": user_id}
+            update = {"$pull": {"items": {"competition_id": competition_id}}}
+        else:
+            query = {"user_id": user_id, "items.competition_id": competition_id}
+            update = {"$set": {"items.$.quantity": quantity}}
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        cart = await self.db.carts.find_one_and_update(
+            query, update, projection=NO_ID, return_document=ReturnDocument.AFTER
+        )
+        if cart is None:
+            # The item isn't in the cart (or there is no cart): nothing to change
+            cart = await self.get(user_id)
+        return cart
+
+    async def set_coupon(self, user_id, code, discount):
+        await self.db.carts.update_one(
+            {"user_id": user_id},
+            {"$set": {"discount": discount, "coupon_code": code, "updated_at": datetime.utcnow()}}
+        )
+
+    async def clear(self, user_id):
+        await self.db.carts.update_one({"user_id": user_id}, {"$set": _cleared_cart()})
+
+
+class MotorOrderRepository(OrderRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def last_order_number(self):
+        last_order = await self.db.orders.find_one({}, {"_id": 0, "order_number": 1}, sort=[("order_number", -1)])
+        return last_order.get("order_number", 0) if last_order else None
+
+    async def insert(self, order):
+        await self.db.orders.insert_one(dict(order))
+
+    async def list_for_user(self, user_id, limit):
+        return await self.db.orders.find({"user_id": user_id}, NO_ID).sort("created_at", -1).to_list(limit)
+
+    async def get_for_user(self, order_id, user_id):
+        return await self.db.orders.find_one({"id": order_id, "user_id": user_id}, NO_ID)
+
+    async def insert_entry(self, entry):
+        await self.db.competition_entries.insert_one(dict(entry))
+
+    async def mark_paid(self, order_id):
+        return await self.db.orders.find_one_and_update(
+            {"id": order_id, "payment_status": "pending"},
+            {"$set": {"payment_status": "completed"}},
+            projection=NO_ID,
+            return_document=ReturnDocument.AFTER
+        )
+
+
+class MotorTicketRepository(TicketRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def exists(self, competition_id, ticket_number):
+        return await self.db.tickets.find_one(
+            {"competition_id": competition_id, "ticket_number": ticket_number}, {"_id": 1}
+        ) is not None
+
+    async def insert(self, ticket):
+        await self.db.tickets.insert_one(dict(ticket))
+
+    async def delete_for_order(self, order_id):
+        await self.db.tickets.delete_many({"order_id": order_id})
+
+    async def instant_wins_for_order(self, order_id, competition_id):
+        return await self.db.tickets.find(
+            {"order_id": order_id, "competition_id": competition_id, "is_instant_win": True}, NO_ID
+        ).to_list(None)
+
+    async def record_sold(self, competition_id, ticket_numbers):
+        await draw_engine.record_sold(self.db, competition_id, ticket_numbers)
+
+
+class MotorCouponRepository(CouponRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def find_active(self, code):
+        return await self.db.coupons.find_one({"code": code, "is_active": True}, NO_ID)
+
+    async def redeem(self, code):
+        return await self.db.coupons.find_one_and_update(
+            {"code": code, "is_active": True, "$or": [
+                {"max_uses": {"$lte": 0}},
+                {"$expr": {"$lt": ["$times_used", "$max_uses"]}},
+            ]},
+            {"$inc": {"times_used": 1}},
+            projection=NO_ID,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def release(self, code):
+        await self.db.coupons.update_one({"code": code, "times_used": {"$gt": 0}}, {"$inc": {"times_used": -1}})
+
+
+class MotorAnalyticsRepository(AnalyticsRepository):
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def record_user(self):
+        await admin_stats.record_user(self.db)
+
+    async def record_competition(self, delta=1):
+        await admin_stats.record_competition(self.db, delta)
+
+    async def record_order(self, total, completed, created_at):
+        await admin_stats.record_order(self.db, total, completed=completed, created_at=created_at)
+
+    async def record_payment(self, total, created_at):
+        await admin_stats.record_payment(self.db, total, created_at=created_at)
+
+    async def record_sale(self, competition_id, tickets, revenue, at):
+        await sales_velocity.record_sale(self.db, competition_id, tickets, revenue, at=at)
+
+
+def motor_repositories(db: AsyncIOMotorDatabase) -> Repositories:
+    return Repositories(
+        users=MotorUserRepository(db),
+        competitions=MotorCompetitionRepository(db),
+        carts=MotorCartRepository(db),
+        orders=MotorOrderRepository(db),
+        tickets=MotorTicketRepository(db),
+        coupons=MotorCouponRepository(db),
+        analytics=MotorAnalyticsRepository(db),
+    )
+
+
+# ============================================================================
+# IN-MEMORY
+# ============================================================================
+
+def _remove_path(doc: Any, path: List[str]) -> None:
+    if isinstance(doc, list):
+        for item in doc:
+            _remove_path(item, path)
+    elif isinstance(doc, dict) and path[0] in doc:
+        if len(path) == 1:
+            del doc[path[0]]
+        else:
+            _remove_path(doc[path[0]], path[1:])
+
+
+def _project(doc: Optional[Doc], projection: Projection) -> Optional[Doc]:
+    """Copy of a stored document with a Mongo-style projection applied"""
+    if doc is None:
+        return None
+    fields = {key: value for key, value in (projection or {}).items() if key != "_id"}
+    if any(fields.values()):
+        return {key: copy.deepcopy(doc[key]) for key in fields if key in doc}
+    projected = copy.deepcopy(doc)
+    for key in fields:
+        _remove_path(projected, key.split("."))
+    return projected
+
+
+def _duplicate(collection: str, key: Any) -> DuplicateKeyError:
+    return DuplicateKeyError(f"E11000 duplicate key error collection: {collection} dup key: {key!r}")
+
+
+class InMemoryUserRepository(UserRepository):
+    def __init__(self):
+        self.by_id: Dict[str, Doc] = {}
+        self.id_by_email: Dict[str, str] = {}
+
+    async def find_by_email(self, email):
+        user_id = self.id_by_email.get(email)
+        return _project(self.by_id.get(user_id), None) if user_id else None
+
+    async def find_by_id(self, user_id, projection=None):
+        return _project(self.by_id.get(user_id), projection)
+
+    async def insert(self, user):
+        if user["id"] in self.by_id:
+            raise _duplicate("users", user["id"])
+        if user["email"] in self.id_by_email:
+            raise _duplicate("users", user["email"])
+        self.by_id[user["id"]] = copy.deepcopy(user)
+        self.id_by_email[user["email"]] = user["id"]
+
+    async def debit(self, user_id, balance_key, amount, projection=None):
+        user = self.by_id.get(user_id)
+        if user is None or user.get(balance_key, 0) < amount:
+            return None
+        user[balance_key] = user.get(balance_key, 0) - amount
+        user["profile_version"] = user.get("profile_version", 0) + 1
+        return _project(user, projection)
+
+    async def credit(self, user_id, balance_key, amount):
+        user = self.by_id.get(user_id)
+        if user is not None:
+            user[balance_key] = user.get(balance_key, 0) + amount
+            user["profile_version"] = user.get("profile_version", 0) + 1
+
+
+class InMemoryCompetitionRepository(CompetitionRepository):
+    def __init__(self):
+        self.by_id: Dict[str, Doc] = {}
+        self.instant_win_numbers: Dict[str, Doc] = {}
+
+    async def list(self, tag=None, projection=None):
+        return [
+            _project(comp, projection) for comp in self.by_id.values()
+            if not tag or tag in comp.get("tags", [])
+        ][:1000]
+
+    async def get(self, competition_id, projection=None):
+        return _project(self.by_id.get(competition_id), projection)
+
+    async def insert(self, competition):
+        if competition["id"] in self.by_id:
+            raise _duplicate("competitions", competition["id"])
+        self.by_id[competition["id"]] = copy.deepcopy(competition)
+
+    async def update(self, competition_id, fields):
+        comp = self.by_id.get(competition_id)
+        if comp is None:
+            return False
+        comp.update(copy.deepcopy(fields))
+        return True
+
+    async def delete(self, competition_id):
+        self.instant_win_numbers.pop(competition_id, None)
+        return self.by_id.pop(competition_id, None) is not None
+
+    async def inc_tickets_sold(self, competition_id, quantity):
+        comp = self.by_id.get(competition_id)
+        if comp is not None:
+            comp["tickets_sold"] = comp.get("tickets_sold", 0) + quantity
+
+    async def get_instant_win_numbers(self, competition_id):
+        return _project(self.instant_win_numbers.get(competition_id), None)
+
+
+class InMemoryCartRepository(CartRepository):
+    def __init__(self):
+        self.by_user: Dict[str, Doc] = {}
+
+    async def get(self, user_id):
+        return _project(self.by_user.get(user_id), None)
+
+    async def add_item(self, user_id, item):
+        cart = self.by_user.setdefault(user_id, {
+            "id": str(uuid.uuid4()), "user_id": user_id, "items": [], "discount": 0.0, "coupon_code": "",
+        })
+        existing = next((i for i in cart["items"] if i["competition_id"] == item["competition_id"]), None)
+        if existing is not None:
+            existing["quantity"] += item["quantity"]
+        else:
+            cart["items"].append(copy.deepcopy(item))
+        cart["updated_at"] = datetime.utcnow()
+        return _project(cart, None)
+
+    async def set_quantity(self, user_id, competition_id, quantity):
+        cart = self.by_user.get(user_id)
+        if cart is None:
+            return None
+        existing = next((i for i in cart["items"] if i["competition_id"] == competition_id), None)
+        if quantity <= 0:
+            cart["items"] = [i for i in cart["items"] if i["competition_id"] != competition_id]
+            cart["updated_at"] = datetime.utcnow()
+        elif existing is not None:
+            existing["quantity"] = quantity
+            cart["updated_at"] = datetime.utcnow()
+        return _project(cart, None)
+
+    async def set_coupon(self, user_id, code, discount):
+        cart = self.by_user.get(user_id)
+        if cart is not None:
+            cart.update({"discount": discount, "coupon_code": code, "updated_at": datetime.utcnow()})
+
+    async def clear(self, user_id):
+        cart = self.by_user.get(user_id)
+        if cart is not None:
+            cart.update(_cleared_cart())
+
+
+class InMemoryOrderRepository(OrderRepository):
+    def __init__(self):
+        self.by_id: Dict[str, Doc] = {}
+        self.entries: List[Doc] = []
+
+    async def last_order_number(self):
+        return max((order.get("order_number", 0) for order in self.by_id.values()), default=None)
+
+    async def insert(self, order):
+        if order["id"] in self.by_id:
+            raise _duplicate("orders", order["id"])
+        self.by_id[order["id"]] = copy.deepcopy(order)
+
+    async def list_for_user(self, user_id, limit):
+        orders = [order for order in self.by_id.values() if order["user_id"] == user_id]
+        orders.sort(key=lambda order: order["created_at"], reverse=True)
+        return [_project(order, None) for order in orders[:limit]]
+
+    async def get_for_user(self, order_id, user_id):
+        order = self.by_id.get(order_id)
+        return _project(order, None) if order and order["user_id"] == user_id else None
+
+    async def insert_entry(self, entry):
+        self.entries.append(copy.deepcopy(entry))
+
+    async def mark_paid(self, order_id):
+        order = self.by_id.get(order_id)
+        if order is None or order.get("payment_status") != "pending":
+            return None
+        order["payment_status"] = "completed"
+        return _project(order, None)
+
+
+class InMemoryTicketRepository(TicketRepository):
+    def __init__(self):
+        self.by_number: Dict[tuple, Doc] = {}  # (competition_id, ticket_number) -> ticket
+        self.sold_blocks: Dict[str, Dict[int, int]] = {}
+
+    async def exists(self, competition_id, ticket_number):
+        return (competition_id, ticket_number) in self.by_number
+
+    async def insert(self, ticket):
+        key = (ticket["competition_id"], ticket["ticket_number"])
+        if key in self.by_number:
+            raise _duplicate("tickets", key)
+        self.by_number[key] = copy.deepcopy(ticket)
+
+    async def delete_for_order(self, order_id):
+        for key in [key for key, ticket in self.by_number.items() if ticket["order_id"] == order_id]:
+            del self.by_number[key]
+
+    async def instant_wins_for_order(self, order_id, competition_id):
+        return [
+            _project(ticket, None) for ticket in self.by_number.values()
+            if ticket["order_id"] == order_id and ticket["competition_id"] == competition_id
+            and ticket.get("is_instant_win")
+        ]
+
+    async def record_sold(self, competition_id, ticket_numbers):
+        blocks = self.sold_blocks.setdefault(competition_id, {})
+        for number in ticket_numbers:
+            block = (number - 1) // draw_engine.BLOCK_SIZE
+            blocks[block] = blocks.get(block, 0) + 1
+
+
+class InMemoryCouponRepository(CouponRepository):
+    def __init__(self):
+        self.by_code: Dict[str, Doc] = {}
+
+    def add(self, coupon: Doc) -> None:
+        if coupon["code"] in self.by_code:
+            raise _duplicate("coupons", coupon["code"])
+        self.by_code[coupon["code"]] = copy.deepcopy(coupon)
+
+    async def find_active(self, code):
+        coupon = self.by_code.get(code)
+        return _project(coupon, None) if coupon and coupon.get("is_active") else None
+
+    async def redeem(self, code):
+        coupon = self.by_code.get(code)
+        if coupon is None or not coupon.get("is_active"):
+            return None
+        if is_used_up(coupon):
+            return None
+        coupon["times_used"] = coupon.get("times_used", 0) + 1
+        return _project(coupon, None)
+
+    async def release(self, code):
+        coupon = self.by_code.get(code)
+        if coupon is not None and coupon.get("times_used", 0) > 0:
+            coupon["times_used"] -= 1
+
+
+class InMemoryAnalyticsRepository(AnalyticsRepository):
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+
+    def _inc(self, key: str, value: float = 1) -> None:
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    async def record_user(self):
+        self._inc("users")
+
+    async def record_competition(self, delta=1):
+        self._inc("competitions", delta)
+
+    async def record_order(self, total, completed, created_at):
+        self._inc("orders")
+        if completed:
+            self._inc("completed_orders")
+            self._inc("revenue", total)
+
+    async def record_payment(self, total, created_at):
+        self._inc("completed_orders")
+        self._inc("revenue", total)
+
+    async def record_sale(self, competition_id, tickets, revenue, at):
+        self._inc(f"sales.{competition_id}.tickets", tickets)
+        self._inc(f"sales.{competition_id}.revenue", revenue)
+
+
+def in_memory_repositories() -> Repositories:
+    return Repositories(
+        users=InMemoryUserRepository(),
+        competitions=InMemoryCompetitionRepository(),
+        carts=InMemoryCartRepository(),
+        orders=InMemoryOrderRepository(),
+        tickets=InMemoryTicketRepository(),
+        coupons=InMemoryCouponRepository(),
+        analytics=InMemoryAnalyticsRepository(),
+    )
@@ -0,0 +1,73 @@
+"""
+Pure ASGI middleware recording per-route HTTP metrics.
+
+Routes are labelled with their path template (e.g.
+/api/competitions/{competition_id}) from the route FastAPI stores in the
+scope, so label cardinality stays bounded; requests that match no route
+(static files, 404s) share the "unmatched" label. Being plain ASGI, it
+does not buffer streaming responses.
+"""
+import time
+
+import metrics
+
+UNMATCHED_ROUTE = "unmatched"
+
+requests_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests currently being handled")
+requests_total = metrics.counter("http_requests_total", "HTTP requests by method, route and status")
+request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request, until the response has been sent"
+)
+request_size = metrics.histogram(
+    "http_request_size_bytes", "HTTP request body size", buckets=metrics.SIZE_BUCKETS
+)
+response_size = metrics.histogram(
+    "http_response_size_bytes", "HTTP response body size", buckets=metrics.SIZE_BUCKETS
+)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        received = sent = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        method = scope["method"]
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            route = route_template(scope)
+            requests_total.inc(method=method, route=route, status=status)
+            request_duration.observe(elapsed, method=method, route=route)
+            request_size.observe(received, method=method, route=route)
+            response_size.observe(sent, method=method, route=route)
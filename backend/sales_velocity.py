@@ -0,0 +1,90 @@
+"""
+Per-competition sales time series.
+
+Each checkout `$inc`s one minute bucket and one hour bucket per competition
+in `sales_buckets` (upserted, so a bucket appears with its first sale).
+Reading a series is a range scan over the (competition_id, granularity,
+start) index; orders are never scanned. Minute buckets expire after
+MINUTE_RETENTION_DAYS through a TTL index; hour buckets are kept.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+MINUTE_RETENTION_DAYS = int(os.environ.get("SALES_MINUTE_RETENTION_DAYS", 7))
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+}
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return at.replace(second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+async def record_sale(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    tickets: int,
+    revenue: float,
+    at: datetime
+) -> None:
+    """Add a sale to the current minute and hour buckets in one round trip"""
+    await db.sales_buckets.bulk_write([
+        UpdateOne(
+            {"competition_id": competition_id, "granularity": granularity, "start": bucket_start(at, granularity)},
+            {"$inc": {"tickets": tickets, "revenue": revenue, "orders": 1}},
+            upsert=True
+        )
+        for granularity in GRANULARITIES
+    ], ordered=False)
+
+
+async def get_series(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    granularity: str,
+    since: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Buckets from the one containing `since` onwards, oldest first; buckets
+    with no sales are absent
+    """
+    cursor = db.sales_buckets.find(
+        {"competition_id": competition_id, "granularity": granularity,
+         "start": {"$gte": bucket_start(since, granularity)}},
+        {"_id": 0, "start": 1, "tickets": 1, "revenue": 1, "orders": 1}
+    ).sort("start", 1)
+    return [
+        {
+            "start": bucket["start"],
+            "tickets": bucket.get("tickets", 0),
+            "revenue": round(bucket.get("revenue", 0), 2),
+            "orders": bucket.get("orders", 0),
+        }
+        async for bucket in cursor
+    ]
+
+
+def project_sell_out(remaining: int, tickets: int, window: timedelta, now: datetime) -> Dict[str, Any]:
+    """
+    Linear projection from the sales rate over the last `window`. There is no
+    projected time when nothing sold in the window, or when the competition
+    has already sold out (`sold_out`).
+    """
+    per_hour = tickets / (window.total_seconds() / 3600)
+    sell_out_at: Optional[datetime] = None
+    if remaining > 0 and per_hour > 0:
+        sell_out_at = now + timedelta(hours=remaining / per_hour)
+    return {
+        "tickets_per_hour": round(per_hour, 2),
+        "remaining": max(0, remaining),
+        "sold_out": remaining <= 0,
+        "projected_sell_out_at": sell_out_at,
+    }
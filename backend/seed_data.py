@@ -1,12 +1,29 @@
 """
 Seed database with sample competitions and admin user
+
+    python seed_data.py                      # demo data
+    python seed_data.py generate --users 100000 --competitions 200 \
+        --orders-per-user 5 --tickets-per-competition 50000
+
+The generate mode writes production-like volumes of users, competitions,
+orders, competition entries and tickets. Everything is derived from --seed
+(ids, ticket numbers, amounts, time offsets), and each competition uses its
+own random stream, so the output does not depend on write order. Documents
+go out in unordered insert_many batches, --concurrency at a time; indexes
+are created afterwards, which is faster than maintaining them per insert.
 """
+import argparse
 import asyncio
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+import numpy as np
 from auth import get_password_hash
+from indexes import ensure_indexes
+import admin_stats
+import draw_engine
 from datetime import datetime, timedelta
 
 ROOT_DIR = Path(__file__).parent
@@ -28,7 +45,7 @@ async def seed():
         "site_credit_balance": 10000.0,
         "cash_balance": 5000.0,
         "is_admin": True,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": datetime.utcnow()
     }
     
     await db.users.delete_one({"email": "admin@decus.com"})
@@ -44,7 +61,7 @@ async def seed():
         "site_credit_balance": 500.0,
         "cash_balance": 250.0,
         "is_admin": False,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": datetime.utcnow()
     }
     
     await db.users.delete_one({"email": "test@decus.com"})
@@ -80,8 +97,8 @@ async def seed():
                 "No restrictions on property type"
             ],
             "product_id": "prod-001",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         },
         {
             "id": "comp-002",
@@ -129,8 +146,8 @@ async def seed():
                 "Airport transfers provided"
             ],
             "product_id": "prod-002",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         },
         {
             "id": "comp-003",
@@ -171,8 +188,8 @@ async def seed():
                 "Tax-free winnings"
             ],
             "product_id": "prod-003",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         },
         {
             "id": "comp-004",
@@ -198,8 +215,8 @@ async def seed():
                 "Cash alternative available"
             ],
             "product_id": "prod-004",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         },
         {
             "id": "comp-005",
@@ -233,8 +250,8 @@ async def seed():
                 "Luxury smartwatch"
             ],
             "product_id": "prod-005",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         },
         {
             "id": "comp-006",
@@ -260,8 +277,8 @@ async def seed():
                 "Hotel and travel included"
             ],
             "product_id": "prod-006",
-            "created_at": now.isoformat(),
-            "updated_at": now.isoformat()
+            "created_at": now,
+            "updated_at": now
         }
     ]
     
@@ -278,7 +295,7 @@ async def seed():
         "bg_gradient_end": "#0f0618",
         "card_bg": "rgba(22,13,33,0.85)",
         "card_border": "rgba(138,43,226,0.3)",
-        "updated_at": datetime.utcnow().isoformat()
+        "updated_at": datetime.utcnow()
     }
     
     await db.theme_settings.update_one(
@@ -297,7 +314,7 @@ async def seed():
             "is_active": True,
             "max_uses": 0,
             "times_used": 0,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.utcnow()
         },
         {
             "id": "coupon-002",
@@ -306,7 +323,7 @@ async def seed():
             "is_active": True,
             "max_uses": 100,
             "times_used": 25,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.utcnow()
         }
     ]
     
@@ -322,5 +339,254 @@ async def seed():
     
     client.close()
 
+
+# ============================================================================
+# SYNTHETIC DATA GENERATOR
+# ============================================================================
+
+GENERATED_PREFIX = "gen-"
+GENERATED_PASSWORD = "password123"
+SELL_THROUGH = 0.8  # share of max_tickets that the generated tickets fill
+HISTORY_DAYS = 90
+
+
+class BatchWriter:
+    """Buffers documents per collection and writes full batches concurrently"""
+
+    def __init__(self, db, batch_size, concurrency):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.pending = set()
+        self.slots = asyncio.Semaphore(concurrency)
+        self.written = {}
+
+    async def add(self, collection, doc):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            self.buffers[collection] = []
+            await self._write(collection, buffer)
+
+    async def _write(self, collection, docs):
+        await self.slots.acquire()  # back-pressure: at most `concurrency` batches in flight
+
+        async def write():
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                self.written[collection] = self.written.get(collection, 0) + len(docs)
+            finally:
+                self.slots.release()
+
+        task = asyncio.create_task(write())
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def flush(self):
+        for collection, docs in self.buffers.items():
+            if docs:
+                await self._write(collection, docs)
+        self.buffers = {}
+        await asyncio.gather(*list(self.pending))
+
+
+def _past(now, rng, max_days):
+    return now - timedelta(seconds=float(rng.uniform(0, max_days * 86400)))
+
+
+def _split(total, parts, rng):
+    """`parts` positive quantities summing to `total` (fewer parts if total is smaller)"""
+    parts = min(parts, total)
+    if parts == 0:
+        return np.zeros(0, dtype=np.int64)
+    return rng.multinomial(total - parts, np.full(parts, 1 / parts)) + 1
+
+
+async def _drop_generated(db):
+    generated = {"$regex": f"^{GENERATED_PREFIX}"}
+    for collection in ("users", "competitions", "orders", "competition_entries", "ticket_rank_index"):
+        field = "competition_id" if collection == "ticket_rank_index" else "id"
+        await db[collection].delete_many({field: generated})
+    await db.tickets.delete_many({"competition_id": generated})
+
+
+async def generate(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    started = time.perf_counter()
+    
+    if await db.users.find_one({"id": {"$regex": f"^{GENERATED_PREFIX}"}}, {"_id": 1}):
+        if not args.drop:
+            raise SystemExit("Generated data already exists; pass --drop to replace it")
+        print("🧹 Removing previously generated data...")
+        await _drop_generated(db)
+    
+    now = datetime.utcnow()
+    writer = BatchWriter(db, args.batch_size, args.concurrency)
+    password_hash = get_password_hash(GENERATED_PASSWORD)  # bcrypt once, shared by every user
+    
+    # Users
+    rng = np.random.default_rng([args.seed, 0])
+    users = []
+    for i in range(args.users):
+        user = {
+            "id": f"{GENERATED_PREFIX}user-{i}",
+            "email": f"user{i}@example.com",
+            "name": f"User {i}",
+            "password_hash": password_hash,
+            "site_credit_balance": float(rng.integers(0, 500)),
+            "cash_balance": float(rng.integers(0, 100)),
+            "is_admin": False,
+            "profile_version": 0,
+            "created_at": _past(now, rng, HISTORY_DAYS),
+        }
+        users.append((user["id"], user["email"], user["name"]))
+        await writer.add("users", user)
+    print(f"👤 Queued {args.users} users")
+    
+    # Competitions; each order buys tickets in one competition
+    max_tickets = max(1, int(np.ceil(args.tickets_per_competition / SELL_THROUGH)))
+    order_count = args.users * args.orders_per_user
+    order_competition = rng.integers(0, args.competitions, size=order_count)
+    orders_by_competition = np.split(
+        np.argsort(order_competition, kind="stable"),
+        np.cumsum(np.bincount(order_competition, minlength=args.competitions))[:-1]
+    )
+    skipped_orders = 0
+    
+    for c in range(args.competitions):
+        crng = np.random.default_rng([args.seed, 1, c])
+        competition_id = f"{GENERATED_PREFIX}comp-{c}"
+        title = f"Generated Competition {c}"
+        price = float(crng.choice([0.49, 0.99, 1.99, 2.99, 4.99]))
+        numbers = crng.choice(max_tickets, size=args.tickets_per_competition, replace=False) + 1
+        order_ids = orders_by_competition[c]
+        quantities = _split(args.tickets_per_competition, len(order_ids), crng)
+        skipped_orders += len(order_ids) - len(quantities)
+        
+        await writer.add("competitions", {
+            "id": competition_id,
+            "title": title,
+            "subtitle": "",
+            "description": f"Synthetic competition {c} for load and query-plan testing",
+            "price": price,
+            "image": "",
+            "hot": bool(crng.random() < 0.2),
+            "instant": False,
+            "max_tickets": max_tickets,
+            "tickets_sold": int(quantities.sum()),
+            "sold_override": 0,
+            "end_datetime": (now + timedelta(days=int(crng.integers(1, 30)))).isoformat(),
+            "category": "all",
+            "tags": ["all", str(crng.choice(["jackpot", "spin", "instawins", "rolling", "vip"]))],
+            "instant_wins": [],
+            "prize_value": str(int(crng.integers(100, 50_000))),
+            "is_finished": False,
+            "created_at": _past(now, crng, HISTORY_DAYS),
+            "updated_at": now,
+        })
+        
+        offset = 0
+        for order_index, quantity in zip(order_ids, quantities):
+            order_numbers = np.sort(numbers[offset:offset + quantity]).tolist()
+            offset += quantity
+            user_id, email, name = users[order_index // args.orders_per_user]
+            order_id = f"{GENERATED_PREFIX}order-{order_index}"
+            total = round(price * int(quantity), 2)
+            created_at = _past(now, crng, HISTORY_DAYS)
+            
+            await writer.add("orders", {
+                "id": order_id,
+                "order_number": 1_000_000 + int(order_index),
+                "user_id": user_id,
+                "user_email": email,
+                "user_name": name,
+                "total": total,
+                "discount": 0.0,
+                "payment_method": "site_credit",
+                "payment_status": "completed",
+                "ticket_count": int(quantity),
+                "tickets": [{
+                    "competition_id": competition_id,
+                    "title": title,
+                    "numbers": [{"number": n} for n in order_numbers],
+                    "instant_wins": [],
+                }],
+                "created_at": created_at,
+            })
+            await writer.add("competition_entries", {
+                "id": f"{GENERATED_PREFIX}entry-{order_index}",
+                "competition_id": competition_id,
+                "user_id": user_id,
+                "user_email": email,
+                "user_name": name,
+                "ticket_numbers": order_numbers,
+                "quantity": int(quantity),
+                "total_paid": total,
+                "order_id": order_id,
+                "created_at": created_at,
+            })
+            for n in order_numbers:
+                await writer.add("tickets", {
+                    "id": f"{GENERATED_PREFIX}ticket-{c}-{n}",
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "competition_id": competition_id,
+                    "ticket_number": n,
+                    "is_instant_win": False,
+                    "win_label": "",
+                    "win_amount": 0.0,
+                    "wallet_type": "site_credit",
+                    "created_at": created_at,
+                })
+        
+        # Rank index for draws, straight from the numbers rather than an aggregation
+        sold = numbers[:offset]
+        counts = np.bincount((sold - 1) // draw_engine.BLOCK_SIZE)
+        await writer.add("ticket_rank_index", {
+            "competition_id": competition_id,
+            "block_size": draw_engine.BLOCK_SIZE,
+            "counts": {str(block): int(count) for block, count in enumerate(counts) if count},
+            "total": int(offset),
+        })
+        if (c + 1) % max(1, args.competitions // 10) == 0:
+            print(f"🎟️  {c + 1}/{args.competitions} competitions ({time.perf_counter() - started:.0f}s)")
+    
+    await writer.flush()
+    if skipped_orders:
+        print(f"⚠️  Skipped {skipped_orders} orders: competitions ran out of tickets to give them")
+    
+    print("🗂️  Creating indexes and rebuilding the stats rollup...")
+    await ensure_indexes(db)
+    await admin_stats.rebuild_rollup(db)
+    
+    for collection, count in sorted(writer.written.items()):
+        print(f"   {collection}: {count}")
+    print(f"\n🎉 Generated data in {time.perf_counter() - started:.0f}s "
+          f"(users log in as userN@example.com / {GENERATED_PASSWORD})")
+    
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="mode")
+    gen = subparsers.add_parser("generate", help="Write large volumes of synthetic data")
+    gen.add_argument("--users", type=int, default=10_000)
+    gen.add_argument("--competitions", type=int, default=50)
+    gen.add_argument("--orders-per-user", type=int, default=5)
+    gen.add_argument("--tickets-per-competition", type=int, default=20_000)
+    gen.add_argument("--seed", type=int, default=1, help="Same seed, same data")
+    gen.add_argument("--batch-size", type=int, default=5_000, help="Documents per insert_many")
+    gen.add_argument("--concurrency", type=int, default=8, help="insert_many batches in flight")
+    gen.add_argument("--drop", action="store_true", help="Replace previously generated data")
+    args = parser.parse_args()
+    
+    if args.mode == "generate":
+        asyncio.run(generate(args))
+    else:
+        asyncio.run(seed())
+
+
 if __name__ == "__main__":
-    asyncio.run(seed())
+    main()
@@ -1,38 +1,65 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Request, BackgroundTasks, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
 import logging
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, timedelta
-import shutil
+import uuid
 
 from models import (
-    Competition, CompetitionCreate, ThemeSettings, CartItem, Cart,
-    Order, User, UserCreate, UserLogin, Coupon, CheckoutRequest, Ticket
+    Competition, CompetitionCreate, ThemeSettings, CartItem,
+    Order, User, UserCreate, UserLogin, Coupon, CheckoutRequest, Ticket,
+    TicketLookupRequest, DrawRequest, InstantWinGenerateRequest
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_user, get_current_admin_user
+    get_password_hash_async, verify_password_async, create_access_token,
+    get_current_user, get_current_admin_user, invalidate_user_tokens
 )
 from ticket_allocator import allocate_tickets
+from repositories import Repositories, get_repositories, motor_repositories
+from summaries import sold_percentage, group_instant_wins
 from payment_routes import router as payment_router
+from upload_store import save_upload, serve_file, UploadLimitMiddleware
+from coupon_cache import get_coupon, store_coupon, invalidate_coupon, is_used_up
+from user_cache import (
+    get_profile, store_profile, invalidate_profile, profile_response,
+    PROFILE_PROJECTION
+)
+from indexes import ensure_indexes
+from winners import resolve_tickets
+import draw_engine
+import instant_wins
+import sales_velocity
+from request_metrics import MetricsMiddleware
+from db_monitor import CommandMonitor, DbMonitorMiddleware
+from pagination import keyset_query, page, SORT
+from exports import (
+    export_response, projection, EXPORT_BATCH_SIZE, ORDER_EXPORT_FIELDS, ENTRY_EXPORT_FIELDS
+)
+import admin_stats
+import image_variants
+import metrics
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandMonitor()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
 app = FastAPI()
 
+# Storefront handlers reach the database through repositories (see repositories.py)
+app.state.repositories = motor_repositories(db)
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -53,24 +80,25 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # ============================================================================
 
 @api_router.post("/auth/register")
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, repos: Repositories = Depends(get_repositories)):
     """Register a new user"""
-    existing = await db.users.find_one({"email": user_data.email})
+    existing = await repos.users.find_by_email(user_data.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user = User(
         email=user_data.email,
         name=user_data.name,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         site_credit_balance=100.0,  # Welcome bonus
         cash_balance=0.0,
         is_admin=False
     )
     
     user_dict = user.model_dump()
-    user_dict["created_at"] = user_dict["created_at"].isoformat()
-    await db.users.insert_one(user_dict)
+    await repos.users.insert(user_dict)
+    store_profile(user_dict)
+    await repos.analytics.record_user()
     
     access_token = create_access_token(
         data={"sub": user.id, "email": user.email, "is_admin": user.is_admin}
@@ -79,106 +107,81 @@ async def register(user_data: UserCreate):
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name,
-            "site_credit_balance": user.site_credit_balance,
-            "cash_balance": user.cash_balance,
-            "is_admin": user.is_admin
-        }
+        "user": profile_response(user_dict)
     }
 
 
 @api_router.post("/auth/login")
-async def login(user_data: UserLogin):
+async def login(user_data: UserLogin, repos: Repositories = Depends(get_repositories)):
     """Login user"""
-    user = await db.users.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    user = await repos.users.find_by_email(user_data.email)
+    if not user or not await verify_password_async(user_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(
         data={"sub": user["id"], "email": user["email"], "is_admin": user.get("is_admin", False)}
     )
+    store_profile(user)
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": {
-            "id": user["id"],
-            "email": user["email"],
-            "name": user.get("name", ""),
-            "site_credit_balance": user.get("site_credit_balance", 0.0),
-            "cash_balance": user.get("cash_balance", 0.0),
-            "is_admin": user.get("is_admin", False)
-        }
+        "user": profile_response(user)
     }
 
 
 @api_router.get("/auth/me")
-async def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Get current user info"""
-    user = await db.users.find_one({"id": current_user["user_id"]})
+    user = await get_profile(repos.users, current_user["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {
-        "id": user["id"],
-        "email": user["email"],
-        "name": user.get("name", ""),
-        "site_credit_balance": user.get("site_credit_balance", 0.0),
-        "cash_balance": user.get("cash_balance", 0.0),
-        "is_admin": user.get("is_admin", False)
-    }
+    return profile_response(user)
+
+
+@api_router.post("/auth/logout")
+async def logout(current_user: dict = Depends(get_current_user)):
+    """Logout user (drops this worker's cached token payloads for the user)"""
+    invalidate_user_tokens(current_user["user_id"])
+    return {"message": "Logged out"}
 
 
 # ============================================================================
 # COMPETITION ENDPOINTS
 # ============================================================================
 
+# The catalogue never needs the instant-win number lists
+COMPETITION_LIST_PROJECTION = {"_id": 0, "instant_win_ticket_numbers": 0, "instant_wins.numbers": 0}
+
+
 @api_router.get("/competitions")
-async def get_competitions(tag: Optional[str] = None):
+async def get_competitions(tag: Optional[str] = None, repos: Repositories = Depends(get_repositories)):
     """Get all competitions, optionally filtered by tag"""
-    query = {}
-    if tag and tag != "all":
-        query["tags"] = tag
+    if tag == "all":
+        tag = None
     
-    competitions = await db.competitions.find(query, {"_id": 0}).to_list(1000)
+    competitions = await repos.competitions.list(tag, COMPETITION_LIST_PROJECTION)
     
     # Calculate sold percentage
     for comp in competitions:
-        max_tickets = comp.get("max_tickets", 0)
-        tickets_sold = comp.get("tickets_sold", 0)
-        sold_override = comp.get("sold_override", 0)
-        
-        if sold_override > 0:
-            comp["sold"] = sold_override
-        elif max_tickets > 0 and tickets_sold > 0:
-            comp["sold"] = min(100, round((tickets_sold / max_tickets) * 100))
-        else:
-            comp["sold"] = 0
+        comp["sold"] = sold_percentage(comp)
     
     return competitions
 
 
 @api_router.get("/competitions/{competition_id}")
-async def get_competition(competition_id: str):
+async def get_competition(competition_id: str, repos: Repositories = Depends(get_repositories)):
     """Get single competition by ID"""
-    comp = await db.competitions.find_one({"id": competition_id}, {"_id": 0})
+    comp = await repos.competitions.get(competition_id)
     if not comp:
         raise HTTPException(status_code=404, detail="Competition not found")
     
     # Calculate sold percentage
-    max_tickets = comp.get("max_tickets", 0)
-    tickets_sold = comp.get("tickets_sold", 0)
-    sold_override = comp.get("sold_override", 0)
-    
-    if sold_override > 0:
-        comp["sold"] = sold_override
-    elif max_tickets > 0 and tickets_sold > 0:
-        comp["sold"] = min(100, round((tickets_sold / max_tickets) * 100))
-    else:
-        comp["sold"] = 0
+    comp["sold"] = sold_percentage(comp)
     
     return comp
 
@@ -186,16 +189,15 @@ async def get_competition(competition_id: str):
 @api_router.post("/competitions")
 async def create_competition(
     comp_data: CompetitionCreate,
-    current_user: dict = Depends(get_current_admin_user)
+    current_user: dict = Depends(get_current_admin_user),
+    repos: Repositories = Depends(get_repositories)
 ):
     """Create new competition (admin only)"""
     competition = Competition(**comp_data.model_dump())
     
     comp_dict = competition.model_dump()
-    comp_dict["created_at"] = comp_dict["created_at"].isoformat()
-    comp_dict["updated_at"] = comp_dict["updated_at"].isoformat()
-    
-    await db.competitions.insert_one(comp_dict)
+    await repos.competitions.insert(comp_dict)
+    await repos.analytics.record_competition()
     
     return competition
 
@@ -204,20 +206,15 @@ async def create_competition(
 async def update_competition(
     competition_id: str,
     comp_data: CompetitionCreate,
-    current_user: dict = Depends(get_current_admin_user)
+    current_user: dict = Depends(get_current_admin_user),
+    repos: Repositories = Depends(get_repositories)
 ):
     """Update competition (admin only)"""
-    existing = await db.competitions.find_one({"id": competition_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Competition not found")
-    
     update_dict = comp_data.model_dump()
-    update_dict["updated_at"] = datetime.utcnow().isoformat()
+    update_dict["updated_at"] = datetime.utcnow()
     
-    await db.competitions.update_one(
-        {"id": competition_id},
-        {"$set": update_dict}
-    )
+    if not await repos.competitions.update(competition_id, update_dict):
+        raise HTTPException(status_code=404, detail="Competition not found")
     
     return {"message": "Competition updated successfully"}
 
@@ -225,30 +222,51 @@ async def update_competition(
 @api_router.delete("/competitions/{competition_id}")
 async def delete_competition(
     competition_id: str,
-    current_user: dict = Depends(get_current_admin_user)
+    current_user: dict = Depends(get_current_admin_user),
+    repos: Repositories = Depends(get_repositories)
 ):
     """Delete competition (admin only)"""
-    result = await db.competitions.delete_one({"id": competition_id})
-    if result.deleted_count == 0:
+    if not await repos.competitions.delete(competition_id):
         raise HTTPException(status_code=404, detail="Competition not found")
+    instant_wins.invalidate(competition_id)
+    await repos.analytics.record_competition(-1)
     
     return {"message": "Competition deleted successfully"}
 
 
 @api_router.post("/upload")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_admin_user)
 ):
     """Upload image/video file (admin only)"""
-    # Generate unique filename
-    ext = Path(file.filename).suffix
-    filename = f"{datetime.utcnow().timestamp()}{ext}"
-    file_path = UPLOAD_DIR / filename
+    ext = Path(file.filename or "").suffix
     
-    # Save file
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Stream to disk off the event loop, stored under the SHA-256 of the content
+    filename, size, created = await save_upload(file, UPLOAD_DIR, ext)
+    
+    has_variants = image_variants.is_image(filename)
+    result = await db.uploads.update_one(
+        {"filename": filename},
+        {"$setOnInsert": {
+            "id": str(uuid.uuid4()),
+            "filename": filename,
+            "original_filename": file.filename or "",
+            "content_type": file.content_type or "",
+            "size": size,
+            "uploaded_by": current_user["user_id"],
+            "variants": [],
+            "variants_status": "pending" if has_variants else "none",
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    
+    # Resized variants are built in the process pool after the response is sent;
+    # re-uploads of existing content reuse the variants already built
+    if has_variants and (created or result.upserted_id is not None):
+        background_tasks.add_task(image_variants.build_variants, db, UPLOAD_DIR, filename)
     
     # Return API URL
     file_url = f"/api/uploads/{filename}"
@@ -257,12 +275,29 @@ async def upload_file(
 
 
 @api_router.get("/uploads/{filename}")
-async def serve_upload(filename: str):
-    """Serve uploaded files"""
+async def serve_upload(filename: str, request: Request, w: Optional[int] = None):
+    """Serve uploaded files, or the best-fitting image variant when a width is given"""
     file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    
+    if w and image_variants.is_image(filename):
+        variants = await image_variants.get_manifest(db, filename)
+        variant = image_variants.select_variant(variants, w, request.headers.get("accept", ""))
+        if variant:
+            return await serve_file(
+                request,
+                UPLOAD_DIR / variant["filename"],
+                media_type=image_variants.FORMAT_MIME_TYPES[variant["format"]],
+                extra_headers={"Vary": "Accept"}
+            )
+        # Variants may still be building; don't let this response be cached for good
+        return await serve_file(
+            request,
+            file_path,
+            extra_headers={"Cache-Control": "public, max-age=60", "Vary": "Accept"}
+        )
+    
+    # Video players seek with Range requests; browsers revalidate with ETag/Last-Modified
+    return await serve_file(request, file_path)
 
 
 # ============================================================================
@@ -286,7 +321,7 @@ async def update_theme(
 ):
     """Update theme settings (admin only)"""
     theme_dict = theme_data.model_dump()
-    theme_dict["updated_at"] = datetime.utcnow().isoformat()
+    theme_dict["updated_at"] = datetime.utcnow()
     
     await db.theme_settings.update_one(
         {"id": "theme_settings"},
@@ -302,9 +337,12 @@ async def update_theme(
 # ============================================================================
 
 @api_router.get("/cart")
-async def get_cart(current_user: dict = Depends(get_current_user)):
+async def get_cart(
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Get user's cart"""
-    cart = await db.carts.find_one({"user_id": current_user["user_id"]}, {"_id": 0})
+    cart = await repos.carts.get(current_user["user_id"])
     if not cart:
         return {"items": [], "discount": 0.0, "coupon_code": ""}
     return cart
@@ -313,95 +351,57 @@ async def get_cart(current_user: dict = Depends(get_current_user)):
 @api_router.post("/cart/add")
 async def add_to_cart(
     item: CartItem,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
 ):
-    """Add item to cart"""
-    cart = await db.carts.find_one({"user_id": current_user["user_id"]})
-    
-    if not cart:
-        cart = Cart(user_id=current_user["user_id"], items=[item])
-        cart_dict = cart.model_dump()
-        cart_dict["updated_at"] = cart_dict["updated_at"].isoformat()
-        await db.carts.insert_one(cart_dict)
-    else:
-        # Check if item already in cart
-        items = cart.get("items", [])
-        found = False
-        for existing_item in items:
-            if existing_item["competition_id"] == item.competition_id:
-                existing_item["quantity"] += item.quantity
-                found = True
-                break
-        
-        if not found:
-            items.append(item.model_dump())
-        
-        await db.carts.update_one(
-            {"user_id": current_user["user_id"]},
-            {"$set": {"items": items, "updated_at": datetime.utcnow().isoformat()}}
-        )
-    
-    return {"message": "Item added to cart"}
+    """Add item to cart (one atomic update; returns the new cart)"""
+    cart = await repos.carts.add_item(current_user["user_id"], item.model_dump())
+    return {"message": "Item added to cart", "cart": cart}
 
 
 @api_router.post("/cart/update")
 async def update_cart_item(
     competition_id: str,
     quantity: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
 ):
-    """Update cart item quantity"""
-    cart = await db.carts.find_one({"user_id": current_user["user_id"]})
+    """Update cart item quantity (0 or less removes it; returns the new cart)"""
+    cart = await repos.carts.set_quantity(current_user["user_id"], competition_id, quantity)
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
     
-    items = cart.get("items", [])
-    for item in items:
-        if item["competition_id"] == competition_id:
-            if quantity <= 0:
-                items.remove(item)
-            else:
-                item["quantity"] = quantity
-            break
-    
-    await db.carts.update_one(
-        {"user_id": current_user["user_id"]},
-        {"$set": {"items": items, "updated_at": datetime.utcnow().isoformat()}}
-    )
-    
-    return {"message": "Cart updated"}
+    return {"message": "Cart updated", "cart": cart}
 
 
 @api_router.delete("/cart/clear")
-async def clear_cart(current_user: dict = Depends(get_current_user)):
+async def clear_cart(
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Clear user's cart"""
-    await db.carts.update_one(
-        {"user_id": current_user["user_id"]},
-        {"$set": {"items": [], "discount": 0.0, "coupon_code": "", "updated_at": datetime.utcnow().isoformat()}}
-    )
+    await repos.carts.clear(current_user["user_id"])
     return {"message": "Cart cleared"}
 
 
 @api_router.post("/cart/apply-coupon")
 async def apply_coupon(
     code: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
 ):
-    """Apply coupon code to cart"""
-    coupon = await db.coupons.find_one({"code": code.upper(), "is_active": True})
+    """Apply coupon code to cart (usage limits are enforced again when redeemed at checkout)"""
+    coupon = await get_coupon(repos.coupons, code.upper())
     if not coupon:
         raise HTTPException(status_code=404, detail="Invalid coupon code")
     
     # Check usage limits
-    if coupon.get("max_uses", 0) > 0 and coupon.get("times_used", 0) >= coupon["max_uses"]:
+    if is_used_up(coupon):
         raise HTTPException(status_code=400, detail="Coupon usage limit reached")
     
     discount = coupon.get("discount_amount", 0.0)
     
-    await db.carts.update_one(
-        {"user_id": current_user["user_id"]},
-        {"$set": {"discount": discount, "coupon_code": code.upper(), "updated_at": datetime.utcnow().isoformat()}}
-    )
+    await repos.carts.set_coupon(current_user["user_id"], code.upper(), discount)
     
     return {"message": "Coupon applied", "discount": discount}
 
@@ -411,15 +411,18 @@ async def apply_coupon(
 # ============================================================================
 
 @api_router.post("/checkout/validate")
-async def validate_cart(current_user: dict = Depends(get_current_user)):
+async def validate_cart(
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Validate cart items (check ticket availability)"""
-    cart = await db.carts.find_one({"user_id": current_user["user_id"]})
+    cart = await repos.carts.get(current_user["user_id"])
     if not cart or not cart.get("items"):
         raise HTTPException(status_code=400, detail="Cart is empty")
     
     issues = []
     for item in cart["items"]:
-        comp = await db.competitions.find_one({"id": item["competition_id"]})
+        comp = await repos.competitions.get(item["competition_id"])
         if not comp:
             issues.append(f"Competition '{item['title']}' not found")
             continue
@@ -437,19 +440,24 @@ async def validate_cart(current_user: dict = Depends(get_current_user)):
     return {"valid": True, "message": "All items are available"}
 
 
+checkout_stage_seconds = metrics.histogram("checkout_stage_seconds", "Time spent in each stage of complete_checkout")
+
+
 @api_router.post("/checkout/complete")
 async def complete_checkout(
     checkout_data: CheckoutRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
 ):
     """Complete checkout and create order"""
     # Get cart
-    cart = await db.carts.find_one({"user_id": current_user["user_id"]})
+    with checkout_stage_seconds.time(stage="cart_load"):
+        cart = await repos.carts.get(current_user["user_id"])
     if not cart or not cart.get("items"):
         raise HTTPException(status_code=400, detail="Cart is empty")
     
-    # Get user
-    user = await db.users.find_one({"id": current_user["user_id"]})
+    # Get user (cached profile; balances are re-checked by the guarded debit below)
+    user = await get_profile(repos.users, current_user["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -458,24 +466,23 @@ async def complete_checkout(
     discount = cart.get("discount", 0.0)
     total = max(0, subtotal - discount)
     
-    # Validate payment method and balance
+    # Validate payment method (balances are checked when they are debited;
+    # card payments create a pending order and return a payment URL)
     payment_method = checkout_data.payment_method
     
-    if payment_method == "site_credit":
-        if user.get("site_credit_balance", 0.0) < total:
-            raise HTTPException(status_code=400, detail="Insufficient site credit balance")
-    elif payment_method == "cash":
-        if user.get("cash_balance", 0.0) < total:
-            raise HTTPException(status_code=400, detail="Insufficient cash balance")
-    elif payment_method == "card":
-        # For card payments, we'll create a pending order and return payment URL
-        pass
-    else:
+    if payment_method not in ("site_credit", "cash", "card"):
         raise HTTPException(status_code=400, detail="Invalid payment method")
     
+    # Coupon: only checked here; a use is redeemed once the order is paid
+    coupon_code = cart.get("coupon_code", "")
+    if coupon_code:
+        coupon = await get_coupon(repos.coupons, coupon_code)
+        if not coupon or is_used_up(coupon):
+            raise HTTPException(status_code=400, detail="Coupon is no longer available")
+    
     # Generate order number
-    last_order = await db.orders.find_one(sort=[("order_number", -1)])
-    order_number = (last_order.get("order_number", 0) + 1) if last_order else 1000
+    last_order_number = await repos.orders.last_order_number()
+    order_number = (last_order_number + 1) if last_order_number is not None else 1000
     
     # Create order
     order = Order(
@@ -485,6 +492,7 @@ async def complete_checkout(
         user_name=user.get("name", ""),
         total=total,
         discount=discount,
+        coupon_code=coupon_code,
         payment_method=payment_method,
         payment_status="pending" if payment_method == "card" else "completed",
         ticket_count=sum(item["quantity"] for item in cart["items"]),
@@ -492,110 +500,105 @@ async def complete_checkout(
     )
     
     order_dict = order.model_dump()
-    order_dict["created_at"] = order_dict["created_at"].isoformat()
     
     # If not card payment, process immediately
     if payment_method != "card":
-        # Deduct balance
-        if payment_method == "site_credit":
-            new_balance = user["site_credit_balance"] - total
-            await db.users.update_one(
-                {"id": current_user["user_id"]},
-                {"$set": {"site_credit_balance": new_balance}}
-            )
-        elif payment_method == "cash":
-            new_balance = user["cash_balance"] - total
-            await db.users.update_one(
-                {"id": current_user["user_id"]},
-                {"$set": {"cash_balance": new_balance}}
-            )
+        # Redeem the coupon: one guarded $inc, so a limited code is never over-redeemed
+        if coupon_code:
+            redeemed = await repos.coupons.redeem(coupon_code)
+            if not redeemed:
+                invalidate_coupon(coupon_code)
+                raise HTTPException(status_code=400, detail="Coupon is no longer available")
+            store_coupon(coupon_code, redeemed)
         
-        # Allocate tickets
-        tickets = []
-        for item in cart["items"]:
-            comp = await db.competitions.find_one({"id": item["competition_id"]})
-            if not comp:
-                continue
-            
-            # Allocate ticket numbers
-            allocated = await allocate_tickets(
-                db=db,
-                competition_id=item["competition_id"],
-                quantity=item["quantity"],
-                order_id=order.id,
-                user_id=current_user["user_id"],
-                instant_wins=comp.get("instant_wins", []),
-                max_tickets=comp.get("max_tickets", 0)
-            )
+        balance_key = "site_credit_balance" if payment_method == "site_credit" else "cash_balance"
+        debited = False
+        try:
+            # Deduct balance atomically; the filter guards against overspending
+            with checkout_stage_seconds.time(stage="balance_debit"):
+                updated_user = await repos.users.debit(
+                    current_user["user_id"], balance_key, total, projection=PROFILE_PROJECTION
+                )
+            if not updated_user:
+                invalidate_profile(current_user["user_id"])
+                label = "site credit" if payment_method == "site_credit" else "cash"
+                raise HTTPException(status_code=400, detail=f"Insufficient {label} balance")
+            debited = True
+            store_profile(updated_user)
+        
+            # Allocate tickets
+            tickets = []
+            with checkout_stage_seconds.time(stage="allocation"):
+                for item in cart["items"]:
+                    comp = await repos.competitions.get(item["competition_id"])
+                    if not comp:
+                        continue
             
-            if not allocated:
-                raise HTTPException(status_code=500, detail="Failed to allocate tickets")
+                    # Allocate ticket numbers
+                    allocated = await allocate_tickets(
+                        repos=repos,
+                        competition_id=item["competition_id"],
+                        quantity=item["quantity"],
+                        order_id=order.id,
+                        user_id=current_user["user_id"],
+                        instant_wins=comp.get("instant_wins", []),
+                        max_tickets=comp.get("max_tickets", 0)
+                    )
             
-            # Get instant win tickets for this order
-            instant_win_tickets = await db.tickets.find({
-                "order_id": order.id,
-                "competition_id": item["competition_id"],
-                "is_instant_win": True
-            }, {"_id": 0}).to_list(None)
+                    if not allocated:
+                        raise HTTPException(status_code=500, detail="Failed to allocate tickets")
             
-            # Group instant wins by prize
-            instant_wins_grouped = {}
-            for ticket in instant_win_tickets:
-                prize_label = ticket.get("win_label", "")
-                if prize_label not in instant_wins_grouped:
-                    instant_wins_grouped[prize_label] = {
-                        "prize": prize_label,
-                        "ticket_numbers": []
-                    }
-                instant_wins_grouped[prize_label]["ticket_numbers"].append(ticket["ticket_number"])
+                    # Get instant win tickets for this order
+                    instant_win_tickets = await repos.tickets.instant_wins_for_order(order.id, item["competition_id"])
             
-            tickets.append({
-                "competition_id": item["competition_id"],
-                "title": item["title"],
-                "numbers": [{"number": num} for num in allocated],
-                "instant_wins": list(instant_wins_grouped.values())
-            })
+                    tickets.append({
+                        "competition_id": item["competition_id"],
+                        "title": item["title"],
+                        "numbers": [{"number": num} for num in allocated],
+                        "instant_wins": group_instant_wins(instant_win_tickets)
+                    })
             
-            # Update tickets_sold count
-            new_tickets_sold = comp.get("tickets_sold", 0) + item["quantity"]
-            await db.competitions.update_one(
-                {"id": item["competition_id"]},
-                {"$set": {"tickets_sold": new_tickets_sold}}
-            )
+                    # Update tickets_sold count
+                    await repos.competitions.inc_tickets_sold(item["competition_id"], item["quantity"])
             
-            # Create competition entry record
-            entry = {
-                "id": str(uuid.uuid4()),
-                "competition_id": item["competition_id"],
-                "user_id": current_user["user_id"],
-                "user_email": user["email"],
-                "user_name": user.get("name", ""),
-                "ticket_numbers": allocated,
-                "quantity": item["quantity"],
-                "total_paid": item["price"] * item["quantity"],
-                "order_id": order.id,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            await db.competition_entries.insert_one(entry)
+                    # Create competition entry record
+                    entry = {
+                        "id": str(uuid.uuid4()),
+                        "competition_id": item["competition_id"],
+                        "user_id": current_user["user_id"],
+                        "user_email": user["email"],
+                        "user_name": user.get("name", ""),
+                        "ticket_numbers": allocated,
+                        "quantity": item["quantity"],
+                        "total_paid": item["price"] * item["quantity"],
+                        "order_id": order.id,
+                        "created_at": order.created_at
+                    }
+                    await repos.orders.insert_entry(entry)
+                    await repos.analytics.record_sale(
+                        item["competition_id"], item["quantity"], entry["total_paid"], at=order.created_at
+                    )
         
-        order_dict["tickets"] = tickets
-        order_dict["payment_status"] = "completed"
+            order_dict["tickets"] = tickets
+            order_dict["payment_status"] = "completed"
         
-        # Save order
-        await db.orders.insert_one(order_dict)
+            # Save order
+            with checkout_stage_seconds.time(stage="order_insert"):
+                await repos.orders.insert(order_dict)
+        except Exception:
+            # The order was not saved: give the balance and the coupon use back
+            if debited:
+                await repos.users.credit(current_user["user_id"], balance_key, total)
+                invalidate_profile(current_user["user_id"])
+            if coupon_code:
+                await repos.coupons.release(coupon_code)
+                invalidate_coupon(coupon_code)
+            raise
+        await repos.analytics.record_order(total, completed=True, created_at=order.created_at)
         
         # Clear cart
-        await db.carts.update_one(
-            {"user_id": current_user["user_id"]},
-            {"$set": {"items": [], "discount": 0.0, "coupon_code": "", "updated_at": datetime.utcnow().isoformat()}}
-        )
-        
-        # Increment coupon usage
-        if cart.get("coupon_code"):
-            await db.coupons.update_one(
-                {"code": cart["coupon_code"]},
-                {"$inc": {"times_used": 1}}
-            )
+        with checkout_stage_seconds.time(stage="cart_clear"):
+            await repos.carts.clear(current_user["user_id"])
         
         return {
             "success": True,
@@ -607,8 +610,10 @@ async def complete_checkout(
             "redirect_url": None
         }
     else:
-        # Card payment - save pending order and return payment URL
-        await db.orders.insert_one(order_dict)
+        # Card payment - save pending order and return payment URL. The coupon
+        # use is redeemed when the payment is captured, not per checkout attempt.
+        await repos.orders.insert(order_dict)
+        await repos.analytics.record_order(total, completed=False, created_at=order.created_at)
         
         # TODO: Integrate with Cashflows payment gateway
         # For now, return a mock redirect URL
@@ -626,20 +631,24 @@ async def complete_checkout(
 
 
 @api_router.get("/orders")
-async def get_orders(current_user: dict = Depends(get_current_user)):
+async def get_orders(
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Get user's orders"""
-    orders = await db.orders.find(
-        {"user_id": current_user["user_id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
+    orders = await repos.orders.list_for_user(current_user["user_id"], limit=100)
     
     return orders
 
 
 @api_router.get("/orders/{order_id}")
-async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
+async def get_order(
+    order_id: str,
+    current_user: dict = Depends(get_current_user),
+    repos: Repositories = Depends(get_repositories)
+):
     """Get single order"""
-    order = await db.orders.find_one({"id": order_id, "user_id": current_user["user_id"]}, {"_id": 0})
+    order = await repos.orders.get_for_user(order_id, current_user["user_id"])
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -652,51 +661,101 @@ async def get_order(order_id: str, current_user: dict = Depends(get_current_user
 
 @api_router.get("/admin/stats")
 async def get_admin_stats(current_user: dict = Depends(get_current_admin_user)):
-    """Get admin dashboard stats"""
-    total_competitions = await db.competitions.count_documents({})
-    total_orders = await db.orders.count_documents({})
-    total_users = await db.users.count_documents({})
-    
-    # Calculate total revenue
-    orders = await db.orders.find({"payment_status": "completed"}).to_list(10000)
-    total_revenue = sum(order.get("total", 0) for order in orders)
+    """Get admin dashboard stats (from the incrementally maintained rollup)"""
+    today = datetime.utcnow().strftime(admin_stats.DAY_FORMAT)
+    rollup = await admin_stats.get_rollup(db, today)
     
     return {
-        "total_competitions": total_competitions,
-        "total_orders": total_orders,
-        "total_users": total_users,
-        "total_revenue": total_revenue
+        "total_competitions": rollup.get("competitions", 0),
+        "total_orders": rollup.get("orders", 0),
+        "total_users": rollup.get("users", 0),
+        "total_revenue": rollup.get("revenue", 0.0),
+        "orders_today": rollup["day"].get("orders", 0),
+        "revenue_today": rollup["day"].get("revenue", 0.0)
     }
 
 
+@api_router.post("/admin/stats/rebuild")
+async def rebuild_admin_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Recompute the stats rollup from the collections (admin only, for maintenance)"""
+    rollup = await admin_stats.rebuild_rollup(db)
+    rollup.pop("_id", None)
+    return rollup
+
+
+# Entry pages carry a preview of the ticket numbers; exports have the full list
+ENTRY_PAGE_PROJECTION = {"_id": 0, "ticket_numbers": {"$slice": 10}}
+
+
 @api_router.get("/admin/competitions/{competition_id}/entries")
 async def get_competition_entries(
     competition_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user: dict = Depends(get_current_admin_user)
 ):
-    """Get all entries for a competition"""
-    entries = await db.competition_entries.find(
-        {"competition_id": competition_id},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(10000)
+    """Get a page of entries for a competition, with metrics over all of them"""
+    query = {"competition_id": competition_id}
+    if search and search.strip():
+        # Case-insensitive substring match, as the entries page always had. A
+        # regex can't use an index, but the competition_id index keeps the scan
+        # to this competition's entries.
+        contains = {"$regex": re.escape(search.strip()), "$options": "i"}
+        query["$or"] = [
+            {"user_email": contains},
+            {"user_name": contains},
+            {"order_id": contains}
+        ]
+    
+    rows = await db.competition_entries.find(
+        keyset_query(query, cursor), ENTRY_PAGE_PROJECTION
+    ).sort(SORT).limit(limit + 1).to_list(limit + 1)
+    entries, next_cursor = page(rows, limit)
     
-    # Calculate metrics
-    total_entries = len(entries)
-    total_tickets = sum(entry.get("quantity", 0) for entry in entries)
-    total_revenue = sum(entry.get("total_paid", 0) for entry in entries)
-    unique_users = len(set(entry.get("user_id") for entry in entries))
+    # Group by user first so unique users is a count of groups (no $addToSet set)
+    totals = {"total_entries": 0, "total_tickets": 0, "total_revenue": 0.0, "unique_users": 0}
+    async for row in db.competition_entries.aggregate([
+        {"$match": {"competition_id": competition_id}},
+        {"$group": {
+            "_id": "$user_id",
+            "entries": {"$sum": 1},
+            "tickets": {"$sum": "$quantity"},
+            "revenue": {"$sum": "$total_paid"}
+        }},
+        {"$group": {
+            "_id": None,
+            "total_entries": {"$sum": "$entries"},
+            "total_tickets": {"$sum": "$tickets"},
+            "total_revenue": {"$sum": "$revenue"},
+            "unique_users": {"$sum": 1}
+        }},
+        {"$project": {"_id": 0}}
+    ]):
+        totals = row
     
     return {
         "entries": entries,
-        "metrics": {
-            "total_entries": total_entries,
-            "total_tickets": total_tickets,
-            "total_revenue": total_revenue,
-            "unique_users": unique_users
-        }
+        "next_cursor": next_cursor,
+        "metrics": totals
     }
 
 
+@api_router.get("/admin/competitions/{competition_id}/entries/export")
+async def export_competition_entries(
+    competition_id: str,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Stream every entry for a competition as CSV or NDJSON (admin only)"""
+    cursor = db.competition_entries.find(
+        {"competition_id": competition_id},
+        projection(ENTRY_EXPORT_FIELDS)
+    ).sort(SORT).batch_size(EXPORT_BATCH_SIZE)
+    
+    return export_response(cursor, ENTRY_EXPORT_FIELDS, fmt, f"entries-{competition_id}")
+
+
 @api_router.post("/admin/competitions/{competition_id}/find-winner")
 async def find_winner_by_ticket(
     competition_id: str,
@@ -704,38 +763,172 @@ async def find_winner_by_ticket(
     current_user: dict = Depends(get_current_admin_user)
 ):
     """Find winner by ticket number"""
-    # Search for entry with this ticket number
-    entry = await db.competition_entries.find_one(
-        {
-            "competition_id": competition_id,
-            "ticket_numbers": ticket_number
-        },
-        {"_id": 0}
-    )
+    winner = (await resolve_tickets(db, competition_id, [ticket_number])).get(ticket_number)
     
-    if not entry:
+    if not winner:
         return {
             "found": False,
             "message": f"Ticket number {ticket_number} not found in entries"
         }
     
-    # Get user details
-    user = await db.users.find_one({"id": entry["user_id"]}, {"_id": 0})
-    
     return {
         "found": True,
         "ticket_number": ticket_number,
-        "winner": {
-            "user_id": entry["user_id"],
-            "name": entry["user_name"],
-            "email": entry["user_email"],
-            "entry_id": entry["id"],
-            "order_id": entry["order_id"],
-            "purchase_date": entry["created_at"]
-        }
+        "winner": winner
+    }
+
+
+@api_router.post("/admin/competitions/{competition_id}/resolve-tickets")
+async def resolve_winning_tickets(
+    competition_id: str,
+    lookup: TicketLookupRequest,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Resolve a batch of instant-win or draw numbers to their holders"""
+    winners = await resolve_tickets(db, competition_id, lookup.ticket_numbers)
+    
+    return {
+        "results": [
+            {"ticket_number": number, "found": number in winners, "winner": winners.get(number)}
+            for number in lookup.ticket_numbers
+        ],
+        "found": len(winners),
+        "not_found": [number for number in lookup.ticket_numbers if number not in winners]
+    }
+
+
+@api_router.get("/admin/competitions/{competition_id}/sales-velocity")
+async def get_sales_velocity(
+    competition_id: str,
+    granularity: str = Query("hour", pattern="^(minute|hour)$"),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    rate_window_minutes: int = Query(60, ge=1, le=24 * 60),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Tickets and revenue per minute/hour with a projected sell-out time (admin only)"""
+    comp = await db.competitions.find_one(
+        {"id": competition_id}, {"_id": 0, "max_tickets": 1, "tickets_sold": 1}
+    )
+    if not comp:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    
+    now = datetime.utcnow()
+    series = await sales_velocity.get_series(db, competition_id, granularity, now - timedelta(hours=hours))
+    
+    # The rate covers whole minute buckets, so its window starts on a minute boundary
+    rate_since = sales_velocity.bucket_start(now - timedelta(minutes=rate_window_minutes), "minute")
+    recent = await sales_velocity.get_series(db, competition_id, "minute", rate_since)
+    sell_out = sales_velocity.project_sell_out(
+        comp.get("max_tickets", 0) - comp.get("tickets_sold", 0),
+        sum(bucket["tickets"] for bucket in recent),
+        now - rate_since,
+        now
+    )
+    
+    return {
+        "competition_id": competition_id,
+        "granularity": granularity,
+        "series": series,
+        "tickets_sold": comp.get("tickets_sold", 0),
+        "max_tickets": comp.get("max_tickets", 0),
+        "rate_window_minutes": rate_window_minutes,
+        **sell_out
     }
 
 
+@api_router.post("/admin/competitions/{competition_id}/instant-wins/generate")
+async def generate_instant_wins(
+    competition_id: str,
+    generate_request: InstantWinGenerateRequest,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Generate unique instant-win numbers for each prize tier (admin only)"""
+    comp = await db.competitions.find_one(
+        {"id": competition_id}, {"_id": 0, "max_tickets": 1, "tickets_sold": 1}
+    )
+    if not comp:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    if comp.get("tickets_sold", 0) > 0 or await db.tickets.find_one({"competition_id": competition_id}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Instant wins cannot be regenerated after tickets are sold")
+    
+    tiers = [tier.model_dump() for tier in generate_request.tiers]
+    max_tickets = comp.get("max_tickets", 0)
+    try:
+        numbers = instant_wins.generate_numbers(max_tickets, [tier["qty"] for tier in tiers], generate_request.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await instant_wins.save_numbers(db, competition_id, max_tickets, tiers, numbers)
+
+
+@api_router.get("/admin/competitions/{competition_id}/instant-wins")
+async def get_instant_wins(
+    competition_id: str,
+    include_numbers: bool = False,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Generated instant-win tiers, optionally with their numbers (admin only)"""
+    doc = await db.instant_win_numbers.find_one({"competition_id": competition_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="No instant-win numbers generated")
+    return instant_wins.summary(doc, include_numbers=include_numbers)
+
+
+@api_router.post("/admin/competitions/{competition_id}/draw/commit")
+async def commit_draw(
+    competition_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Commit to a secret draw seed ahead of the draw (admin only)"""
+    return await draw_engine.create_commitment(db, competition_id, current_user["user_id"])
+
+
+@api_router.post("/admin/competitions/{competition_id}/draw")
+async def draw_winners(
+    competition_id: str,
+    draw_request: DrawRequest,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Draw a random winner (and runners-up) from the sold tickets (admin only)"""
+    try:
+        return await draw_engine.run_draw(
+            db,
+            competition_id,
+            winners=draw_request.winners,
+            client_seed=draw_request.client_seed,
+            drawn_by=current_user["user_id"],
+            commitment_id=draw_request.commitment_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@api_router.get("/admin/competitions/{competition_id}/draws")
+async def get_draws(
+    competition_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Audit trail of draws for a competition; seeds stay hidden until drawn"""
+    draws = await db.draws.find(
+        {"competition_id": competition_id}, {"_id": 0}
+    ).sort("created_at", -1).to_list(100)
+    for draw in draws:
+        if draw.get("status") == "committed":
+            draw.pop("seed", None)
+    return draws
+
+
+@api_router.post("/admin/competitions/{competition_id}/rank-index/rebuild")
+async def rebuild_rank_index(
+    competition_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Recount the sold-ticket rank index used by draws (admin only)"""
+    index = await draw_engine.rebuild_rank_index(db, competition_id)
+    index.pop("_id", None)
+    return {"competition_id": competition_id, "total": index["total"], "blocks": len(index["counts"])}
+
+
 @api_router.post("/admin/competitions/{competition_id}/mark-winner")
 async def mark_competition_winner(
     competition_id: str,
@@ -743,16 +936,10 @@ async def mark_competition_winner(
     current_user: dict = Depends(get_current_admin_user)
 ):
     """Mark a competition as won with winner details"""
-    # Find the entry first
-    entry = await db.competition_entries.find_one(
-        {
-            "competition_id": competition_id,
-            "ticket_numbers": ticket_number
-        },
-        {"_id": 0}
-    )
+    # Find the holder of the ticket first
+    winner = (await resolve_tickets(db, competition_id, [ticket_number])).get(ticket_number)
     
-    if not entry:
+    if not winner:
         raise HTTPException(status_code=404, detail="Ticket number not found")
     
     # Update competition with winner
@@ -761,11 +948,11 @@ async def mark_competition_winner(
         {
             "$set": {
                 "is_finished": True,
-                "winner_user_id": entry["user_id"],
-                "winner_name": entry["user_name"],
-                "winner_email": entry["user_email"],
+                "winner_user_id": winner["user_id"],
+                "winner_name": winner["name"],
+                "winner_email": winner["email"],
                 "winning_ticket_number": ticket_number,
-                "draw_date": datetime.utcnow().isoformat(),
+                "draw_date": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
         }
@@ -778,39 +965,95 @@ async def mark_competition_winner(
         "success": True,
         "message": "Winner marked successfully",
         "winner": {
-            "name": entry["user_name"],
-            "email": entry["user_email"],
+            "name": winner["name"],
+            "email": winner["email"],
             "ticket_number": ticket_number
         }
     }
 
 
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_admin_user)):
+    """Get in-process metrics for this worker (admin only)"""
+    return metrics.snapshot()
+
+
+# Admin order listings leave out the embedded ticket arrays
+ORDER_LIST_PROJECTION = {
+    "_id": 0, "id": 1, "order_number": 1, "user_id": 1, "user_email": 1, "user_name": 1,
+    "total": 1, "discount": 1, "payment_method": 1, "payment_status": 1,
+    "ticket_count": 1, "created_at": 1
+}
+
+
 @api_router.get("/admin/orders")
-async def get_all_orders(current_user: dict = Depends(get_current_admin_user)):
-    """Get all orders with metrics (admin only)"""
-    orders_cursor = db.orders.find({}, {"_id": 0}).sort("created_at", -1)
-    orders = await orders_cursor.to_list(length=1000)
+async def get_all_orders(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Get a page of orders with metrics (admin only)"""
+    query = {}
+    if status:
+        query["payment_status"] = status
+    if payment_method:
+        query["payment_method"] = payment_method
     
-    # Calculate metrics
-    total_revenue = sum(order.get("total", 0) for order in orders)
-    total_orders = len(orders)
+    rows = await db.orders.find(
+        keyset_query(query, cursor), ORDER_LIST_PROJECTION
+    ).sort(SORT).limit(limit + 1).to_list(limit + 1)
+    orders, next_cursor = page(rows, limit)
     
-    # Today's metrics
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    orders_today = [o for o in orders if datetime.fromisoformat(o.get("created_at", "2000-01-01")) >= today_start]
-    revenue_today = sum(order.get("total", 0) for order in orders_today)
+    # Store-wide metrics from the stats rollup, as on the dashboard: the filters
+    # apply to the page only; orders count every status, revenue completed ones
+    today = datetime.utcnow().strftime(admin_stats.DAY_FORMAT)
+    rollup = await admin_stats.get_rollup(db, today)
     
     return {
         "orders": orders,
+        "next_cursor": next_cursor,
         "metrics": {
-            "total_revenue": total_revenue,
-            "total_orders": total_orders,
-            "orders_today": len(orders_today),
-            "revenue_today": revenue_today
+            "total_revenue": rollup.get("revenue", 0.0),
+            "total_orders": rollup.get("orders", 0),
+            "orders_today": rollup["day"].get("orders", 0),
+            "revenue_today": rollup["day"].get("revenue", 0.0)
         }
     }
 
 
+@api_router.get("/admin/exports/orders")
+async def export_orders(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Stream all orders as CSV or NDJSON (admin only)"""
+    query = {}
+    if status:
+        query["payment_status"] = status
+    if payment_method:
+        query["payment_method"] = payment_method
+    
+    cursor = db.orders.find(
+        query, projection(ORDER_EXPORT_FIELDS)
+    ).sort(SORT).batch_size(EXPORT_BATCH_SIZE)
+    
+    return export_response(cursor, ORDER_EXPORT_FIELDS, fmt, "orders")
+
+
+@api_router.get("/admin/orders/{order_id}")
+async def get_order_admin(order_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Get a single order including its tickets (admin only)"""
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    return order
+
+
 # Include routers in the main app
 app.include_router(api_router)
 app.include_router(payment_router, prefix="/api")
@@ -823,6 +1066,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(DbMonitorMiddleware)
+# Reject oversized uploads before FastAPI spools the multipart body
+app.add_middleware(UploadLimitMiddleware, paths={"/api/upload"})
+# Outermost, so the timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint; requires `Bearer METRICS_TOKEN` when that is set"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+    image_variants.shutdown()
@@ -0,0 +1,31 @@
+"""
+Derived fields computed for API responses
+"""
+from typing import Any, Dict, List
+
+
+def sold_percentage(comp: Dict[str, Any]) -> int:
+    """Percentage sold shown on competition cards; an admin override wins"""
+    max_tickets = comp.get("max_tickets", 0)
+    tickets_sold = comp.get("tickets_sold", 0)
+    sold_override = comp.get("sold_override", 0)
+    
+    if sold_override > 0:
+        return sold_override
+    if max_tickets > 0 and tickets_sold > 0:
+        return min(100, round((tickets_sold / max_tickets) * 100))
+    return 0
+
+
+def group_instant_wins(tickets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Instant-win tickets grouped by prize, in first-seen order"""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for ticket in tickets:
+        prize_label = ticket.get("win_label", "")
+        if prize_label not in grouped:
+            grouped[prize_label] = {
+                "prize": prize_label,
+                "ticket_numbers": []
+            }
+        grouped[prize_label]["ticket_numbers"].append(ticket["ticket_number"])
+    return list(grouped.values())
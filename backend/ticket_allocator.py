@@ -1,11 +1,14 @@
 import random
 from typing import List, Dict, Any
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
 from models import Ticket
+from user_cache import invalidate_profile
+from instant_wins import InstantWinLookup, get_lookup
+from repositories import Repositories
 
 
 async def allocate_tickets(
-    db: AsyncIOMotorDatabase,
+    repos: Repositories,
     competition_id: str,
     quantity: int,
     order_id: str,
@@ -21,6 +24,7 @@ async def allocate_tickets(
     if max_tickets <= 0:
         return []
     
+    lookup = await get_lookup(repos.competitions, competition_id, instant_wins)
     allocated = []
     attempts = 0
     max_attempts = quantity * 50
@@ -30,16 +34,11 @@ async def allocate_tickets(
         ticket_number = random.randint(1, max_tickets)
         
         # Check if ticket already allocated
-        existing = await db.tickets.find_one({
-            "competition_id": competition_id,
-            "ticket_number": ticket_number
-        })
-        
-        if existing:
+        if await repos.tickets.exists(competition_id, ticket_number):
             continue
         
         # Check for instant win
-        win_info = check_instant_win(ticket_number, instant_wins)
+        win_info = check_instant_win(ticket_number, lookup)
         
         # Create ticket record
         ticket = Ticket(
@@ -53,35 +52,33 @@ async def allocate_tickets(
             wallet_type=win_info["wallet_type"]
         )
         
-        # Insert ticket
+        # Insert ticket; the unique index rejects a number taken concurrently
         ticket_dict = ticket.model_dump()
-        ticket_dict["created_at"] = ticket_dict["created_at"].isoformat()
-        await db.tickets.insert_one(ticket_dict)
+        try:
+            await repos.tickets.insert(ticket_dict)
+        except DuplicateKeyError:
+            continue
         
         allocated.append(ticket_number)
         
         # Credit wallet if instant win
         if win_info["is_win"] and win_info["amount"] > 0:
             meta_key = "cash_balance" if win_info["wallet_type"] == "cash" else "site_credit_balance"
-            user = await db.users.find_one({"id": user_id})
-            if user:
-                current_balance = user.get(meta_key, 0.0)
-                new_balance = current_balance + win_info["amount"]
-                await db.users.update_one(
-                    {"id": user_id},
-                    {"$set": {meta_key: new_balance}}
-                )
+            await repos.users.credit(user_id, meta_key, win_info["amount"])
+            invalidate_profile(user_id)
     
     if len(allocated) != quantity:
         # Rollback: delete allocated tickets for this order
-        await db.tickets.delete_many({"order_id": order_id})
+        await repos.tickets.delete_for_order(order_id)
         return []
     
+    await repos.tickets.record_sold(competition_id, allocated)
+    
     allocated.sort()
     return allocated
 
 
-def check_instant_win(ticket_number: int, instant_wins: List[Dict[str, Any]]) -> Dict[str, Any]:
+def check_instant_win(ticket_number: int, lookup: InstantWinLookup) -> Dict[str, Any]:
     """
     Check if a ticket number is an instant winner.
     Returns win information.
@@ -93,27 +90,11 @@ def check_instant_win(ticket_number: int, instant_wins: List[Dict[str, Any]]) ->
         "wallet_type": "site_credit"
     }
     
-    if not instant_wins:
-        return result
-    
-    for win in instant_wins:
-        name = win.get("name", "")
-        numbers_str = win.get("numbers", "")
-        
-        # Parse winning numbers (comma-separated)
-        if not numbers_str:
-            continue
-        
-        try:
-            winning_numbers = [int(n.strip()) for n in numbers_str.split(",") if n.strip()]
-        except ValueError:
-            continue
-        
-        if ticket_number in winning_numbers:
-            result["is_win"] = True
-            result["label"] = name
-            result["amount"] = float(win.get("amount", 0))
-            result["wallet_type"] = win.get("wallet_type", "site_credit")
-            break
+    win = lookup.match(ticket_number)
+    if win is not None:
+        result["is_win"] = True
+        result["label"] = win.get("name") or ""
+        result["amount"] = float(win.get("amount") or 0)
+        result["wallet_type"] = win.get("wallet_type") or "site_credit"
     
     return result
@@ -0,0 +1,385 @@
+"""
+Upload storage: streams request bodies to disk in chunks without blocking
+the event loop, enforces a size limit while streaming and publishes files
+with an atomic rename so readers never see a partial upload.
+UploadLimitMiddleware turns oversized upload requests away before their
+body is spooled.
+Files are content-addressed: they are named after the SHA-256 of their
+bytes, so identical uploads share one file and can be cached immutably.
+Serving supports single byte ranges and conditional GETs, with file
+metadata cached in memory so repeat hits skip the filesystem stat.
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import mimetypes
+import tempfile
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Tuple, Optional, NamedTuple
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # 1 MB
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", 250)) * 1024 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries and part headers around the file
+
+# mkstemp creates files 0600 and os.replace keeps the mode; stored files get
+# the mode a plain open() would give them. Read once, at import, as os.umask
+# can only be read by setting it.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+uploads_total = metrics.counter("uploads_total", "Upload attempts by outcome")
+upload_bytes_total = metrics.counter("upload_bytes_total", "Bytes written by completed uploads")
+upload_seconds_total = metrics.counter("upload_seconds_total", "Time spent streaming completed uploads")
+upload_last_throughput = metrics.gauge(
+    "upload_last_throughput_bytes_per_second", "Throughput of the most recent completed upload"
+)
+
+SERVE_CHUNK_SIZE = 256 * 1024
+FILE_META_TTL = float(os.environ.get("UPLOAD_META_TTL", 30))  # seconds, for mutable legacy names
+FILE_META_CACHE_SIZE = 4096
+
+# <sha256>[.w<width>].<ext> - originals and their resized variants
+CONTENT_ADDRESSED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{64})(?P<variant>\.w\d+)?(?P<ext>\.[A-Za-z0-9]+)?$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit",
+    )
+
+
+def _open_temp(dest_dir: Path) -> Tuple[BinaryIO, Path]:
+    fd, tmp_name = tempfile.mkstemp(dir=dest_dir, prefix=".upload-", suffix=".part")
+    os.fchmod(fd, 0o644 & ~_UMASK)
+    return os.fdopen(fd, "wb"), Path(tmp_name)
+
+
+def _sync_and_close(buffer: BinaryIO) -> None:
+    with buffer:
+        buffer.flush()
+        os.fsync(buffer.fileno())
+
+
+def _publish(tmp_path: Path, target: Path) -> bool:
+    """Move the finished file into place, unless the same content is already there"""
+    if target.exists():
+        tmp_path.unlink(missing_ok=True)
+        return False
+    os.replace(tmp_path, target)
+    return True
+
+
+async def save_upload(
+    file: UploadFile,
+    dest_dir: Path,
+    ext: str,
+    max_bytes: int = MAX_UPLOAD_BYTES
+) -> Tuple[str, int, bool]:
+    """
+    Stream an uploaded file into dest_dir under the SHA-256 of its content.
+    Chunks are read, hashed and written through the thread pool, the size
+    limit is checked as bytes arrive and the file only appears under its
+    final name once it is complete. If a file with the same content already
+    exists the new copy is discarded.
+    Returns (filename, bytes written, whether a new file was stored).
+    """
+    if file.size is not None and file.size > max_bytes:
+        uploads_total.inc(outcome="too_large")
+        raise _too_large(max_bytes)
+
+    started = time.perf_counter()
+    buffer, tmp_path = await run_in_threadpool(_open_temp, dest_dir)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    uploads_total.inc(outcome="too_large")
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(_sync_and_close, buffer)
+
+        filename = f"{digest.hexdigest()}{ext.lower()}"
+        created = await run_in_threadpool(_publish, tmp_path, dest_dir / filename)
+    except HTTPException:
+        await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+        raise
+    except Exception:
+        await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+        uploads_total.inc(outcome="failed")
+        logger.exception(f"Upload of {file.filename} failed after {size} bytes")
+        raise
+
+    elapsed = time.perf_counter() - started
+    uploads_total.inc(outcome="completed" if created else "deduplicated")
+    upload_bytes_total.inc(size)
+    upload_seconds_total.inc(elapsed)
+    if elapsed > 0:
+        upload_last_throughput.set(size / elapsed)
+    logger.info(
+        f"{'Stored' if created else 'Deduplicated'} upload {filename}: {size} bytes in {elapsed:.3f}s"
+    )
+
+    return filename, size, created
+
+
+class UploadLimitMiddleware:
+    """
+    Answers 413 for uploads to `paths` whose Content-Length is over the limit
+    without reading the body, and stops reading a body without one once it
+    passes the limit, so oversized uploads are never spooled in full.
+    save_upload still checks the exact file size.
+    """
+
+    def __init__(self, app, paths, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        self.max_body = max_bytes + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            uploads_total.inc(outcome="too_large")
+            response = JSONResponse({"detail": _too_large(self.max_bytes).detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    uploads_total.inc(outcome="too_large")
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def cache_headers(filename: str) -> Dict[str, str]:
+    """
+    Caching headers for a served upload. Content-addressed names can never
+    change content, so they get a strong ETag and an immutable max-age.
+    Legacy timestamp names keep the default revalidating behaviour.
+    """
+    match = CONTENT_ADDRESSED_NAME.match(filename)
+    if not match:
+        return {}
+    etag = match.group("digest")
+    if match.group("variant"):
+        etag += f"-{match.group('variant')[1:]}-{(match.group('ext') or '')[1:]}"
+    return {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": f'"{etag}"'}
+
+
+class FileMeta(NamedTuple):
+    stat: os.stat_result
+    etag: str
+    last_modified: str
+    headers: Dict[str, str]
+    expires_at: float
+
+
+_file_meta: "OrderedDict[str, FileMeta]" = OrderedDict()
+
+file_meta_hits = metrics.counter("upload_meta_cache_hits_total", "Upload metadata served from memory")
+file_meta_misses = metrics.counter("upload_meta_cache_misses_total", "Upload metadata read with a stat")
+
+
+async def get_file_meta(path: Path) -> Optional[FileMeta]:
+    """
+    Stat result and validators for an upload, or None if it doesn't exist.
+    Content-addressed files never change so they stay cached until evicted;
+    other names are re-checked after FILE_META_TTL seconds.
+    """
+    key = str(path)
+    meta = _file_meta.get(key)
+    if meta is not None and meta.expires_at > time.monotonic():
+        _file_meta.move_to_end(key)
+        file_meta_hits.inc()
+        return meta
+
+    file_meta_misses.inc()
+    try:
+        stat = await run_in_threadpool(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        _file_meta.pop(key, None)
+        return None
+
+    headers = cache_headers(path.name)
+    etag = headers.get("ETag") or f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    expires_at = float("inf") if "ETag" in headers else time.monotonic() + FILE_META_TTL
+    meta = FileMeta(stat, etag, formatdate(stat.st_mtime, usegmt=True), headers, expires_at)
+
+    _file_meta[key] = meta
+    _file_meta.move_to_end(key)
+    while len(_file_meta) > FILE_META_CACHE_SIZE:
+        _file_meta.popitem(last=False)
+    return meta
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, meta: FileMeta) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(meta.stat.st_mtime) <= since
+
+
+def is_not_modified(request: Request, meta: FileMeta) -> bool:
+    """If-None-Match takes precedence over If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, meta.etag, weak=True)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return _not_modified_since(if_modified_since, meta)
+    return False
+
+
+BYTE_RANGE = re.compile(r"^(?P<start>\d*)-(?P<end>\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end) offsets.
+    Returns None when the header should be ignored and the full file sent:
+    other units, several ranges, or a malformed range (RFC 9110 14.2).
+    Raises ValueError only for a valid range the file can't satisfy.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    match = BYTE_RANGE.match(spec.strip())
+    if not match or not (match.group("start") or match.group("end")):
+        return None
+
+    if not match.group("start"):
+        length = int(match.group("end"))
+        if length == 0:
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(0, size - length), size - 1
+
+    start = int(match.group("start"))
+    end = int(match.group("end")) if match.group("end") else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+async def _iter_file(path: Path, start: int, length: int):
+    file = await run_in_threadpool(open, path, "rb")
+    try:
+        await run_in_threadpool(file.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await run_in_threadpool(file.read, min(SERVE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_in_threadpool(file.close)
+
+
+async def serve_file(
+    request: Request,
+    path: Path,
+    media_type: Optional[str] = None,
+    extra_headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serve an upload with conditional GET (304) and single byte-range (206)
+    support. Raises a 404 HTTPException if the file doesn't exist.
+    """
+    meta = await get_file_meta(path)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    size = meta.stat.st_size
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {
+        **meta.headers,
+        "ETag": meta.etag,
+        "Last-Modified": meta.last_modified,
+        "Accept-Ranges": "bytes",
+        **(extra_headers or {}),
+    }
+
+    if is_not_modified(request, meta):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range is not None:
+        # Only honour the range if the client's copy is still current
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if not _etag_matches(if_range, meta.etag, weak=False):
+                range_header = None
+        elif not _not_modified_since(if_range, meta):
+            range_header = None
+
+    if range_header and size > 0:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(length),
+            })
+            return StreamingResponse(
+                _iter_file(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=meta.stat)
@@ -0,0 +1,95 @@
+"""
+Per-worker cache of user profiles (name, balances, admin flag).
+
+Profiles are read with a projection that never includes the password hash.
+Every write that changes a profile must `$inc` the user's `profile_version`
+(see BUMP_VERSION) and call invalidate_profile or store_profile. Other
+workers notice the change on their next revalidation: a cached entry is
+trusted for PROFILE_CACHE_TTL seconds, then checked against the version on
+the user document, so cross-worker staleness is bounded by the TTL.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import metrics
+
+if TYPE_CHECKING:
+    from repositories import UserRepository
+
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", 5))  # seconds
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 10000))
+
+PROFILE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "email": 1,
+    "name": 1,
+    "site_credit_balance": 1,
+    "cash_balance": 1,
+    "is_admin": 1,
+    "profile_version": 1,
+}
+
+# Merge into the `$inc` of any update that changes profile fields
+BUMP_VERSION = {"profile_version": 1}
+
+_profiles: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+profile_cache_lookups = metrics.counter("profile_cache_lookups_total", "User profile cache lookups by result")
+
+
+def store_profile(profile: Dict[str, Any]) -> None:
+    """Cache a profile that was just read or written (projected fields only)"""
+    cached = {key: profile[key] for key in PROFILE_PROJECTION if key != "_id" and key in profile}
+    _profiles[cached["id"]] = (cached, time.monotonic())
+    _profiles.move_to_end(cached["id"])
+    while len(_profiles) > PROFILE_CACHE_SIZE:
+        _profiles.popitem(last=False)
+
+
+def invalidate_profile(user_id: str) -> None:
+    _profiles.pop(user_id, None)
+
+
+async def get_profile(users: "UserRepository", user_id: str) -> Optional[Dict[str, Any]]:
+    """Profile for a user, or None if the user doesn't exist"""
+    entry = _profiles.get(user_id)
+    if entry is not None:
+        profile, checked_at = entry
+        if time.monotonic() - checked_at < PROFILE_CACHE_TTL:
+            _profiles.move_to_end(user_id)
+            profile_cache_lookups.inc(result="hit")
+            return profile
+
+        # Past the TTL: only re-read the profile if another worker changed it
+        current = await users.find_by_id(user_id, {"_id": 0, "profile_version": 1})
+        if current is None:
+            invalidate_profile(user_id)
+            profile_cache_lookups.inc(result="miss")
+            return None
+        if current.get("profile_version", 0) == profile.get("profile_version", 0):
+            store_profile(profile)
+            profile_cache_lookups.inc(result="revalidated")
+            return profile
+
+    profile_cache_lookups.inc(result="miss")
+    profile = await users.find_by_id(user_id, PROFILE_PROJECTION)
+    if profile is None:
+        invalidate_profile(user_id)
+        return None
+    store_profile(profile)
+    return profile
+
+
+def profile_response(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """User fields returned by the auth endpoints"""
+    return {
+        "id": profile["id"],
+        "email": profile["email"],
+        "name": profile.get("name", ""),
+        "site_credit_balance": profile.get("site_credit_balance", 0.0),
+        "cash_balance": profile.get("cash_balance", 0.0),
+        "is_admin": profile.get("is_admin", False)
+    }
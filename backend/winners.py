@@ -0,0 +1,54 @@
+"""
+Resolve ticket numbers to the entries (and users) that hold them.
+
+Lookups go through the tickets collection's unique
+(competition_id, ticket_number) index, then fetch the matching entries by
+order id, so any number of tickets resolves in two queries.
+"""
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+ENTRY_WINNER_PROJECTION = {
+    "_id": 0, "id": 1, "order_id": 1, "user_id": 1, "user_email": 1, "user_name": 1, "created_at": 1
+}
+
+
+async def resolve_tickets(
+    db: AsyncIOMotorDatabase,
+    competition_id: str,
+    ticket_numbers: List[int]
+) -> Dict[int, Dict[str, Any]]:
+    """Map each sold ticket number to its winner details; unsold numbers are left out"""
+    numbers = sorted(set(ticket_numbers))
+    if not numbers:
+        return {}
+
+    tickets = await db.tickets.find(
+        {"competition_id": competition_id, "ticket_number": {"$in": numbers}},
+        {"_id": 0, "ticket_number": 1, "order_id": 1}
+    ).to_list(None)
+    if not tickets:
+        return {}
+
+    order_ids = list({ticket["order_id"] for ticket in tickets})
+    entries = await db.competition_entries.find(
+        {"competition_id": competition_id, "order_id": {"$in": order_ids}},
+        ENTRY_WINNER_PROJECTION
+    ).to_list(None)
+    entries_by_order = {entry["order_id"]: entry for entry in entries}
+
+    winners = {}
+    for ticket in tickets:
+        entry = entries_by_order.get(ticket["order_id"])
+        if not entry:
+            continue
+        winners[ticket["ticket_number"]] = {
+            "user_id": entry["user_id"],
+            "name": entry.get("user_name", ""),
+            "email": entry.get("user_email", ""),
+            "entry_id": entry["id"],
+            "order_id": entry["order_id"],
+            "purchase_date": entry.get("created_at")
+        }
+    return winners
@@ -11,28 +11,48 @@ const CompetitionEntries = () => {
   const [competition, setCompetition] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const backendUrl = process.env.REACT_APP_BACKEND_URL;
 
   useEffect(() => {
     fetchData();
   }, [id]);
 
+  // Search runs on the server; wait for typing to pause before querying
+  useEffect(() => {
+    if (loading) return;
+    const timer = setTimeout(() => {
+      fetchEntries().catch((error) => console.error('Failed to search entries:', error));
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const fetchEntries = async (cursor = null) => {
+    const token = localStorage.getItem('token');
+    const entriesRes = await axios.get(
+      `${backendUrl}/api/admin/competitions/${id}/entries`,
+      {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { search: searchTerm || undefined, cursor: cursor || undefined },
+      }
+    );
+    const page = entriesRes.data.entries || [];
+    setEntries((prev) => (cursor ? [...prev, ...page] : page));
+    setNextCursor(entriesRes.data.next_cursor || null);
+    setMetrics(entriesRes.data.metrics);
+  };
+
   const fetchData = async () => {
     try {
       setLoading(true);
-      const token = localStorage.getItem('token');
-      const backendUrl = process.env.REACT_APP_BACKEND_URL;
 
       // Fetch competition details
       const compRes = await axios.get(`${backendUrl}/api/competitions/${id}`);
       setCompetition(compRes.data);
 
-      // Fetch entries
-      const entriesRes = await axios.get(
-        `${backendUrl}/api/admin/competitions/${id}/entries`,
-        { headers: { Authorization: `Bearer ${token}` } }
-      );
-      setEntries(entriesRes.data.entries);
-      setMetrics(entriesRes.data.metrics);
+      await fetchEntries();
     } catch (error) {
       console.error('Failed to fetch entries:', error);
       alert('Failed to load entries');
@@ -41,12 +61,16 @@ const CompetitionEntries = () => {
     }
   };
 
-  const filteredEntries = entries.filter(
-    (entry) =>
-      entry.user_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      entry.user_email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      entry.order_id.toLowerCase().includes(searchTerm.toLowerCase())
-  );
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      await fetchEntries(nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch entries:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   if (loading) {
     return (
@@ -135,14 +159,14 @@ const CompetitionEntries = () => {
             </tr>
           </thead>
           <tbody>
-            {filteredEntries.length === 0 ? (
+            {entries.length === 0 ? (
               <tr>
                 <td colSpan="7" style={{ textAlign: 'center', padding: '40px' }}>
                   No entries found
                 </td>
               </tr>
             ) : (
-              filteredEntries.map((entry) => (
+              entries.map((entry) => (
                 <tr key={entry.id}>
                   <td>
                     <strong>{entry.user_name || 'Unknown'}</strong>
@@ -154,8 +178,8 @@ const CompetitionEntries = () => {
                   <td>
                     <div className="ticket-numbers">
                       {entry.ticket_numbers.slice(0, 10).join(', ')}
-                      {entry.ticket_numbers.length > 10 &&
-                        ` ... (+${entry.ticket_numbers.length - 10} more)`}
+                      {entry.quantity > 10 &&
+                        ` ... (+${entry.quantity - 10} more)`}
                     </div>
                   </td>
                   <td>£{entry.total_paid.toFixed(2)}</td>
@@ -170,6 +194,13 @@ const CompetitionEntries = () => {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <div style={{ textAlign: 'center', padding: '20px' }}>
+            <button onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -9,41 +9,46 @@ const OrdersManagement = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedOrder, setSelectedOrder] = useState(null);
   const [filterStatus, setFilterStatus] = useState('all');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchOrders();
-  }, []);
+  }, [filterStatus]);
 
-  const fetchOrders = async () => {
+  // Orders are paged by the server; passing a cursor appends the next page
+  const fetchOrders = async (cursor = null) => {
     try {
-      setLoading(true);
+      cursor ? setLoadingMore(true) : setLoading(true);
       const token = localStorage.getItem('token');
       const backendUrl = process.env.REACT_APP_BACKEND_URL;
 
       const res = await axios.get(`${backendUrl}/api/admin/orders`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: {
+          status: filterStatus === 'all' ? undefined : filterStatus,
+          cursor: cursor || undefined,
+        },
       });
 
-      setOrders(res.data.orders || []);
+      const page = res.data.orders || [];
+      setOrders((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(res.data.next_cursor || null);
       setMetrics(res.data.metrics || {});
     } catch (error) {
       console.error('Failed to fetch orders:', error);
       alert('Failed to load orders');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
   const filteredOrders = orders.filter((order) => {
-    const matchesSearch =
+    return (
       order.id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      order.user_email?.toLowerCase().includes(searchTerm.toLowerCase());
-
-    const matchesStatus =
-      filterStatus === 'all' ||
-      order.status?.toLowerCase() === filterStatus.toLowerCase();
-
-    return matchesSearch && matchesStatus;
+      order.user_email?.toLowerCase().includes(searchTerm.toLowerCase())
+    );
   });
 
   if (loading) {
@@ -171,8 +176,8 @@ const OrdersManagement = () => {
                     <strong>£{(order.total || 0).toFixed(2)}</strong>
                   </td>
                   <td>
-                    <span className={`status-badge status-${order.status?.toLowerCase() || 'pending'}`}>
-                      {order.status || 'Pending'}
+                    <span className={`status-badge status-${order.payment_status?.toLowerCase() || 'pending'}`}>
+                      {order.payment_status || 'Pending'}
                     </span>
                   </td>
                   <td>{new Date(order.created_at).toLocaleDateString()}</td>
@@ -189,6 +194,13 @@ const OrdersManagement = () => {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <div style={{ textAlign: 'center', padding: '20px' }}>
+            <button className="btn-view" onClick={() => fetchOrders(nextCursor)} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Order Details Modal */}
@@ -217,8 +229,8 @@ const OrdersManagement = () => {
                   </div>
                   <div className="detail-item">
                     <span className="label">Status:</span>
-                    <span className={`status-badge status-${selectedOrder.status?.toLowerCase()}`}>
-                      {selectedOrder.status}
+                    <span className={`status-badge status-${selectedOrder.payment_status?.toLowerCase()}`}>
+                      {selectedOrder.payment_status}
                     </span>
                   </div>
                   <div className="detail-item">
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useCart } from '../../contexts/CartContext';
 import { useAuth } from '../../contexts/AuthContext';
+import { uploadSrcSet } from '../../lib/utils';
 import './CompetitionCard.css';
 
 const CompetitionCard = ({ competition }) => {
@@ -103,7 +104,12 @@ const CompetitionCard = ({ competition }) => {
           {competition.video ? (
             <video src={competition.video} autoPlay loop muted playsInline />
           ) : (
-            <img src={competition.image} alt={competition.title} />
+            <img
+              src={competition.image}
+              srcSet={uploadSrcSet(competition.image)}
+              sizes="(max-width: 600px) 100vw, 400px"
+              alt={competition.title}
+            />
           )}
         </div>
       </div>
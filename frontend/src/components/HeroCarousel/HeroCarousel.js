@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
+import { uploadSrcSet } from '../../lib/utils';
 import './HeroCarousel.css';
 
 const HeroCarousel = ({ competitions = [] }) => {
@@ -67,6 +68,8 @@ const HeroCarousel = ({ competitions = [] }) => {
                 ) : (
                   <img
                     src={competition.image}
+                    srcSet={uploadSrcSet(competition.image)}
+                    sizes="100vw"
                     alt={competition.title}
                     className="slide-image"
                   />
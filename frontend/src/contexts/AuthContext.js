@@ -61,6 +61,10 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    const currentToken = localStorage.getItem('token');
+    if (currentToken) {
+      authAPI.logout(currentToken).catch(() => {});
+    }
     localStorage.removeItem('token');
     setToken(null);
     setUser(null);
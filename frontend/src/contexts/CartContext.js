@@ -39,8 +39,8 @@ export const CartProvider = ({ children }) => {
 
   const addToCart = async (item) => {
     try {
-      await cartAPI.add(item);
-      await fetchCart();
+      const { data } = await cartAPI.add(item);
+      setCart(data.cart);
       return { success: true };
     } catch (error) {
       return { success: false, error: error.response?.data?.detail || 'Failed to add to cart' };
@@ -49,8 +49,8 @@ export const CartProvider = ({ children }) => {
 
   const updateQuantity = async (competitionId, quantity) => {
     try {
-      await cartAPI.update(competitionId, quantity);
-      await fetchCart();
+      const { data } = await cartAPI.update(competitionId, quantity);
+      setCart(data.cart);
       return { success: true };
     } catch (error) {
       return { success: false, error: error.response?.data?.detail || 'Failed to update cart' };
@@ -4,3 +4,13 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Widths the backend generates resized variants for (see backend/image_variants.py)
+const UPLOAD_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920];
+
+// Responsive srcset for uploaded images; the server picks the variant per width
+export function uploadSrcSet(url) {
+  if (!url || !url.includes('/api/uploads/')) return undefined;
+  const separator = url.includes('?') ? '&' : '?';
+  return UPLOAD_VARIANT_WIDTHS.map((width) => `${url}${separator}w=${width} ${width}w`).join(', ');
+}
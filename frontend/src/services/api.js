@@ -23,6 +23,7 @@ export const authAPI = {
   register: (data) => api.post('/auth/register', data),
   login: (data) => api.post('/auth/login', data),
   getMe: () => api.get('/auth/me'),
+  logout: (token) => api.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } }),
 };
 
 // Competitions
@@ -38,7 +39,7 @@ export const competitionsAPI = {
 export const cartAPI = {
   get: () => api.get('/cart'),
   add: (item) => api.post('/cart/add', item),
-  update: (competitionId, quantity) => api.post('/cart/update', { competition_id: competitionId, quantity }),
+  update: (competitionId, quantity) => api.post('/cart/update', null, { params: { competition_id: competitionId, quantity } }),
   clear: () => api.delete('/cart/clear'),
   applyCoupon: (code) => api.post('/cart/apply-coupon', null, { params: { code } }),
 };
@@ -0,0 +1,65 @@
+"""
+Compare a pytest-benchmark JSON report with the checked-in baseline.
+
+    python -m pytest tests/benchmarks --benchmark-only --benchmark-json=bench.json
+    python tests/benchmarks/check_regressions.py bench.json [--threshold 0.25]
+    python tests/benchmarks/check_regressions.py bench.json --update   # accept the new numbers
+
+Exits non-zero when any benchmark's median is more than `threshold` slower
+than its baseline. Timings only compare on similar hardware, so refresh
+baseline.json (--update) when the reference machine changes.
+"""
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def load_medians(report_path):
+    report = json.loads(Path(report_path).read_text())
+    return {bench["name"]: bench["stats"]["median"] for bench in report["benchmarks"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("report", help="JSON written by --benchmark-json")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, as a fraction")
+    parser.add_argument("--update", action="store_true", help="Overwrite the baseline with this report")
+    args = parser.parse_args()
+
+    current = load_medians(args.report)
+    if args.update:
+        Path(args.baseline).write_text(json.dumps({
+            "metric": "median_seconds",
+            "machine": f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}",
+            "benchmarks": dict(sorted(current.items())),
+        }, indent=2) + "\n")
+        print(f"Baseline updated with {len(current)} benchmarks")
+        return
+
+    baseline = json.loads(Path(args.baseline).read_text())["benchmarks"]
+    regressions = 0
+    print(f"{'benchmark':42} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, median in sorted(current.items()):
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:42} {'-':>12} {median * 1e6:>10.1f}us {'new':>8}")
+            continue
+        change = (median - base) / base
+        regressed = change > args.threshold
+        regressions += regressed
+        print(f"{name:42} {base * 1e6:>10.1f}us {median * 1e6:>10.1f}us {change * 100:>+7.1f}%"
+              + ("  REGRESSION" if regressed else ""))
+    for name in sorted(set(baseline) - set(current)):
+        print(f"{name:42} missing from the report")
+
+    if regressions:
+        sys.exit(f"{regressions} benchmarks regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks of hot pure-Python paths (pytest-benchmark).
+
+    python -m pytest tests/benchmarks --benchmark-only --benchmark-json=bench.json
+    python tests/benchmarks/check_regressions.py bench.json
+
+check_regressions.py compares the medians with baseline.json and fails
+when any benchmark is slower than the threshold allows.
+"""
+import random
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from auth import create_access_token, decode_token, decode_token_cached
+from instant_wins import InstantWinLookup, _legacy_lookup, generate_numbers
+from models import Competition, Order
+from summaries import group_instant_wins, sold_percentage
+from ticket_allocator import check_instant_win
+
+MAX_TICKETS = 100_000
+PRIZE_TIERS = [
+    {"name": "£1000 Cash", "qty": 5, "amount": 1000.0, "wallet_type": "cash"},
+    {"name": "£100 Cash", "qty": 50, "amount": 100.0, "wallet_type": "cash"},
+    {"name": "£25 Site Credit", "qty": 200, "amount": 25.0, "wallet_type": "site_credit"},
+    {"name": "£5 Site Credit", "qty": 1000, "amount": 5.0, "wallet_type": "site_credit"},
+    {"name": "Free Entry", "qty": 2500, "amount": 1.0, "wallet_type": "site_credit"},
+]
+
+
+@pytest.fixture(scope="module")
+def prize_numbers():
+    return generate_numbers(MAX_TICKETS, [tier["qty"] for tier in PRIZE_TIERS], seed=42)
+
+
+@pytest.fixture(scope="module")
+def legacy_prize_table(prize_numbers):
+    """The same prizes as typed into the admin form: comma-separated strings"""
+    return [
+        {**tier, "numbers": ", ".join(str(n) for n in numbers)}
+        for tier, numbers in zip(PRIZE_TIERS, prize_numbers)
+    ]
+
+
+@pytest.fixture(scope="module")
+def ticket_sample():
+    rng = random.Random(7)
+    return [rng.randint(1, MAX_TICKETS) for _ in range(1000)]
+
+
+@pytest.fixture(scope="module")
+def large_competition():
+    rng = random.Random(3)
+    return {
+        "id": "competition-1",
+        "title": "Win a Range Rover Sport",
+        "description": "Lorem ipsum " * 400,
+        "price": 2.99,
+        "max_tickets": MAX_TICKETS,
+        "tickets_sold": 41_234,
+        "tags": ["jackpot", "instawins"],
+        "instant_wins": [
+            {"name": f"Prize {i}", "qty": 10, "numbers": ", ".join(str(rng.randint(1, MAX_TICKETS)) for _ in range(10)),
+             "amount": 5.0, "wallet_type": "site_credit"}
+            for i in range(50)
+        ],
+        "instant_win_ticket_numbers": rng.sample(range(1, MAX_TICKETS + 1), 5000),
+        "benefits": [f"Benefit {i}" for i in range(20)],
+        "how_it_works": [{"step_number": i, "step_text": f"Step {i}"} for i in range(1, 6)],
+        "bulk_bundles": [{"quantity": q, "discount_percent": q / 10} for q in (5, 10, 25, 50, 100)],
+    }
+
+
+@pytest.fixture(scope="module")
+def large_order():
+    rng = random.Random(5)
+    return {
+        "order_number": 123456,
+        "user_id": "user-1",
+        "user_email": "user@example.com",
+        "total": 299.0,
+        "payment_status": "completed",
+        "ticket_count": 2000,
+        "tickets": [
+            {
+                "competition_id": f"competition-{c}",
+                "title": f"Competition {c}",
+                "numbers": [{"number": n} for n in rng.sample(range(1, MAX_TICKETS + 1), 100)],
+                "instant_wins": [],
+            }
+            for c in range(20)
+        ],
+    }
+
+
+def test_check_instant_win_generated(benchmark, prize_numbers, ticket_sample):
+    lookup = InstantWinLookup(PRIZE_TIERS, prize_numbers)
+    benchmark(lambda: [check_instant_win(n, lookup) for n in ticket_sample])
+
+
+def test_check_instant_win_legacy_table(benchmark, legacy_prize_table, ticket_sample):
+    def allocate():
+        # The typed-in table is parsed once per allocation
+        lookup = _legacy_lookup(legacy_prize_table)
+        return [check_instant_win(n, lookup) for n in ticket_sample]
+
+    benchmark(allocate)
+
+
+def test_generate_instant_win_numbers(benchmark):
+    benchmark(generate_numbers, MAX_TICKETS, [tier["qty"] for tier in PRIZE_TIERS])
+
+
+def test_competition_validate(benchmark, large_competition):
+    benchmark(Competition.model_validate, large_competition)
+
+
+def test_competition_model_dump(benchmark, large_competition):
+    competition = Competition.model_validate(large_competition)
+    benchmark(competition.model_dump)
+
+
+def test_order_validate_and_dump(benchmark, large_order):
+    benchmark(lambda: Order.model_validate(large_order).model_dump())
+
+
+def test_sold_percentage_1000_competitions(benchmark):
+    rng = random.Random(11)
+    competitions = [
+        {"max_tickets": rng.randint(1000, 100_000), "tickets_sold": rng.randint(0, 1000),
+         "sold_override": rng.choice([0, 0, 0, 75])}
+        for _ in range(1000)
+    ]
+    benchmark(lambda: [sold_percentage(comp) for comp in competitions])
+
+
+def test_jwt_create(benchmark):
+    benchmark(create_access_token, {"sub": "user-1", "email": "user@example.com"}, timedelta(hours=1))
+
+
+def test_jwt_decode(benchmark):
+    token = create_access_token({"sub": "user-1", "email": "user@example.com"}, timedelta(hours=1))
+    benchmark(decode_token, token)
+
+
+def test_jwt_decode_cached(benchmark):
+    token = create_access_token({"sub": "user-1", "email": "user@example.com"}, timedelta(hours=1))
+    decode_token_cached(token)
+    benchmark(decode_token_cached, token)
+
+
+def test_group_instant_wins(benchmark, prize_numbers):
+    tickets = [
+        {"ticket_number": int(n), "win_label": tier["name"]}
+        for tier, numbers in zip(PRIZE_TIERS, prize_numbers)
+        for n in np.asarray(numbers)[:100]
+    ]
+    random.Random(13).shuffle(tickets)
+    benchmark(group_instant_wins, tickets)
@@ -0,0 +1,73 @@
+"""
+The stats rollup against a real mongod (the rebuild is an aggregation):
+MONGO_TEST_URL, defaulting to mongodb://localhost:27017. Skipped when no
+server is reachable.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import admin_stats
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def db_name():
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_TEST_URL}")
+    name = f"admin_stats_{uuid.uuid4().hex[:8]}"
+    yield name
+    client.drop_database(name)
+    client.close()
+
+
+def test_rebuild_keeps_increments_made_while_it_runs(db_name, monkeypatch):
+    async def place_order(db, total):
+        created_at = datetime.utcnow()
+        await db.orders.insert_one({"id": uuid.uuid4().hex, "total": total, "payment_status": "completed",
+                                    "created_at": created_at})
+        await admin_stats.record_order(db, total, completed=True, created_at=created_at)
+
+    async def scenario():
+        client = AsyncIOMotorClient(MONGO_TEST_URL)
+        db = client[db_name]
+        try:
+            await db.orders.insert_many([
+                {"id": f"old{n}", "total": 2.0, "payment_status": "completed", "created_at": "2024-01-01T10:00:00"}
+                for n in range(5)
+            ])
+            await admin_stats.rebuild_rollup(db)
+
+            # Orders placed after the rebuild has counted them
+            count_documents = AsyncIOMotorCollection.count_documents
+
+            async def count_then_order(collection, *args, **kwargs):
+                count = await count_documents(collection, *args, **kwargs)
+                await place_order(db, 1.0)
+                return count
+
+            monkeypatch.setattr(AsyncIOMotorCollection, "count_documents", count_then_order)
+            await admin_stats.rebuild_rollup(db)
+            monkeypatch.undo()
+            await place_order(db, 1.0)
+
+            rollup = await admin_stats.get_rollup(db, "2024-01-01")
+            assert rollup["orders"] == 8
+            assert rollup["revenue"] == 13.0
+            assert rollup["day"] == {"orders": 5, "completed_orders": 5, "revenue": 10.0}
+            stored = await db.stats_rollups.find_one({"id": admin_stats.ROLLUP_ID})
+            assert "rebuilding" not in stored and "pending" not in stored
+        finally:
+            client.close()
+
+    asyncio.run(scenario())
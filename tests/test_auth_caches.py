@@ -0,0 +1,151 @@
+"""
+The per-worker caches in front of JWT verification and user profile reads.
+"""
+import asyncio
+import hashlib
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+import user_cache
+from repositories import in_memory_repositories
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    yield
+    auth._token_cache.clear()
+    auth._user_tokens.clear()
+    user_cache._profiles.clear()
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Tokens actually verified, as opposed to served from the cache"""
+    calls = []
+    decode_token = auth.decode_token
+
+    def counting(token):
+        calls.append(token)
+        return decode_token(token)
+
+    monkeypatch.setattr(auth, "decode_token", counting)
+    return calls
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).digest()
+
+
+def test_verified_token_is_served_from_the_cache(decodes):
+    token = auth.create_access_token({"sub": "u1", "is_admin": False})
+    assert auth.decode_token_cached(token)["sub"] == "u1"
+    assert auth.decode_token_cached(token)["sub"] == "u1"
+    assert len(decodes) == 1
+
+
+def test_cached_token_never_outlives_its_exp():
+    token = auth.create_access_token({"sub": "u1"}, expires_delta=timedelta(seconds=30))
+    payload = auth.decode_token_cached(token)
+    assert auth._token_cache[_digest(token)][1] == payload["exp"]
+
+    expired = auth.create_access_token({"sub": "u1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException) as exc:
+        auth.decode_token_cached(expired)
+    assert exc.value.status_code == 401
+    assert _digest(expired) not in auth._token_cache
+
+
+def test_lapsed_entry_is_verified_again(decodes):
+    token = auth.create_access_token({"sub": "u1"})
+    auth.decode_token_cached(token)
+    payload, _ = auth._token_cache[_digest(token)]
+    auth._token_cache[_digest(token)] = (payload, 0.0)
+    auth.decode_token_cached(token)
+    assert len(decodes) == 2
+
+
+def test_invalidate_user_tokens_drops_only_that_users_tokens(decodes):
+    tokens = [auth.create_access_token({"sub": sub, "n": n}) for sub, n in (("u1", 1), ("u1", 2), ("u2", 1))]
+    for token in tokens:
+        auth.decode_token_cached(token)
+    auth.invalidate_user_tokens("u1")
+    assert set(auth._token_cache) == {_digest(tokens[2])}
+    for token in tokens:
+        auth.decode_token_cached(token)
+    assert len(decodes) == 5
+
+
+def test_token_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(auth, "TOKEN_CACHE_SIZE", 2)
+    tokens = [auth.create_access_token({"sub": f"u{n}"}) for n in range(3)]
+    for token in tokens:
+        auth.decode_token_cached(token)
+    assert list(auth._token_cache) == [_digest(tokens[1]), _digest(tokens[2])]
+    assert set(auth._user_tokens) == {"u1", "u2"}
+
+
+class CountingUsers:
+    """Wraps a user repository and records the projection of every read"""
+
+    def __init__(self, users):
+        self.users = users
+        self.reads = []
+
+    async def find_by_id(self, user_id, projection=None):
+        self.reads.append(projection)
+        return await self.users.find_by_id(user_id, projection)
+
+
+def _expire(user_id):
+    profile, _ = user_cache._profiles[user_id]
+    user_cache._profiles[user_id] = (profile, 0.0)
+
+
+def test_profile_is_cached_without_the_password_hash():
+    repos = in_memory_repositories()
+    users = CountingUsers(repos.users)
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "a@x.com", "password_hash": "secret",
+                                  "site_credit_balance": 5.0, "profile_version": 0})
+        first = await user_cache.get_profile(users, "u1")
+        second = await user_cache.get_profile(users, "u1")
+        assert first == second and "password_hash" not in first
+        assert users.reads == [user_cache.PROFILE_PROJECTION]
+        assert await user_cache.get_profile(users, "nobody") is None
+
+    asyncio.run(scenario())
+
+
+def test_profile_past_the_ttl_is_revalidated_by_version():
+    repos = in_memory_repositories()
+    users = CountingUsers(repos.users)
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "a@x.com", "site_credit_balance": 5.0, "profile_version": 0})
+        await user_cache.get_profile(users, "u1")
+
+        # Unchanged: one version-only read, the cached profile is kept
+        _expire("u1")
+        assert (await user_cache.get_profile(users, "u1"))["site_credit_balance"] == 5.0
+        assert users.reads[-1] == {"_id": 0, "profile_version": 1}
+
+        # Debited by another worker: the version moved, so the profile is re-read
+        await repos.users.debit("u1", "site_credit_balance", 2.0)
+        _expire("u1")
+        assert (await user_cache.get_profile(users, "u1"))["site_credit_balance"] == 3.0
+        assert users.reads[-1] == user_cache.PROFILE_PROJECTION
+        assert len(users.reads) == 4
+
+    asyncio.run(scenario())
+
+
+def test_profile_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(user_cache, "PROFILE_CACHE_SIZE", 2)
+    for n in range(3):
+        user_cache.store_profile({"id": f"u{n}", "email": f"u{n}@x.com", "password_hash": "secret"})
+    assert list(user_cache._profiles) == ["u1", "u2"]
+    assert "password_hash" not in user_cache._profiles["u2"][0]
@@ -0,0 +1,105 @@
+"""
+Checkout against the in-memory repositories: a checkout that fails part way
+leaves the user's balance and the coupon's uses as they were, and card orders
+redeem their coupon once their payment is captured.
+"""
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "checkout_tests")
+
+import server  # noqa: E402
+from coupon_cache import invalidate_coupon  # noqa: E402
+from models import CheckoutRequest  # noqa: E402
+from payment_routes import complete_card_order  # noqa: E402
+from repositories import in_memory_repositories  # noqa: E402
+from user_cache import invalidate_profile  # noqa: E402
+
+
+def test_failed_allocation_refunds_balance_and_releases_coupon(monkeypatch):
+    repos = in_memory_repositories()
+    repos.coupons.add({"code": "SAVE1", "discount_amount": 1.0, "is_active": True, "max_uses": 5, "times_used": 0})
+
+    async def failing_allocation(**kwargs):
+        raise RuntimeError("allocation failed")
+
+    monkeypatch.setattr(server, "allocate_tickets", failing_allocation)
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "u1@x.com", "name": "U", "site_credit_balance": 20.0})
+        await repos.competitions.insert({"id": "c1", "title": "C", "max_tickets": 100, "tickets_sold": 0})
+        await repos.carts.add_item("u1", {"competition_id": "c1", "title": "C", "price": 3.0, "quantity": 2, "image": ""})
+        await repos.carts.set_coupon("u1", "SAVE1", 1.0)
+
+        with pytest.raises(RuntimeError):
+            await server.complete_checkout(
+                CheckoutRequest(payment_method="site_credit"), current_user={"user_id": "u1"}, repos=repos
+            )
+
+        user = await repos.users.find_by_id("u1")
+        assert user["site_credit_balance"] == 20.0
+        assert (await repos.coupons.find_active("SAVE1"))["times_used"] == 0
+        assert (await repos.carts.get("u1"))["items"]
+        assert await repos.orders.list_for_user("u1", 10) == []
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        invalidate_profile("u1")  # the caches are per process
+        invalidate_coupon("SAVE1")
+
+
+def test_insufficient_balance_releases_coupon():
+    repos = in_memory_repositories()
+    repos.coupons.add({"code": "SAVE2", "discount_amount": 1.0, "is_active": True, "max_uses": 5, "times_used": 0})
+
+    async def scenario():
+        await repos.users.insert({"id": "u2", "email": "u2@x.com", "name": "U", "site_credit_balance": 1.0})
+        await repos.carts.add_item("u2", {"competition_id": "c1", "title": "C", "price": 3.0, "quantity": 2, "image": ""})
+        await repos.carts.set_coupon("u2", "SAVE2", 1.0)
+
+        with pytest.raises(HTTPException) as exc:
+            await server.complete_checkout(
+                CheckoutRequest(payment_method="site_credit"), current_user={"user_id": "u2"}, repos=repos
+            )
+        assert exc.value.status_code == 400
+        assert (await repos.users.find_by_id("u2"))["site_credit_balance"] == 1.0
+        assert (await repos.coupons.find_active("SAVE2"))["times_used"] == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        invalidate_profile("u2")
+        invalidate_coupon("SAVE2")
+
+
+def test_card_order_redeems_coupon_once_when_captured():
+    repos = in_memory_repositories()
+    repos.coupons.add({"code": "SAVE3", "discount_amount": 1.0, "is_active": True, "max_uses": 5, "times_used": 0})
+
+    async def scenario():
+        await repos.users.insert({"id": "u3", "email": "u3@x.com", "name": "U"})
+        await repos.carts.add_item("u3", {"competition_id": "c1", "title": "C", "price": 3.0, "quantity": 2, "image": ""})
+        await repos.carts.set_coupon("u3", "SAVE3", 1.0)
+
+        response = await server.complete_checkout(
+            CheckoutRequest(payment_method="card"), current_user={"user_id": "u3"}, repos=repos
+        )
+        assert (await repos.coupons.find_active("SAVE3"))["times_used"] == 0
+
+        # Webhooks can be delivered more than once
+        orders = [await complete_card_order(repos, response["order_id"]) for _ in range(2)]
+        assert orders[0]["payment_status"] == "completed" and orders[1] is None
+        assert (await repos.coupons.find_active("SAVE3"))["times_used"] == 1
+        assert repos.analytics.counters["completed_orders"] == 1
+        assert repos.analytics.counters["revenue"] == 5.0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        invalidate_profile("u3")
+        invalidate_coupon("SAVE3")
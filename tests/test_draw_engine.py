@@ -0,0 +1,58 @@
+"""
+Draws over the rank index, against a real mongod (the index rebuild is an
+aggregation): MONGO_TEST_URL, defaulting to mongodb://localhost:27017.
+Skipped when no server is reachable.
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import draw_engine
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def db_name():
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_TEST_URL}")
+    name = f"draw_engine_{uuid.uuid4().hex[:8]}"
+    yield name
+    client.drop_database(name)
+    client.close()
+
+
+def test_draw_sees_tickets_sold_before_the_index_existed(db_name):
+    async def scenario():
+        client = AsyncIOMotorClient(MONGO_TEST_URL)
+        db = client[db_name]
+        try:
+            # Tickets sold before the rank index was introduced
+            await db.tickets.insert_many([
+                {"competition_id": "c1", "ticket_number": n, "user_id": "u1", "order_id": "o1"} for n in range(1, 2001)
+            ])
+            # The first sale afterwards must not create an index holding only itself
+            await db.tickets.insert_one({"competition_id": "c1", "ticket_number": 5000, "user_id": "u2", "order_id": "o2"})
+            await draw_engine.record_sold(db, "c1", [5000])
+
+            draw = await draw_engine.run_draw(db, "c1", winners=3, client_seed="seed", drawn_by="admin")
+            assert draw["sold_count"] == 2001
+            index = await db.ticket_rank_index.find_one({"competition_id": "c1"}, {"_id": 0})
+            assert index["total"] == 2001
+            assert index["counts"] == {"0": 1024, "1": 976, "4": 1}
+
+            await draw_engine.record_sold(db, "c1", [5001])
+            index = await db.ticket_rank_index.find_one({"competition_id": "c1"}, {"_id": 0})
+            assert index["total"] == 2002
+        finally:
+            client.close()
+
+    asyncio.run(scenario())
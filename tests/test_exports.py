@@ -0,0 +1,45 @@
+"""
+CSV exports are opened in spreadsheets: cells must come out as text, never
+as formulas.
+"""
+import asyncio
+import csv
+import io
+from datetime import datetime
+
+from exports import stream_rows
+
+
+async def _cursor(docs):
+    for doc in docs:
+        yield doc
+
+
+def _export_csv(docs, fields):
+    async def collect():
+        return b"".join([chunk async for chunk in stream_rows(_cursor(docs), fields, "csv")]).decode()
+
+    return list(csv.reader(io.StringIO(asyncio.run(collect()))))
+
+
+def test_csv_cells_cannot_start_a_formula():
+    docs = [
+        {"user_name": '=HYPERLINK("http://x","y")', "user_email": "+1@x.com", "total": -5.0},
+        {"user_name": "@SUM(A1)", "user_email": "-a@x.com", "total": 2.5},
+        {"user_name": "\tTab", "user_email": "\rcr@x.com", "total": 0},
+        {"user_name": "Ann = Bob", "user_email": "a@x.com", "total": None},
+    ]
+    rows = _export_csv(docs, ["user_name", "user_email", "total"])
+    assert rows == [
+        ["user_name", "user_email", "total"],
+        ["'=HYPERLINK(\"http://x\",\"y\")", "'+1@x.com", "-5.0"],
+        ["'@SUM(A1)", "'-a@x.com", "2.5"],
+        ["'\tTab", "'\rcr@x.com", "0"],
+        ["Ann = Bob", "a@x.com", ""],
+    ]
+
+
+def test_csv_formats_dates_and_lists():
+    docs = [{"created_at": datetime(2026, 1, 2, 3, 4, 5), "ticket_numbers": [3, 1, 2]}]
+    rows = _export_csv(docs, ["created_at", "ticket_numbers"])
+    assert rows[1] == ["2026-01-02T03:04:05", "3 1 2"]
@@ -0,0 +1,56 @@
+"""
+Every registered hot query must be answered from an index.
+
+Runs against a real mongod (explain() output is not emulated by mocks):
+MONGO_TEST_URL, defaulting to mongodb://localhost:27017. Skipped when no
+server is reachable. Uses a throwaway database that is dropped afterwards.
+"""
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from indexes import HOT_QUERIES, INDEXES, plan_stages
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def db():
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_TEST_URL}")
+
+    database = client[f"index_plans_{uuid.uuid4().hex[:8]}"]
+    for collection, models in INDEXES.items():
+        database[collection].create_indexes(models)
+    yield database
+    client.drop_database(database.name)
+    client.close()
+
+
+def test_registry_is_idempotent(db):
+    for collection, models in INDEXES.items():
+        db[collection].create_indexes(models)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(db, name):
+    query = HOT_QUERIES[name]
+    cursor = db[query.collection].find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    stages = plan_stages(cursor.explain())
+    assert "COLLSCAN" not in stages, f"{name} is planned as {sorted(stages)}"
+    assert "IXSCAN" in stages or "IDHACK" in stages or "EXPRESS_IXSCAN" in stages, sorted(stages)
+
+
+def test_plan_stages_walks_nested_plans():
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}
+    }}}
+    assert plan_stages(explain) == {"FETCH", "OR", "IXSCAN", "COLLSCAN"}
@@ -0,0 +1,40 @@
+"""
+Instant-win lookups: generated numbers take over from the competition's own
+instant_wins, in other workers once their cached "nothing generated" expires.
+"""
+import asyncio
+
+import numpy as np
+
+import instant_wins
+from repositories import in_memory_repositories
+
+
+def test_numbers_generated_elsewhere_are_used_once_the_miss_expires():
+    repos = in_memory_repositories()
+    legacy = [{"name": "Typed", "amount": 1.0, "wallet_type": "cash", "numbers": "5"}]
+
+    async def scenario():
+        lookup = await instant_wins.get_lookup(repos.competitions, "c-generated", legacy)
+        assert lookup.match(5)["name"] == "Typed"
+
+        # Saved through another worker: this one's cache is not invalidated
+        repos.competitions.instant_win_numbers["c-generated"] = {
+            "competition_id": "c-generated",
+            "tiers": [{"name": "Generated", "amount": 2.0, "wallet_type": "cash", "count": 1,
+                       "numbers": np.array([7], dtype="<u4").tobytes()}],
+        }
+        lookup = await instant_wins.get_lookup(repos.competitions, "c-generated", legacy)
+        assert lookup.match(5)["name"] == "Typed"
+
+        # Once the cached miss has expired
+        cached, at = instant_wins._lookups["c-generated"]
+        instant_wins._lookups["c-generated"] = (cached, at - instant_wins.INSTANT_WIN_MISS_CACHE_TTL)
+        lookup = await instant_wins.get_lookup(repos.competitions, "c-generated", legacy)
+        assert lookup.match(5) is None
+        assert lookup.match(7)["name"] == "Generated"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        instant_wins.invalidate("c-generated")  # the cache is per process
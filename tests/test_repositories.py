@@ -0,0 +1,123 @@
+"""
+The in-memory repositories keep the guarantees handlers rely on from MongoDB:
+unique keys, guarded debits and counters that don't lose concurrent updates.
+"""
+import asyncio
+import random
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from repositories import CouponRepository, in_memory_repositories
+from ticket_allocator import allocate_tickets
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_unique_keys_raise_duplicate_key_error():
+    repos = in_memory_repositories()
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "a@x.com"})
+        with pytest.raises(DuplicateKeyError):
+            await repos.users.insert({"id": "u2", "email": "a@x.com"})
+        await repos.tickets.insert({"competition_id": "c1", "ticket_number": 7, "order_id": "o1"})
+        with pytest.raises(DuplicateKeyError):
+            await repos.tickets.insert({"competition_id": "c1", "ticket_number": 7, "order_id": "o2"})
+        await repos.tickets.insert({"competition_id": "c2", "ticket_number": 7, "order_id": "o2"})
+
+    run(scenario())
+
+
+def test_debit_is_guarded_and_bumps_profile_version():
+    repos = in_memory_repositories()
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "a@x.com", "cash_balance": 10.0, "profile_version": 0})
+        assert await repos.users.debit("u1", "cash_balance", 25.0) is None
+        debits = await asyncio.gather(*(repos.users.debit("u1", "cash_balance", 4.0) for _ in range(5)))
+        assert sum(1 for user in debits if user is not None) == 2
+        user = await repos.users.find_by_id("u1", {"_id": 0, "cash_balance": 1, "profile_version": 1})
+        assert user == {"cash_balance": 2.0, "profile_version": 2}
+
+    run(scenario())
+
+
+def test_documents_are_copied_and_projected():
+    repos = in_memory_repositories()
+
+    async def scenario():
+        comp = {"id": "c1", "title": "C", "tickets_sold": 0, "instant_wins": [{"name": "W", "numbers": "1,2"}]}
+        await repos.competitions.insert(comp)
+        comp["title"] = "changed"
+        listed = await repos.competitions.list(projection={"_id": 0, "instant_wins.numbers": 0})
+        assert listed == [{"id": "c1", "title": "C", "tickets_sold": 0, "instant_wins": [{"name": "W"}]}]
+        await asyncio.gather(*(repos.competitions.inc_tickets_sold("c1", 2) for _ in range(10)))
+        assert (await repos.competitions.get("c1"))["tickets_sold"] == 20
+
+    run(scenario())
+
+
+def test_allocation_sells_every_ticket_once():
+    repos = in_memory_repositories()
+    instant_wins = [{"name": "Cash", "amount": 5.0, "wallet_type": "cash", "numbers": "3, 9"}]
+
+    random.seed(0)  # allocation retries random numbers; keep the run deterministic
+
+    async def scenario():
+        await repos.users.insert({"id": "u1", "email": "a@x.com", "cash_balance": 0.0})
+        allocations = await asyncio.gather(*(
+            allocate_tickets(repos, "c1", 5, f"o{i}", "u1", instant_wins, max_tickets=20) for i in range(4)
+        ))
+        sold = sorted(number for allocated in allocations for number in allocated)
+        assert sold == list(range(1, 21))
+        user = await repos.users.find_by_id("u1")
+        assert user["cash_balance"] == 10.0
+
+    run(scenario())
+
+
+def test_cart_mutations_merge_concurrent_adds():
+    repos = in_memory_repositories()
+
+    def item(competition_id):
+        return {"competition_id": competition_id, "title": competition_id, "price": 1.0, "quantity": 1, "image": ""}
+
+    async def scenario():
+        assert await repos.carts.set_quantity("u1", "a", 2) is None
+        await asyncio.gather(*(repos.carts.add_item("u1", item(c)) for c in "abab"))
+        cart = await repos.carts.set_quantity("u1", "a", 5)
+        assert [(i["competition_id"], i["quantity"]) for i in cart["items"]] == [("a", 5), ("b", 2)]
+        cart = await repos.carts.set_quantity("u1", "b", 0)
+        assert [i["competition_id"] for i in cart["items"]] == ["a"]
+
+    run(scenario())
+
+
+def test_coupon_redemption_is_capped_at_max_uses():
+    repos = in_memory_repositories()
+    repos.coupons.add({"code": "ONCE", "discount_amount": 1.0, "is_active": True, "max_uses": 2, "times_used": 0})
+    repos.coupons.add({"code": "OFF", "discount_amount": 1.0, "is_active": False, "max_uses": 0, "times_used": 0})
+
+    async def scenario():
+        redeemed = await asyncio.gather(*(repos.coupons.redeem("ONCE") for _ in range(5)))
+        assert [coupon["times_used"] for coupon in redeemed if coupon] == [1, 2]
+        assert await repos.coupons.redeem("OFF") is None
+        await repos.coupons.release("ONCE")
+        assert (await repos.coupons.redeem("ONCE"))["times_used"] == 2
+
+    run(scenario())
+
+
+def test_incomplete_repository_cannot_be_constructed():
+    class NoRelease(CouponRepository):
+        async def find_active(self, code):
+            return None
+
+        async def redeem(self, code):
+            return None
+
+    with pytest.raises(TypeError, match="release"):
+        NoRelease()
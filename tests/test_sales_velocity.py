@@ -0,0 +1,96 @@
+"""
+Sales buckets and the sell-out projection. Recording and reading buckets runs
+against a real mongod: MONGO_TEST_URL, defaulting to
+mongodb://localhost:27017, skipped when no server is reachable.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import sales_velocity
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture(scope="module")
+def db_name():
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB server at {MONGO_TEST_URL}")
+    name = f"sales_velocity_{uuid.uuid4().hex[:8]}"
+    yield name
+    client.drop_database(name)
+    client.close()
+
+
+def test_bucket_start_floors_to_the_minute_or_hour():
+    at = datetime(2026, 5, 4, 13, 47, 21, 500)
+    assert sales_velocity.bucket_start(at, "minute") == datetime(2026, 5, 4, 13, 47)
+    assert sales_velocity.bucket_start(at, "hour") == datetime(2026, 5, 4, 13)
+
+
+def test_projection_from_the_recent_rate():
+    now = datetime(2026, 5, 4, 12)
+    projected = sales_velocity.project_sell_out(30, 10, timedelta(minutes=30), now)
+    assert projected == {
+        "tickets_per_hour": 20.0,
+        "remaining": 30,
+        "sold_out": False,
+        "projected_sell_out_at": now + timedelta(hours=1.5),
+    }
+
+
+def test_no_projection_without_recent_sales():
+    projected = sales_velocity.project_sell_out(30, 0, timedelta(hours=1), datetime(2026, 5, 4, 12))
+    assert projected["projected_sell_out_at"] is None
+    assert projected["sold_out"] is False
+
+
+def test_sold_out_competition_has_no_projection():
+    projected = sales_velocity.project_sell_out(-2, 5, timedelta(hours=1), datetime(2026, 5, 4, 12))
+    assert projected["sold_out"] is True
+    assert projected["remaining"] == 0
+    assert projected["projected_sell_out_at"] is None
+
+
+def test_sales_are_summed_into_minute_and_hour_buckets(db_name):
+    async def scenario():
+        client = AsyncIOMotorClient(MONGO_TEST_URL)
+        db = client[db_name]
+        try:
+            sales = [
+                (datetime(2026, 5, 4, 12, 0, 5), 2, 5.0),
+                (datetime(2026, 5, 4, 12, 0, 50), 1, 2.5),
+                (datetime(2026, 5, 4, 12, 59, 59), 3, 7.5),
+                (datetime(2026, 5, 4, 13, 1), 4, 10.0),
+            ]
+            await asyncio.gather(*(
+                sales_velocity.record_sale(db, "c1", tickets, revenue, at) for at, tickets, revenue in sales
+            ))
+            await sales_velocity.record_sale(db, "c2", 9, 9.0, datetime(2026, 5, 4, 12, 30))
+
+            hours = await sales_velocity.get_series(db, "c1", "hour", datetime(2026, 5, 4, 12, 40))
+            assert hours == [
+                {"start": datetime(2026, 5, 4, 12), "tickets": 6, "revenue": 15.0, "orders": 3},
+                {"start": datetime(2026, 5, 4, 13), "tickets": 4, "revenue": 10.0, "orders": 1},
+            ]
+
+            # The minute in progress at `since` is included
+            minutes = await sales_velocity.get_series(db, "c1", "minute", datetime(2026, 5, 4, 12, 0, 30))
+            assert [(bucket["start"], bucket["tickets"]) for bucket in minutes] == [
+                (datetime(2026, 5, 4, 12, 0), 3),
+                (datetime(2026, 5, 4, 12, 59), 3),
+                (datetime(2026, 5, 4, 13, 1), 4),
+            ]
+        finally:
+            client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+"""
+Timestamps stored as ISO strings by earlier releases: the migration's parser
+and pagination cursors issued before created_at became a date.
+"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from migrate_timestamps import parse_timestamp
+from pagination import decode_cursor, encode_cursor
+
+
+def _cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-03-01T10:20:30.123456", datetime(2026, 3, 1, 10, 20, 30, 123456)),
+    ("2026-03-01T12:20:30+02:00", datetime(2026, 3, 1, 10, 20, 30)),
+    ("2026-03-01T10:20:30Z", datetime(2026, 3, 1, 10, 20, 30)),
+    ("2026-03-01", datetime(2026, 3, 1)),
+])
+def test_parse_timestamp_returns_naive_utc(value, expected):
+    parsed = parse_timestamp(value)
+    assert parsed == expected
+    assert parsed.tzinfo is None
+
+
+@pytest.mark.parametrize("value", ["", "yesterday", "2026-13-01T00:00:00", "01/03/2026"])
+def test_parse_timestamp_rejects_garbage(value):
+    assert parse_timestamp(value) is None
+
+
+def test_cursor_issued_for_a_string_timestamp_decodes_to_a_date():
+    created_at, row_id = decode_cursor(_cursor(["s", "2026-03-01T10:20:30.123456", "order-1"]))
+    assert created_at == datetime(2026, 3, 1, 10, 20, 30, 123456)
+    assert row_id == "order-1"
+
+
+def test_cursor_round_trip_for_unmigrated_row():
+    cursor = encode_cursor({"created_at": "2026-03-01T10:20:30", "id": "order-2"})
+    assert decode_cursor(cursor) == (datetime(2026, 3, 1, 10, 20, 30), "order-2")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", _cursor(["d", "garbage", "order-1"]), _cursor([1, 2])])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,164 @@
+"""
+Upload storage and serving through a minimal app: content-addressed saves,
+the upload size limit, and conditional and ranged GETs.
+"""
+import hashlib
+import os
+import stat
+
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+import upload_store
+
+MAX_BYTES = 100_000
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        filename, size, created = await upload_store.save_upload(file, tmp_path, ".bin", max_bytes=MAX_BYTES)
+        return {"filename": filename, "size": size, "created": created}
+
+    @app.get("/uploads/{filename}")
+    async def serve(filename: str, request: Request):
+        return await upload_store.serve_file(request, tmp_path / filename)
+
+    app.add_middleware(upload_store.UploadLimitMiddleware, paths={"/upload"}, max_bytes=MAX_BYTES)
+    return TestClient(app)
+
+
+def _stored(tmp_path):
+    return sorted(path.name for path in tmp_path.iterdir())
+
+
+def test_upload_is_published_readable_like_other_files(client, tmp_path):
+    body = client.post("/upload", files={"file": ("a.bin", b"x" * 1000)}).json()
+    mode = stat.S_IMODE(os.stat(tmp_path / body["filename"]).st_mode)
+    assert mode == 0o644 & ~upload_store._UMASK
+
+
+def test_oversized_upload_is_rejected_before_the_body_is_read(client, tmp_path):
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * (MAX_BYTES + upload_store.MULTIPART_OVERHEAD))})
+    assert response.status_code == 413
+    assert _stored(tmp_path) == []
+
+
+def test_oversized_chunked_upload_stops_at_the_limit(client, tmp_path):
+    def body():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.bin"\r\n\r\n'
+        for _ in range(100):
+            yield b"y" * 10_000
+        yield b"\r\n--b--\r\n"
+
+    response = client.post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert _stored(tmp_path) == []
+
+
+def test_file_just_over_the_limit_is_rejected_by_save_upload(client, tmp_path):
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * (MAX_BYTES + 1))})
+    assert response.status_code == 413
+    assert _stored(tmp_path) == []
+
+
+def _upload(client, content):
+    return client.post("/upload", files={"file": ("a.bin", content)}).json()["filename"]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-5", (95, 99)),
+    ("bytes=0-999", (0, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=abc", None),
+    ("bytes=5-2", None),
+    ("bytes=-", None),
+    ("items=0-1", None),
+    ("bytes=0-1,3-4", None),
+])
+def test_parse_range(header, expected):
+    assert upload_store.parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=150-200", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        upload_store.parse_range(header, 100)
+
+
+def test_range_request_gets_the_slice(client):
+    content = bytes(range(100))
+    filename = _upload(client, content)
+    response = client.get(f"/uploads/{filename}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+
+
+def test_malformed_range_is_ignored(client):
+    content = bytes(range(100))
+    filename = _upload(client, content)
+    response = client.get(f"/uploads/{filename}", headers={"Range": "bytes=oops"})
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_unsatisfiable_range_is_a_416(client):
+    filename = _upload(client, bytes(range(100)))
+    response = client.get(f"/uploads/{filename}", headers={"Range": "bytes=100-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_identical_uploads_share_one_content_addressed_file(client, tmp_path):
+    first = client.post("/upload", files={"file": ("a.bin", b"same bytes")}).json()
+    second = client.post("/upload", files={"file": ("b.bin", b"same bytes")}).json()
+    assert first["created"] is True and second["created"] is False
+    assert first["filename"] == second["filename"] == hashlib.sha256(b"same bytes").hexdigest() + ".bin"
+    assert _stored(tmp_path) == [first["filename"]]  # no temp files left behind
+
+
+def test_content_addressed_file_is_cached_immutably(client):
+    filename = _upload(client, b"abc")
+    response = client.get(f"/uploads/{filename}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == upload_store.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{hashlib.sha256(b"abc").hexdigest()}"'
+
+
+def test_conditional_get_is_a_304(client):
+    filename = _upload(client, b"abc")
+    first = client.get(f"/uploads/{filename}")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    assert client.get(f"/uploads/{filename}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/uploads/{filename}", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(f"/uploads/{filename}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # If-None-Match takes precedence over If-Modified-Since
+    response = client.get(f"/uploads/{filename}", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.content == b"abc"
+
+
+def test_if_range_only_honours_the_range_for_the_current_copy(client):
+    content = bytes(range(100))
+    filename = _upload(client, content)
+    etag = client.get(f"/uploads/{filename}").headers["etag"]
+
+    current = client.get(f"/uploads/{filename}", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert current.status_code == 206
+    assert current.content == content[:10]
+
+    stale = client.get(f"/uploads/{filename}", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == content
+
+
+def test_missing_file_is_a_404(client):
+    assert client.get("/uploads/" + "0" * 64 + ".bin").status_code == 404